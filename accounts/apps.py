@@ -12,9 +12,16 @@ class AccountsConfig(AppConfig):
 
         def create_default_roles(sender, **kwargs):
             Role = apps.get_model('accounts', 'Role')
-            default_roles = ['cold_caller', 'sales_closer', 'designer', 'developer', 'seo', 'gbp', 'project_manager', 'client', 'admin']
-            for r in default_roles:
+            from .roles import ROLE_NAMES
+            for r in ROLE_NAMES:
                 Role.objects.get_or_create(name=r)
 
         post_migrate.connect(create_default_roles, sender=self)
 
+        # Validate the view-access policy table against the URLconf
+        from django.core import checks
+        from .policy import check_access_policy
+        checks.register(check_access_policy, checks.Tags.urls)
+        from .roles import check_role_names
+        checks.register(check_role_names, checks.Tags.database)
+
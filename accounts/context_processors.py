@@ -1,35 +1,56 @@
+from django.utils.functional import SimpleLazyObject
+
+from .roles import get_assigned_role_names
+
+
+# Template flag -> role name
+ROLE_FLAGS = {
+    'is_cold_caller': 'cold_caller',
+    'is_admin': 'admin',
+    'is_developer': 'developer',
+    'is_client': 'client',
+    'is_sales_closer': 'sales_closer',
+    'is_project_manager': 'project_manager',
+}
+
+
 def user_profile(request):
     """Provide a safe reference to the user's profile (or None) and role flags for templates.
 
     Adds `user_profile`, `user_roles` (list) and convenience booleans such as
     `is_fetcher`, `is_admin`, `is_client` so templates don't need to call
     methods or access attributes that may not exist.
+
+    Every value is lazy: nothing is queried until a template reads it, and
+    the flags share the per-request role set (`accounts.roles`) already
+    loaded by the middleware.
     """
-    profile = None
-    roles = []
-    flags = {
-        'is_cold_caller': False,
-        'is_admin': False,
-        'is_developer': False,
-        'is_client': False,
-        'is_sales_closer': False,
-        'is_project_manager': False,
-    }
+    def authenticated_user():
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user
+        return None
 
-    user = getattr(request, 'user', None)
-    if user and user.is_authenticated:
+    def assigned_roles():
+        user = authenticated_user()
+        if user is None:
+            return frozenset()
         try:
-            profile = user.profile
-            roles = [r.name for r in profile.roles.all()]
-            flags['is_cold_caller'] = 'cold_caller' in roles
-            flags['is_admin'] = 'admin' in roles
-            flags['is_developer'] = 'developer' in roles
-            flags['is_client'] = 'client' in roles
-            flags['is_sales_closer'] = 'sales_closer' in roles
-            flags['is_project_manager'] = 'project_manager' in roles
+            return get_assigned_role_names(user)
         except Exception:
-            profile = None
+            return frozenset()
 
-    context = {'user_profile': profile, 'user_roles': roles}
-    context.update(flags)
+    def profile():
+        user = authenticated_user()
+        try:
+            return user.profile if user is not None else None
+        except Exception:
+            return None
+
+    context = {
+        'user_profile': SimpleLazyObject(profile),
+        'user_roles': SimpleLazyObject(lambda: sorted(assigned_roles())),
+    }
+    for flag, role in ROLE_FLAGS.items():
+        context[flag] = SimpleLazyObject(lambda role=role: role in assigned_roles())
     return context
@@ -6,11 +6,13 @@ from functools import wraps
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .roles import has_any_role
+
 
 def role_required(allowed_roles):
     """
     Decorator to restrict view access to specific roles.
-    Usage: @role_required(['admin', 'fetcher'])
+    Usage: @role_required(['admin', 'cold_caller'])
     """
     def decorator(view_func):
         @wraps(view_func)
@@ -22,7 +24,7 @@ def role_required(allowed_roles):
                 messages.error(request, 'User profile not found.')
                 return redirect('accounts:login')
             
-            if request.user.profile.role not in allowed_roles:
+            if not has_any_role(request.user, allowed_roles):
                 messages.error(request, 'You do not have permission to access this page.')
                 return redirect('dashboard:dashboard')
             
@@ -37,8 +39,8 @@ def admin_required(view_func):
 
 
 def fetcher_required(view_func):
-    """Decorator to restrict view access to fetcher users only."""
-    return role_required(['fetcher'])(view_func)
+    """Decorator to restrict view access to fetcher (cold caller) users only."""
+    return role_required(['cold_caller'])(view_func)
 
 
 def developer_required(view_func):
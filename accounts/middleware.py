@@ -0,0 +1,54 @@
+"""
+Middleware that resolves the current user's roles once per request and
+enforces the declarative view-access policy.
+"""
+
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import redirect
+
+from .policy import COMPILED_POLICY
+from .roles import get_role_names
+
+
+class RoleMiddleware:
+    """Load `request.user.role_names` up front so later role checks are free.
+
+    Must be placed after `AuthenticationMiddleware`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            get_role_names(user)
+        return self.get_response(request)
+
+
+class AccessPolicyMiddleware:
+    """Enforce `accounts.policy.ACCESS_POLICY` before the view runs.
+
+    Anonymous users are sent to the login page. Must be placed after
+    `RoleMiddleware` and `MessageMiddleware`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.policy = COMPILED_POLICY
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = getattr(request, 'resolver_match', None)
+        allowed = self.policy.get(match.view_name) if match else None
+        if allowed is None:
+            return None
+        if not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        if allowed.isdisjoint(get_role_names(request.user)):
+            messages.error(request, 'You do not have permission to access this page.')
+            return redirect('dashboard:dashboard')
+        return None
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:33
+
+from django.db import migrations, models
+
+
+# Frozen copy of accounts.roles.ROLE_NAMES at the time of this migration
+ROLE_NAMES = (
+    'cold_caller', 'sales_closer', 'designer', 'developer', 'seo', 'gbp',
+    'social_media', 'project_manager', 'client', 'admin',
+)
+ROLE_BITS = {name: 1 << i for i, name in enumerate(ROLE_NAMES)}
+
+
+def backfill_role_mask(apps, schema_editor):
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    Through = UserProfile.roles.through
+    masks = {}
+    for profile_id, name in Through.objects.values_list('userprofile_id', 'role__name').iterator():
+        masks[profile_id] = masks.get(profile_id, 0) | ROLE_BITS.get(name, 0)
+    profiles = list(UserProfile.objects.filter(pk__in=masks.keys()))
+    for profile in profiles:
+        profile.role_mask = masks[profile.pk]
+    UserProfile.objects.bulk_update(profiles, ['role_mask'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_role_remove_userprofile_role_userprofile_roles'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='role_mask',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_role_mask, migrations.RunPython.noop),
+    ]
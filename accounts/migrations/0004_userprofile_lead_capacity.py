@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_role_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userprofile',
+            name='lead_capacity',
+            field=models.PositiveIntegerField(default=50, help_text='Open leads this sales closer can hold when leads are auto-assigned by capacity (0 = none).'),
+        ),
+    ]
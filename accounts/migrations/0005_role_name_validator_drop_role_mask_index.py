@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:40
+
+import accounts.roles
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_userprofile_lead_capacity'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='role',
+            name='name',
+            field=models.CharField(max_length=50, unique=True, validators=[accounts.roles.validate_role_name]),
+        ),
+        migrations.AlterField(
+            model_name='userprofile',
+            name='role_mask',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -1,6 +1,7 @@
 """
 Role-based permission mixins for class-based views.
-Supports multi-role UserProfile using `profile.has_role(role_name)`.
+Supports multi-role UserProfile using the per-request role set
+(`request.user.role_names`, see `accounts.roles`).
 Admin role short-circuits to allow access to everything.
 """
 
@@ -8,6 +9,8 @@ from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import redirect
 from django.contrib import messages
 
+from .roles import has_any_role
+
 
 class RoleRequiredMixin(LoginRequiredMixin):
     """
@@ -24,15 +27,8 @@ class RoleRequiredMixin(LoginRequiredMixin):
             messages.error(request, 'User profile not found.')
             return redirect('accounts:login')
 
-        # Superusers are treated as admin
-        profile = request.user.profile
-        allowed = False
-        for role in self.allowed_roles:
-            if profile.has_role(role):
-                allowed = True
-                break
-
-        if not allowed:
+        # Admin implies every role (handled by has_any_role)
+        if not has_any_role(request.user, self.allowed_roles):
             messages.error(request, 'You do not have permission to access this page.')
             return redirect('dashboard:dashboard')
 
@@ -4,15 +4,19 @@ Roles are defined in a separate Role model (multi-role allowed).
 Admin is special and implies all roles.
 """
 
-from django.db import models
+from functools import partial
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import Signal, receiver
+
+from .roles import has_role as user_has_role, invalidate_user_roles, role_mask_for, validate_role_name
 
 
 class Role(models.Model):
     """A simple Role model to support multi-role assignments."""
-    name = models.CharField(max_length=50, unique=True)
+    name = models.CharField(max_length=50, unique=True, validators=[validate_role_name])
     display_name = models.CharField(max_length=100, blank=True)
 
     def __str__(self):
@@ -23,8 +27,14 @@ class UserProfile(models.Model):
     """Extended user profile with multiple role assignments."""
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
     roles = models.ManyToManyField(Role, blank=True, related_name='users')
+    # Bitmask mirror of `roles` (see accounts.roles.ROLE_BITS), kept in sync by
+    # the m2m_changed handler below. Lets role filters read one column instead
+    # of joining the M2M; bitwise predicates cannot use an index, so none is kept.
+    role_mask = models.PositiveIntegerField(default=0, editable=False)
     phone = models.CharField(max_length=20, blank=True, null=True)
     city = models.CharField(max_length=100, blank=True, null=True)
+    # Open leads a sales closer can hold under weighted auto-assignment (see leads.assignment)
+    lead_capacity = models.PositiveIntegerField(default=50, help_text='Open leads this sales closer can hold when leads are auto-assigned by capacity (0 = none).')
 
     def __str__(self):
         roles = ", ".join([r.name for r in self.roles.all()])
@@ -36,18 +46,24 @@ class UserProfile(models.Model):
         return ", ".join(roles) if roles else 'no-role'
 
     def has_role(self, role_name):
-        """Return True if the user has the given role or is admin."""
-        if self.roles.filter(name='admin').exists():
-            return True
-        return self.roles.filter(name=role_name).exists()
+        """Return True if the user has the given role or is admin.
+
+        Reads the role set memoised on the user, so only the first check in a
+        request touches the database.
+        """
+        return user_has_role(self.user, role_name)
+
     def add_role(self, role_name):
+        validate_role_name(role_name)
         role, _ = Role.objects.get_or_create(name=role_name)
         self.roles.add(role)
+        invalidate_user_roles(self.user_id, self.user)
 
     def remove_role(self, role_name):
         role = Role.objects.filter(name=role_name).first()
         if role:
             self.roles.remove(role)
+            invalidate_user_roles(self.user_id, self.user)
 
 
 @receiver(post_save, sender=User)
@@ -82,3 +98,43 @@ def save_user_profile(sender, instance, **kwargs):
     """Auto-save UserProfile when User is saved."""
     if hasattr(instance, 'profile'):
         instance.profile.save()
+
+
+# Sent with user_id and role_mask once a change to a user's roles commits,
+# for data derived from roles elsewhere (e.g. the project payout ledger).
+roles_changed = Signal()
+
+
+def sync_role_mask(profile):
+    """Recompute `role_mask` from the profile's roles and persist it."""
+    mask = role_mask_for(profile.roles.values_list('name', flat=True))
+    UserProfile.objects.filter(pk=profile.pk).update(role_mask=mask)
+    profile.role_mask = mask
+    invalidate_user_roles(profile.user_id)
+    transaction.on_commit(partial(roles_changed.send, sender=UserProfile, user_id=profile.user_id, role_mask=mask))
+
+
+@receiver(m2m_changed, sender=UserProfile.roles.through)
+def sync_roles_on_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Keep `role_mask` and the cached role sets in step with the roles M2M."""
+    if not reverse:
+        # instance is a UserProfile
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            sync_role_mask(instance)
+        return
+    # instance is a Role; pk_set holds profile ids (None on clear, so
+    # remember the affected profiles before the rows go away)
+    if action == 'pre_clear':
+        instance._cleared_profile_ids = list(instance.users.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_profile_ids', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for profile in UserProfile.objects.filter(pk__in=pk_set or []):
+        sync_role_mask(profile)
+
+
+@receiver(post_delete, sender=UserProfile)
+def invalidate_roles_on_profile_delete(sender, instance, **kwargs):
+    invalidate_user_roles(instance.user_id)
@@ -0,0 +1,69 @@
+"""
+Declarative view-access policy.
+
+Maps namespaced URL names to the roles allowed to open them. The table is
+compiled once into frozensets at import time, and `AccessPolicyMiddleware`
+enforces it with a single set intersection against the request's role set
+(`accounts.roles`). Views listed here no longer need their own role checks;
+object-level rules (e.g. "creator or admin") still live in the views.
+"""
+
+ACCESS_POLICY = {
+    # Dashboard
+    'dashboard:fetcher_dashboard': ('cold_caller',),
+    'dashboard:my_projects': ('project_manager', 'sales_closer', 'cold_caller'),
+    'dashboard:export_data': ('admin', 'project_manager'),
+
+    # Leads
+    'leads:cold_caller_dashboard': ('cold_caller', 'project_manager', 'admin'),
+    'leads:import_leads': ('cold_caller', 'project_manager', 'admin'),
+    'leads:sales_closer_dashboard': ('sales_closer', 'project_manager', 'admin'),
+    'leads:sales_closer_onboard': ('sales_closer', 'project_manager', 'admin'),
+    'leads:filter': ('cold_caller', 'sales_closer', 'project_manager', 'admin'),
+    'leads:auto_assign': ('admin', 'project_manager'),
+
+    # Activity
+    'activity:activity_logs': ('admin', 'project_manager'),
+}
+
+
+def compile_policy(policy):
+    """Return `policy` with each role list frozen for O(1) intersection checks."""
+    return {view_name: frozenset(roles) for view_name, roles in policy.items()}
+
+
+COMPILED_POLICY = compile_policy(ACCESS_POLICY)
+
+
+def allowed_roles_for(view_name):
+    """Return the frozenset of roles allowed for `view_name`, or None if unrestricted."""
+    return COMPILED_POLICY.get(view_name)
+
+
+def is_allowed(role_names, view_name):
+    """Return True if a user with `role_names` may open `view_name`."""
+    allowed = COMPILED_POLICY.get(view_name)
+    if allowed is None:
+        return True
+    return not allowed.isdisjoint(role_names)
+
+
+def check_access_policy(app_configs=None, **kwargs):
+    """System check: every policy entry must name a real URL pattern."""
+    from django.core.checks import Error
+    from django.urls import get_resolver
+
+    resolver = get_resolver()
+    errors = []
+    for view_name in COMPILED_POLICY:
+        namespace, _, name = view_name.rpartition(':')
+        target = resolver
+        if namespace:
+            entry = resolver.namespace_dict.get(namespace)
+            target = entry[1] if entry else None
+        if target is None or name not in target.reverse_dict:
+            errors.append(Error(
+                f"ACCESS_POLICY references unknown URL name '{view_name}'.",
+                id='accounts.E001',
+            ))
+    return errors
@@ -0,0 +1,236 @@
+"""
+Per-request role resolution.
+
+A user's role names are loaded with a single query and memoised on the user
+instance as a frozenset (`user.role_names`). Admin implies every role, so the
+admin set is expanded to every known role name. All role checks (mixins,
+decorators, context processor, template tags) read from this set so that a
+page view costs at most one role query.
+
+Across requests the assigned role names are kept in the shared cache under
+a per-user version. Any role change bumps the version (see
+`invalidate_user_roles`), so warm requests need no database round trip.
+A process-local cache (LocMemCache, the default when CACHES is unset) is
+never used for this: a revoke handled by one gunicorn worker would not
+reach the others, so each request reads the role mask instead.
+
+Each known role also owns one bit in `UserProfile.role_mask`, which mirrors
+the `roles` M2M. Role lookups and "users with role X" filters use a single
+bitwise predicate on that column instead of joining through the M2M. The
+predicate is evaluated per row (no index can serve a bitwise AND), which is
+cheap at the size of the user table. Only names in ROLE_NAMES can be
+assigned (`validate_role_name`), so the mask never drops a role.
+"""
+
+import time
+from functools import partial
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.lookups import GreaterThan
+
+ADMIN_ROLE = 'admin'
+
+# Every role the portal knows about. Admin expands to all of these.
+# Order defines the bit for each role in UserProfile.role_mask: append only.
+ROLE_NAMES = (
+    'cold_caller',
+    'sales_closer',
+    'designer',
+    'developer',
+    'seo',
+    'gbp',
+    'social_media',
+    'project_manager',
+    'client',
+    'admin',
+)
+
+ROLE_BITS = {name: 1 << i for i, name in enumerate(ROLE_NAMES)}
+
+
+def validate_role_name(name):
+    """Reject role names outside ROLE_NAMES; they would have no bit in role_mask."""
+    if name not in ROLE_BITS:
+        from django.core.exceptions import ValidationError
+        raise ValidationError(
+            f'Unknown role {name!r}. Add it to accounts.roles.ROLE_NAMES first.',
+            code='unknown_role',
+        )
+
+
+def check_role_names(app_configs=None, databases=None, **kwargs):
+    """System check (database tag): every Role row must be a known role name."""
+    from django.core.checks import Error
+    from django.db import DatabaseError
+    from .models import Role
+
+    errors = []
+    for alias in databases or ():
+        try:
+            unknown = list(Role.objects.using(alias).exclude(name__in=ROLE_NAMES).values_list('name', flat=True))
+        except DatabaseError:
+            # Tables not created yet
+            continue
+        for name in unknown:
+            errors.append(Error(
+                f"Role '{name}' is not in accounts.roles.ROLE_NAMES, so role checks ignore it.",
+                hint='Add the name to ROLE_NAMES (append only) or delete the role.',
+                id='accounts.E002',
+            ))
+    return errors
+
+
+def role_mask_for(role_names):
+    """Return the bitmask for the given role names (unknown names are ignored)."""
+    mask = 0
+    for name in role_names:
+        mask |= ROLE_BITS.get(name, 0)
+    return mask
+
+
+def role_names_for_mask(mask):
+    """Return the role names encoded in `mask`."""
+    return frozenset(name for name, bit in ROLE_BITS.items() if mask & bit)
+
+
+def role_filter(role_names, field='profile__role_mask'):
+    """Filter expression matching rows whose role mask has any of `role_names`.
+
+    Usage: User.objects.filter(role_filter(['developer']))
+    """
+    return GreaterThan(F(field).bitand(role_mask_for(role_names)), 0)
+
+
+def expand_role_names(assigned):
+    """Return the effective role set for the given assigned role names."""
+    assigned = frozenset(assigned)
+    if ADMIN_ROLE in assigned:
+        return assigned | frozenset(ROLE_NAMES)
+    return assigned
+
+
+# Cached role sets live for an hour; the version key never expires.
+ROLE_CACHE_TIMEOUT = 3600
+
+
+def role_cache_is_shared():
+    """True if the default cache is visible to every worker process."""
+    return not isinstance(caches['default'], (LocMemCache, DummyCache))
+
+
+def _role_version_key(user_id):
+    return f'user_roles_version_{user_id}'
+
+
+def _role_cache_key(user_id, version):
+    return f'user_roles_{user_id}_v{version}'
+
+
+def get_role_version(user_id):
+    """Return the current role-cache version for a user, initialising it if needed."""
+    key = _role_version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so an evicted version never reuses an old number
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def role_state_token(user):
+    """A value that changes whenever `user`'s roles change, for keying derived state.
+
+    The shared-cache version when there is one (no query); otherwise the
+    assigned role names themselves.
+    """
+    if role_cache_is_shared():
+        return get_role_version(user.pk)
+    return sorted(get_assigned_role_names(user))
+
+
+def bump_role_version(user_id):
+    """Invalidate every cached role set for `user_id` by moving to a new version."""
+    if not role_cache_is_shared():
+        return
+    key = _role_version_key(user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def load_assigned_role_names(user):
+    """Return the role names assigned to `user` from the shared cache or the database."""
+    from .models import UserProfile
+    shared = role_cache_is_shared()
+    if shared:
+        key = _role_cache_key(user.pk, get_role_version(user.pk))
+        names = cache.get(key)
+        if names is not None:
+            return names
+    mask = UserProfile.objects.filter(user_id=user.pk).values_list('role_mask', flat=True).first()
+    names = role_names_for_mask(mask or 0)
+    if shared:
+        cache.set(key, names, ROLE_CACHE_TIMEOUT)
+    return names
+
+
+def get_assigned_role_names(user):
+    """Return the roles explicitly assigned to `user`, without admin expansion."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    assigned = getattr(user, 'assigned_role_names', None)
+    if assigned is None:
+        assigned = load_assigned_role_names(user)
+        user.assigned_role_names = assigned
+        user.role_names = expand_role_names(assigned)
+    return assigned
+
+
+def get_role_names(user):
+    """Return the effective (admin-expanded) role set for `user`, loading it once."""
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    names = getattr(user, 'role_names', None)
+    if names is None:
+        get_assigned_role_names(user)
+        names = user.role_names
+    return names
+
+
+def has_role(user, role_name):
+    """Return True if `user` has `role_name` (admin implies every role)."""
+    names = get_role_names(user)
+    return role_name in names or ADMIN_ROLE in names
+
+
+def has_any_role(user, role_names):
+    """Return True if `user` has at least one of `role_names`."""
+    names = get_role_names(user)
+    return ADMIN_ROLE in names or not names.isdisjoint(role_names)
+
+
+def clear_role_names(user):
+    """Drop the memoised role set so the next check reloads it."""
+    if user is None:
+        return
+    for attr in ('role_names', 'assigned_role_names'):
+        try:
+            delattr(user, attr)
+        except AttributeError:
+            pass
+
+
+def invalidate_user_roles(user_id, user=None):
+    """Drop any memoised set on `user` and bump the shared role-cache version.
+
+    The bump waits for the surrounding transaction to commit: bumped earlier,
+    a concurrent request could read the new version with the old roles and
+    cache the stale set under it for ROLE_CACHE_TIMEOUT.
+    """
+    clear_role_names(user)
+    transaction.on_commit(partial(bump_role_version, user_id))
@@ -1,5 +1,7 @@
 from django import template
 
+from accounts.roles import has_role as user_has_role, role_filter
+
 register = template.Library()
 
 
@@ -10,10 +12,7 @@ def has_role(obj, role_name):
         # If a User instance is passed
         from django.contrib.auth.models import User
         if isinstance(obj, User):
-            profile = getattr(obj, 'profile', None)
-            if profile:
-                return profile.has_role(role_name)
-            return False
+            return user_has_role(obj, role_name)
         # If a UserProfile is passed
         return obj.has_role(role_name)
     except Exception:
@@ -27,8 +26,8 @@ def filter_role(users, role_name):
     Works with QuerySet (uses ORM filter) and with plain iterables (falls back to python filtering).
     """
     try:
-        # If users is a queryset, let ORM do the filtering
-        return users.filter(profile__roles__name=role_name)
+        # If users is a queryset, let ORM do the filtering (single bitmask predicate)
+        return users.filter(role_filter([role_name]))
     except Exception:
         try:
             return [u for u in users if getattr(u, 'profile', None) and u.profile.has_role(role_name)]
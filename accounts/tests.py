@@ -1,3 +1,193 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
+from django.test import TestCase, RequestFactory, override_settings
+from django.urls import reverse
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from accounts.models import Role, UserProfile
+from accounts.roles import get_role_names, get_role_version, has_role, role_filter, role_mask_for, ROLE_NAMES
+from accounts.context_processors import user_profile
+from accounts.policy import COMPILED_POLICY, check_access_policy, is_allowed
 
-# Create your tests here.
+
+# A cache every worker sees, as in production with Redis
+SHARED_CACHE = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': tempfile.mkdtemp(prefix='assanj-test-cache-'),
+    }
+}
+
+
+class RoleSetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='dev', password='pass')
+        profile, _ = UserProfile.objects.get_or_create(user=self.user)
+        profile.roles.clear()
+        role, _ = Role.objects.get_or_create(name='developer')
+        profile.roles.add(role)
+
+    def test_role_set_loaded_once(self):
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_role_names(user), frozenset({'developer'}))
+            self.assertTrue(has_role(user, 'developer'))
+            self.assertFalse(has_role(user, 'admin'))
+        profile = user.profile
+        with self.assertNumQueries(0):
+            self.assertTrue(profile.has_role('developer'))
+            self.assertFalse(profile.has_role('seo'))
+
+    def test_admin_expands_to_every_role(self):
+        self.user.profile.add_role('admin')
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(frozenset(ROLE_NAMES) <= get_role_names(user))
+        self.assertTrue(has_role(user, 'some_custom_role'))
+
+    def test_add_role_refreshes_role_set(self):
+        profile = self.user.profile
+        self.assertFalse(profile.has_role('seo'))
+        profile.add_role('seo')
+        self.assertTrue(profile.has_role('seo'))
+        profile.remove_role('seo')
+        self.assertFalse(profile.has_role('seo'))
+
+    def test_context_processor_flags_use_assigned_roles(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        context = user_profile(request)
+        self.assertTrue(context['is_developer'])
+        self.assertFalse(context['is_admin'])
+        self.assertEqual(context['user_roles'], ['developer'])
+
+    def test_context_processor_is_lazy(self):
+        request = RequestFactory().get('/')
+        request.user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            context = user_profile(request)
+        with self.assertNumQueries(1):
+            self.assertTrue(context['is_developer'])
+            self.assertFalse(context['is_project_manager'])
+            self.assertEqual(list(context['user_roles']), ['developer'])
+
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_warm_cache_needs_no_query(self):
+        cache.clear()
+        get_role_names(User.objects.get(pk=self.user.pk))
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_role_names(user), frozenset({'developer'}))
+
+    def test_process_local_cache_is_not_trusted_across_requests(self):
+        # LocMemCache is per worker; a revoke elsewhere would never reach it
+        get_role_names(User.objects.get(pk=self.user.pk))
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_role_names(user), frozenset({'developer'}))
+
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_role_change_bumps_cached_version(self):
+        cache.clear()
+        get_role_names(User.objects.get(pk=self.user.pk))
+        seo, _ = Role.objects.get_or_create(name='seo')
+        # Reverse side of the M2M must invalidate too
+        with self.captureOnCommitCallbacks(execute=True):
+            seo.users.add(self.user.profile)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertTrue(has_role(user, 'seo'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.profile.roles.remove(seo)
+        user = User.objects.get(pk=self.user.pk)
+        self.assertFalse(has_role(user, 'seo'))
+
+    @override_settings(CACHES=SHARED_CACHE)
+    def test_version_is_bumped_only_on_commit(self):
+        cache.clear()
+        version = get_role_version(self.user.pk)
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.profile.add_role('seo')
+            # A request reading the cache before the commit must not get a fresh key
+            self.assertEqual(get_role_version(self.user.pk), version)
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(get_role_version(self.user.pk), version)
+
+
+class RoleMaskTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.dev = User.objects.create_user(username='dev', password='pass')
+        self.dev.profile.roles.clear()
+        self.dev.profile.add_role('developer')
+        self.seo = User.objects.create_user(username='seo', password='pass')
+        self.seo.profile.roles.clear()
+        self.seo.profile.add_role('seo')
+
+    def test_mask_follows_roles_m2m(self):
+        self.dev.profile.refresh_from_db()
+        self.assertEqual(self.dev.profile.role_mask, role_mask_for(['developer']))
+        self.dev.profile.add_role('designer')
+        self.dev.profile.refresh_from_db()
+        self.assertEqual(self.dev.profile.role_mask, role_mask_for(['developer', 'designer']))
+        Role.objects.get(name='designer').users.clear()
+        self.dev.profile.refresh_from_db()
+        self.assertEqual(self.dev.profile.role_mask, role_mask_for(['developer']))
+
+    def test_role_filter_uses_single_predicate(self):
+        developers = User.objects.filter(role_filter(['developer']))
+        self.assertEqual(list(developers), [self.dev])
+        execution = User.objects.filter(role_filter(['developer', 'seo'])).order_by('username')
+        self.assertEqual(list(execution), [self.dev, self.seo])
+        sql = str(execution.query)
+        self.assertNotIn('accounts_role', sql)
+        self.assertNotIn('DISTINCT', sql)
+
+    def test_unknown_roles_are_rejected(self):
+        from django.core.exceptions import ValidationError
+        with self.assertRaises(ValidationError):
+            self.dev.profile.add_role('made_up')
+        with self.assertRaises(ValidationError):
+            Role(name='made_up').full_clean()
+        self.assertFalse(Role.objects.filter(name='made_up').exists())
+
+    def test_check_reports_unknown_role_rows(self):
+        from accounts.roles import check_role_names
+        self.assertEqual(check_role_names(databases=['default']), [])
+        Role.objects.create(name='legacy_role')
+        self.assertEqual([e.id for e in check_role_names(databases=['default'])], ['accounts.E002'])
+
+
+class AccessPolicyTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.pm = User.objects.create_user(username='pm', password='pass')
+        self.pm.profile.add_role('project_manager')
+
+    def test_policy_denies_roles_outside_the_table(self):
+        self.client.login(username='caller', password='pass')
+        resp = self.client.get(reverse('activity:activity_logs'))
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(resp['Location'], reverse('dashboard:dashboard'))
+
+    def test_policy_allows_listed_roles(self):
+        self.client.login(username='pm', password='pass')
+        resp = self.client.get(reverse('activity:activity_logs'))
+        self.assertEqual(resp.status_code, 200)
+
+    def test_anonymous_users_are_sent_to_login(self):
+        resp = self.client.get(reverse('leads:sales_closer_dashboard'))
+        self.assertEqual(resp.status_code, 302)
+        self.assertIn('/login/', resp['Location'])
+
+    def test_is_allowed_is_a_set_intersection(self):
+        self.assertTrue(is_allowed(frozenset({'cold_caller'}), 'leads:filter'))
+        self.assertFalse(is_allowed(frozenset({'designer'}), 'leads:filter'))
+        self.assertTrue(is_allowed(frozenset(), 'dashboard:dashboard'))
+
+    def test_check_reports_unknown_url_names(self):
+        self.assertEqual(check_access_policy(), [])
+        with mock.patch.dict(COMPILED_POLICY, {'leads:missing': frozenset({'admin'})}):
+            errors = check_access_policy()
+        self.assertEqual([e.id for e in errors], ['accounts.E001'])
@@ -16,7 +16,15 @@ class CustomLoginView(LoginView):
     form_class = CustomLoginForm
     
     def get_success_url(self):
-        return '/'
+        # Honour ?next=, otherwise land directly on the user's dashboard
+        # instead of bouncing through the `/` router.
+        redirect_to = self.get_redirect_url()
+        if redirect_to:
+            return redirect_to
+        from django.urls import reverse
+        from dashboard.views import get_landing
+        landing = get_landing(self.request)
+        return reverse(landing) if landing else '/'
 
 
 @login_required
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ActivityLog
+from .models import ActivityLog, ArchivedActivityLog, ActivityDailyRollup
 
 
 @admin.register(ActivityLog)
@@ -7,3 +7,17 @@ class ActivityLogAdmin(admin.ModelAdmin):
     list_display = ('timestamp', 'performed_by', 'action', 'entity_type', 'entity_id')
     list_filter = ('action', 'entity_type', 'performed_by')
     search_fields = ('action', 'entity_type')
+
+
+@admin.register(ArchivedActivityLog)
+class ArchivedActivityLogAdmin(admin.ModelAdmin):
+    list_display = ('timestamp', 'performed_by', 'action', 'entity_type', 'entity_id')
+    list_filter = ('action', 'entity_type')
+    search_fields = ('action', 'entity_type')
+
+
+@admin.register(ActivityDailyRollup)
+class ActivityDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('day', 'action', 'entity_type', 'performed_by', 'count')
+    list_filter = ('action', 'entity_type')
+    date_hierarchy = 'day'
@@ -0,0 +1,92 @@
+"""
+ActivityLog retention: move rows older than the retention window into
+ArchivedActivityLog and fold them into ActivityDailyRollup counts.
+
+Each batch is copied, counted and deleted in one transaction, so a crash
+never loses or double-counts a row, and re-running simply continues.
+"""
+
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ActivityDailyRollup, ActivityLog, ArchivedActivityLog
+
+
+DEFAULT_RETENTION_DAYS = 180
+ARCHIVE_BATCH_SIZE = 1000
+
+_COPY_FIELDS = ('id', 'action', 'entity_type', 'entity_id', 'performed_by_id', 'timestamp', 'note')
+
+
+def retention_cutoff(days=None):
+    """Return the timestamp before which rows leave the hot table."""
+    if days is None:
+        days = getattr(settings, 'ACTIVITY_LOG_RETENTION_DAYS', DEFAULT_RETENTION_DAYS)
+    return timezone.now() - timedelta(days=days)
+
+
+def _add_to_rollups(counts):
+    """Add {(day, action, entity_type, actor_id): n} to ActivityDailyRollup.
+
+    Keys with an actor are upserted against the unique constraint and
+    incremented in the database, so concurrent archivers never lose counts.
+    The constraint treats NULL actors as distinct, so those keys are
+    incremented with an UPDATE and created only when nothing matched.
+    """
+    # Raw SQL because bulk_create(update_conflicts=True) can only set a column
+    # to the incoming value (count = EXCLUDED.count); it cannot add to the
+    # stored one, and F() is not accepted in its update_fields.
+    qn = connection.ops.quote_name
+    table = qn(ActivityDailyRollup._meta.db_table)
+    count = qn('count')
+    rows = [(*key, n) for key, n in counts.items() if key[3] is not None]
+    if rows:
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (day, action, entity_type, performed_by_id, {count}) '
+                'VALUES (%s, %s, %s, %s, %s) '
+                'ON CONFLICT (day, action, entity_type, performed_by_id) '
+                f'DO UPDATE SET {count} = {table}.{count} + excluded.{count}',
+                rows,
+            )
+    for (day, action, entity_type, actor_id), n in counts.items():
+        if actor_id is not None:
+            continue
+        key = {'day': day, 'action': action, 'entity_type': entity_type, 'performed_by': None}
+        if not ActivityDailyRollup.objects.filter(**key).update(count=F('count') + n):
+            ActivityDailyRollup.objects.create(count=n, **key)
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive the oldest `batch_size` rows before `cutoff`; return how many moved."""
+    with transaction.atomic():
+        rows = list(
+            ActivityLog.objects.filter(timestamp__lt=cutoff)
+            .order_by('timestamp', 'id')
+            .values(*_COPY_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0
+        ArchivedActivityLog.objects.bulk_create(
+            [ArchivedActivityLog(**row) for row in rows], ignore_conflicts=True,
+        )
+        _add_to_rollups(Counter(
+            (timezone.localdate(row['timestamp']), row['action'], row['entity_type'], row['performed_by_id'])
+            for row in rows
+        ))
+        ActivityLog.objects.filter(pk__in=[row['id'] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_activity(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive every row before `cutoff` in batches; yield the size of each batch."""
+    while True:
+        moved = archive_batch(cutoff, batch_size)
+        if not moved:
+            return
+        yield moved
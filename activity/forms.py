@@ -0,0 +1,45 @@
+from datetime import datetime, time, timedelta
+
+from django import forms
+from django.utils import timezone
+
+
+FILTER_INPUT = 'px-3 py-2 border rounded-md text-sm focus:outline-none focus:ring-2 focus:ring-indigo-500'
+
+
+class ActivityLogFilterForm(forms.Form):
+    """GET filters for the global activity log; every filter maps to an index on both log tables."""
+    action = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': FILTER_INPUT, 'placeholder': 'Action'}))
+    entity_type = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': FILTER_INPUT, 'placeholder': 'Entity type'}))
+    entity_id = forms.IntegerField(required=False, widget=forms.NumberInput(attrs={'class': FILTER_INPUT, 'placeholder': 'Entity #'}))
+    actor = forms.CharField(required=False, widget=forms.TextInput(attrs={'class': FILTER_INPUT, 'placeholder': 'Username'}))
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': FILTER_INPUT, 'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'class': FILTER_INPUT, 'type': 'date'}))
+
+    def clean(self):
+        cleaned = super().clean()
+        if cleaned.get('entity_id') is not None and not cleaned.get('entity_type'):
+            self.add_error('entity_type', 'Choose an entity type to filter by entity id.')
+        return cleaned
+
+    def filter(self, queryset):
+        """Apply the cleaned filters to an ActivityLog or ArchivedActivityLog queryset."""
+        data = self.cleaned_data
+        if data.get('action'):
+            queryset = queryset.filter(action=data['action'])
+        if data.get('entity_type'):
+            queryset = queryset.filter(entity_type=data['entity_type'])
+            if data.get('entity_id') is not None:
+                queryset = queryset.filter(entity_id=data['entity_id'])
+        if data.get('actor'):
+            queryset = queryset.filter(performed_by__username=data['actor'])
+        # Date bounds as timestamp ranges so the (timestamp, id) index applies
+        if data.get('date_from'):
+            queryset = queryset.filter(timestamp__gte=_start_of(data['date_from']))
+        if data.get('date_to'):
+            queryset = queryset.filter(timestamp__lt=_start_of(data['date_to'] + timedelta(days=1)))
+        return queryset
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from activity.archive import ARCHIVE_BATCH_SIZE, archive_activity, retention_cutoff
+from activity.models import ActivityLog
+
+
+class Command(BaseCommand):
+    help = (
+        'Move ActivityLog rows older than the retention window into the archive '
+        'table and add them to the daily rollups.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=None,
+            help='Retention window in days (default: settings.ACTIVITY_LOG_RETENTION_DAYS).',
+        )
+        parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many rows would move.')
+
+    def handle(self, *args, **options):
+        if options['days'] is not None and options['days'] < 0:
+            raise CommandError('--days must be zero or more.')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        cutoff = retention_cutoff(options['days'])
+
+        if options['dry_run']:
+            pending = ActivityLog.objects.filter(timestamp__lt=cutoff).count()
+            self.stdout.write(f'{pending} activity log rows older than {cutoff:%Y-%m-%d %H:%M} would be archived.')
+            return
+
+        total = 0
+        for moved in archive_activity(cutoff, options['batch_size']):
+            total += moved
+            if options['verbosity'] > 1:
+                self.stdout.write(f'  archived {moved} rows')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} activity log rows older than {cutoff:%Y-%m-%d %H:%M}.'))
@@ -0,0 +1,17 @@
+"""
+Middleware that batches a request's activity log writes.
+"""
+
+from .utils import buffered_activity
+
+
+class ActivityBufferMiddleware:
+    """Write the request's `log_activity` rows (those inside transactions
+    once they commit) with one bulk insert once the response is ready."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with buffered_activity():
+            return self.get_response(request)
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0002_activitylog_note'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['entity_type', 'entity_id', 'timestamp'], name='activity_entity_time_idx'),
+        ),
+    ]
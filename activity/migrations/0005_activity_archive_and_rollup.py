@@ -0,0 +1,47 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0004_activity_browser_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('action', models.CharField(max_length=50)),
+                ('entity_type', models.CharField(max_length=50)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('performed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='activity_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day', 'action', 'entity_type'], name='rollup_day_action_idx'), models.Index(fields=['performed_by', 'day'], name='rollup_actor_day_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedActivityLog',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('action', models.CharField(max_length=50)),
+                ('entity_type', models.CharField(max_length=50)),
+                ('entity_id', models.IntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField()),
+                ('note', models.TextField(blank=True, null=True)),
+                ('performed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['entity_type', 'entity_id', 'timestamp'], name='archive_entity_time_idx'), models.Index(fields=['timestamp', 'id'], name='archive_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_rollups(apps, schema_editor):
+    """Fold rollup rows sharing a key into the lowest id before the constraint lands."""
+    ActivityDailyRollup = apps.get_model('activity', 'ActivityDailyRollup')
+    duplicates = (
+        ActivityDailyRollup.objects.values('day', 'action', 'entity_type', 'performed_by')
+        .annotate(rows=Count('id'), keep=Min('id'), total=Sum('count'))
+        .filter(rows__gt=1).order_by()
+    )
+    for group in list(duplicates):
+        same_key = ActivityDailyRollup.objects.filter(
+            day=group['day'], action=group['action'], entity_type=group['entity_type'],
+            performed_by=group['performed_by'],
+        )
+        same_key.exclude(pk=group['keep']).delete()
+        same_key.filter(pk=group['keep']).update(count=group['total'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0005_activity_archive_and_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='activitydailyrollup',
+            name='rollup_day_action_idx',
+        ),
+        migrations.RunPython(merge_duplicate_rollups, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='activitydailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'action', 'entity_type', 'performed_by'), name='unique_activity_rollup'),
+        ),
+    ]
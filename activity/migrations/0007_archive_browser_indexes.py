@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-17 00:56
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activity', '0006_rollup_unique_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='archivedactivitylog',
+            name='archive_entity_time_idx',
+        ),
+        migrations.AddIndex(
+            model_name='archivedactivitylog',
+            index=models.Index(fields=['entity_type', 'entity_id', 'timestamp', 'id'], name='archive_entity_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedactivitylog',
+            index=models.Index(fields=['action', 'timestamp', 'id'], name='archive_action_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='archivedactivitylog',
+            index=models.Index(fields=['performed_by', 'timestamp', 'id'], name='archive_actor_time_idx'),
+        ),
+    ]
@@ -22,6 +22,69 @@ class ActivityLog(models.Model):
 
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            models.Index(fields=['entity_type', 'entity_id', 'timestamp'], name='activity_entity_time_idx'),
+            # Global log browser: unfiltered and date-range pages, then one per filter
+            models.Index(fields=['timestamp', 'id'], name='activity_time_idx'),
+            models.Index(fields=['action', 'timestamp', 'id'], name='activity_action_time_idx'),
+            models.Index(fields=['performed_by', 'timestamp', 'id'], name='activity_actor_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.timestamp} - {self.performed_by} - {self.action} {self.entity_type}#{self.entity_id}"
+
+
+class ArchivedActivityLog(models.Model):
+    """
+    ActivityLog rows older than the retention window, moved here by the
+    `archive_activity` command. Keeps the original ids so links and exports
+    still resolve, while the hot table stays bounded.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    action = models.CharField(max_length=50)
+    entity_type = models.CharField(max_length=50)
+    entity_id = models.IntegerField(null=True, blank=True)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='archived_activity')
+    timestamp = models.DateTimeField()
+    note = models.TextField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['-timestamp']
+        indexes = [
+            # id is spelled out: unlike ActivityLog's, this primary key is not SQLite's rowid
+            models.Index(fields=['entity_type', 'entity_id', 'timestamp', 'id'], name='archive_entity_time_idx'),
+            models.Index(fields=['timestamp', 'id'], name='archive_time_idx'),
+            # The log browser filters archived rows the same way (see activity.views)
+            models.Index(fields=['action', 'timestamp', 'id'], name='archive_action_time_idx'),
+            models.Index(fields=['performed_by', 'timestamp', 'id'], name='archive_actor_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.timestamp} - {self.performed_by} - {self.action} {self.entity_type}#{self.entity_id} (archived)"
+
+
+class ActivityDailyRollup(models.Model):
+    """
+    Per-day (action, entity_type, actor) counts for archived activity.
+    One row per key, which the archiver upserts (see activity.archive).
+    """
+
+    day = models.DateField()
+    action = models.CharField(max_length=50)
+    entity_type = models.CharField(max_length=50)
+    performed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='activity_rollups')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-day']
+        constraints = [
+            # Also serves day/action lookups
+            models.UniqueConstraint(fields=['day', 'action', 'entity_type', 'performed_by'], name='unique_activity_rollup'),
+        ]
+        indexes = [
+            models.Index(fields=['performed_by', 'day'], name='rollup_actor_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} - {self.performed_by} - {self.action} {self.entity_type}: {self.count}"
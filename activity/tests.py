@@ -0,0 +1,379 @@
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+
+from activity.models import ActivityLog
+from activity.utils import buffered_activity, log_activity
+
+
+class TransactionLogBufferTests(TestCase):
+    def test_rows_are_bulk_inserted_after_commit(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                with buffered_activity():
+                    with transaction.atomic():
+                        for n in range(3):
+                            row = log_activity('update', 'project', n)
+                        self.assertIsNone(row.pk)
+                    self.assertEqual(ActivityLog.objects.count(), 0)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.count(), 3)
+
+    def test_rolled_back_savepoint_writes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_activity('create', 'project', 1)
+            try:
+                with transaction.atomic():
+                    log_activity('update', 'project', 2)
+                    raise ValueError
+            except ValueError:
+                pass
+            log_activity('update', 'project', 3)
+        self.assertEqual(sorted(ActivityLog.objects.values_list('entity_id', flat=True)), [1, 3])
+
+    def test_unbuffered_rows_share_one_insert_per_transaction(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with self.captureOnCommitCallbacks(execute=True):
+                for n in range(5):
+                    log_activity('update', 'project', n)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.count(), 5)
+
+    def test_rows_before_a_trailing_rolled_back_savepoint_are_kept(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            log_activity('create', 'project', 1)
+            try:
+                with transaction.atomic():
+                    log_activity('update', 'project', 2)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(list(ActivityLog.objects.values_list('entity_id', flat=True)), [1])
+
+
+class BufferedActivityTests(TransactionTestCase):
+    def test_block_writes_once(self):
+        user = User.objects.create_user(username='buffered', password='pass')
+        with CaptureQueriesContext(connection) as ctx:
+            with buffered_activity():
+                for n in range(5):
+                    log_activity('update', 'lead', n, user)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.filter(performed_by=user).count(), 5)
+
+    def test_failed_block_writes_nothing(self):
+        with self.assertRaises(RuntimeError):
+            with buffered_activity():
+                log_activity('update', 'lead', 1)
+                raise RuntimeError
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_committed_transaction_without_buffer_writes_once(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with transaction.atomic():
+                for n in range(4):
+                    log_activity('update', 'lead', n)
+                try:
+                    with transaction.atomic():
+                        log_activity('update', 'lead', 99)
+                        raise ValueError
+                except ValueError:
+                    pass
+            self.assertEqual(ActivityLog.objects.count(), 4)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        self.assertEqual(len(inserts), 1)
+        # A rolled-back transaction leaves nothing behind for the next one
+        try:
+            with transaction.atomic():
+                log_activity('update', 'lead', 100)
+                raise ValueError
+        except ValueError:
+            pass
+        with transaction.atomic():
+            log_activity('update', 'lead', 101)
+        self.assertEqual(sorted(ActivityLog.objects.values_list('entity_id', flat=True)), [0, 1, 2, 3, 101])
+
+    def test_rolled_back_transaction_inside_block_writes_nothing(self):
+        with buffered_activity():
+            log_activity('create', 'lead', 1)
+            try:
+                with transaction.atomic():
+                    log_activity('update', 'lead', 2)
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(list(ActivityLog.objects.values_list('entity_id', flat=True)), [1])
+
+
+def tampered_cursors(*extra):
+    """Cursors that decode but hold values no ordering field accepts."""
+    import base64
+    import json
+    values = [['abc', 1], [{'a': 1}, 1], [None, None], [[], 'x'], [1e400, 1], [2 ** 70, 1], *extra]
+    cursors = [base64.urlsafe_b64encode(json.dumps(v).encode()).decode().rstrip('=') for v in values]
+    return cursors + ['not-base64!', base64.urlsafe_b64encode(b'{"a": 1}').decode()]
+
+
+class ProjectTimelineTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from clients.models import Client as BusinessClient
+        from projects.models import Project, ProjectUpdate
+
+        self.user = User.objects.create_user(username='timeline', password='pass')
+        business = BusinessClient.objects.create(created_by=self.user, full_name='O', business_name='T', phone='1', email='a@b.com', city='C', business_category='Other')
+        self.project = Project.objects.create(client=business, created_by=self.user, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31')
+        base = timezone.now()
+        logs = ActivityLog.objects.bulk_create([
+            ActivityLog(action='update', entity_type='project', entity_id=self.project.pk, performed_by=self.user) for _ in range(25)
+        ])
+        updates = ProjectUpdate.objects.bulk_create([
+            ProjectUpdate(project=self.project, user=self.user, message=f'm{i}') for i in range(25)
+        ])
+        # interleave, with some exact timestamp ties across sources
+        for i, log in enumerate(logs):
+            ActivityLog.objects.filter(pk=log.pk).update(timestamp=base - timedelta(minutes=2 * i))
+        for i, update in enumerate(updates):
+            ProjectUpdate.objects.filter(pk=update.pk).update(created_at=base - timedelta(minutes=3 * i))
+
+    def test_pages_cover_history_in_order_with_two_queries_each(self):
+        from activity.timeline import project_timeline
+        seen, cursor, pages = [], None, 0
+        while True:
+            with self.assertNumQueries(3):
+                page = project_timeline(self.project.pk, cursor, per_page=20)
+                entries = list(page)
+            self.assertTrue(all(e['actor'] == self.user for e in entries))
+            seen.extend(entries)
+            pages += 1
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(pages, 3)
+        self.assertEqual(len({(e['source'], e['id']) for e in seen}), 50)
+        stamps = [e['timestamp'] for e in seen]
+        self.assertEqual(stamps, sorted(stamps, reverse=True))
+
+    def test_archived_logs_stay_on_the_timeline(self):
+        from activity.archive import archive_activity
+        from activity.timeline import project_timeline
+
+        def walk():
+            seen, cursor = [], None
+            while True:
+                page = project_timeline(self.project.pk, cursor, per_page=7)
+                seen.extend((e['source'], e['id']) for e in page)
+                cursor = page.next_cursor
+                if cursor is None:
+                    return seen
+
+        before = walk()
+        cutoff = ActivityLog.objects.order_by('timestamp').values_list('timestamp', flat=True)[12]
+        self.assertEqual(sum(archive_activity(cutoff)), 12)
+        self.assertEqual(walk(), before)
+
+    def test_tampered_cursors_fall_back_to_first_page(self):
+        from activity.timeline import project_timeline
+        first = [(e['source'], e['id']) for e in project_timeline(self.project.pk, None, per_page=20)]
+        for cursor in tampered_cursors(['2024-13-45T99:00:00', 'log', 1], ['2024-01-01T00:00:00', 'nope', 1]):
+            page = project_timeline(self.project.pk, cursor, per_page=20)
+            self.assertEqual([(e['source'], e['id']) for e in page], first, cursor)
+
+    def test_view_renders_first_page_with_cursor(self):
+        from django.test import Client
+        from django.urls import reverse
+        self.user.is_superuser = True
+        self.user.save()
+        c = Client()
+        c.login(username='timeline', password='pass')
+        resp = c.get(reverse('activity:activity_logs_project', args=[self.project.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.context['logs']), 50)
+        self.assertIsNone(resp.context['next_cursor'])
+
+
+class ActivityLogBrowserTests(TestCase):
+    def setUp(self):
+        from django.test import Client
+        self.admin = User.objects.create_user(username='log_admin', password='pass')
+        self.admin.profile.add_role('admin')
+        self.other = User.objects.create_user(username='log_other', password='pass')
+        ActivityLog.objects.bulk_create(
+            [ActivityLog(action='update', entity_type='project', entity_id=n % 5, performed_by=self.admin) for n in range(60)]
+            + [ActivityLog(action='mark_won', entity_type='lead', entity_id=7, performed_by=self.other) for _ in range(3)]
+        )
+        self.c = Client()
+        self.c.login(username='log_admin', password='pass')
+
+    def test_pages_are_constant_query_and_reach_old_entries(self):
+        from django.urls import reverse
+        url = reverse('activity:activity_logs')
+        resp = self.c.get(url)
+        self.assertEqual(len(resp.context['logs']), 50)
+        cursor = resp.context['next_cursor']
+        self.assertIsNotNone(cursor)
+        # session, user, role mask (the test cache is process-local, see
+        # accounts.roles), one hot and one archived log page with actors
+        # joined, base template profile/roles
+        with self.assertNumQueries(7):
+            resp = self.c.get(url, {'cursor': cursor})
+        self.assertEqual(len(resp.context['logs']), 13)
+        self.assertIsNone(resp.context['next_cursor'])
+
+    def test_archived_rows_are_merged_in_order(self):
+        from datetime import timedelta
+        from django.urls import reverse
+        from django.utils import timezone
+        from activity.models import ArchivedActivityLog
+        now = timezone.now()
+        # Archive the lead rows, interleaved in time with hot project rows
+        leads = list(ActivityLog.objects.filter(entity_type='lead').order_by('id'))
+        for n, log in enumerate(leads):
+            log.timestamp = now - timedelta(days=10 + 2 * n)
+        for n, log in enumerate(ActivityLog.objects.filter(entity_type='project').order_by('id')[:4]):
+            ActivityLog.objects.filter(pk=log.pk).update(timestamp=now - timedelta(days=9 + 2 * n))
+        ArchivedActivityLog.objects.bulk_create([
+            ArchivedActivityLog(id=log.id, action=log.action, entity_type=log.entity_type, entity_id=log.entity_id,
+                                performed_by=log.performed_by, timestamp=log.timestamp)
+            for log in leads
+        ])
+        ActivityLog.objects.filter(entity_type='lead').delete()
+
+        url = reverse('activity:activity_logs')
+        seen = []
+        cursor = None
+        while True:
+            resp = self.c.get(url, {'cursor': cursor} if cursor else {})
+            seen += [(log.timestamp, log.id) for log in resp.context['logs']]
+            cursor = resp.context['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(len(seen), 63)
+        self.assertEqual(seen, sorted(set(seen), reverse=True))
+        self.assertEqual([log.action for log in resp.context['logs'][-7:]], ['update', 'mark_won'] * 3 + ['update'])
+
+        resp = self.c.get(url, {'actor': 'log_other'})
+        self.assertEqual({log.pk for log in resp.context['logs']}, {log.pk for log in leads})
+
+    def test_tampered_cursors_fall_back_to_first_page(self):
+        from django.urls import reverse
+        url = reverse('activity:activity_logs')
+        for cursor in tampered_cursors():
+            resp = self.c.get(url, {'cursor': cursor})
+            self.assertEqual(resp.status_code, 200, cursor)
+            self.assertEqual(len(resp.context['logs']), 50, cursor)
+
+    def test_filters(self):
+        from django.urls import reverse
+        url = reverse('activity:activity_logs')
+        resp = self.c.get(url, {'actor': 'log_other'})
+        self.assertEqual(len(resp.context['logs']), 3)
+        resp = self.c.get(url, {'entity_type': 'project', 'entity_id': 2})
+        self.assertEqual(len(resp.context['logs']), 12)
+        resp = self.c.get(url, {'action': 'update', 'date_from': '2000-01-01'})
+        self.assertEqual(resp.context['filter_query'], 'action=update&date_from=2000-01-01')
+        self.assertIn('cursor=', resp.content.decode())
+
+    def test_filter_plans_are_indexed(self):
+        from datetime import date
+        from activity.forms import ActivityLogFilterForm
+        from activity.models import ArchivedActivityLog
+        from activity.views import ACTIVITY_ORDERING
+        from assanj_portal.query_plans import plan_problems
+        for model in (ActivityLog, ArchivedActivityLog):
+            for data in ({}, {'action': 'update'}, {'entity_type': 'project', 'entity_id': 1},
+                         {'actor': 'log_other'}, {'date_from': date(2020, 1, 1), 'date_to': date(2030, 1, 1)}):
+                form = ActivityLogFilterForm(data)
+                self.assertTrue(form.is_valid(), form.errors)
+                qs = form.filter(model.objects.select_related('performed_by')).order_by(*ACTIVITY_ORDERING)[:51]
+                # the unfiltered page reads the time index in order up to the LIMIT
+                self.assertEqual(plan_problems(qs, allow_index_scan=not data), [], (model, data))
+
+
+class ProjectLogAccessTests(TestCase):
+    def setUp(self):
+        from clients.models import Client as BusinessClient
+        from projects.models import Project
+        self.owner = User.objects.create_user(username='access_owner', password='pass')
+        self.member = User.objects.create_user(username='access_member', password='pass')
+        self.stranger = User.objects.create_user(username='access_stranger', password='pass')
+        self.manager = User.objects.create_user(username='access_pm', password='pass')
+        self.manager.profile.add_role('project_manager')
+        business = BusinessClient.objects.create(created_by=self.owner, full_name='O', business_name='Access', phone='1', email='a@b.com', city='C', business_category='Other')
+        self.project = Project.objects.create(client=business, created_by=self.owner, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31')
+        self.project.assigned_team.add(self.member)
+
+    def test_access_is_one_query(self):
+        from activity.views import can_view_project_logs
+        from accounts.roles import get_role_names
+        for user, expected in ((self.owner, True), (self.member, True), (self.stranger, False), (self.manager, True)):
+            get_role_names(user)  # loaded once per request by RoleMiddleware
+            with self.assertNumQueries(1):
+                self.assertEqual(can_view_project_logs(user, self.project.pk), expected)
+        self.assertFalse(can_view_project_logs(self.manager, self.project.pk + 100))
+
+    def test_view_forbids_strangers(self):
+        from django.test import Client
+        from django.urls import reverse
+        c = Client()
+        c.login(username='access_stranger', password='pass')
+        resp = c.get(reverse('activity:activity_logs_project', args=[self.project.pk]))
+        self.assertEqual(resp.status_code, 403)
+
+
+class ArchiveActivityTests(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.user = User.objects.create_user(username='archiver', password='pass')
+        now = timezone.now()
+        rows = ActivityLog.objects.bulk_create(
+            [ActivityLog(action='update', entity_type='lead', entity_id=n, performed_by=self.user) for n in range(5)]
+            + [ActivityLog(action='create', entity_type='project', entity_id=1) for _ in range(2)]
+            + [ActivityLog(action='update', entity_type='lead', entity_id=99, performed_by=self.user)]
+        )
+        old = [r.pk for r in rows[:7]]
+        ActivityLog.objects.filter(pk__in=old).update(timestamp=now - timedelta(days=400))
+        self.old_ids = old
+
+    def test_command_moves_old_rows_and_rolls_them_up(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from activity.models import ActivityDailyRollup, ArchivedActivityLog
+        out = StringIO()
+        call_command('archive_activity', '--days', '180', '--batch-size', '3', stdout=out)
+        self.assertIn('Archived 7', out.getvalue())
+        self.assertEqual(list(ActivityLog.objects.values_list('entity_id', flat=True)), [99])
+        self.assertEqual(sorted(ArchivedActivityLog.objects.values_list('id', flat=True)), sorted(self.old_ids))
+        counts = {(r.action, r.entity_type, r.performed_by_id): r.count for r in ActivityDailyRollup.objects.all()}
+        self.assertEqual(counts, {('update', 'lead', self.user.pk): 5, ('create', 'project', None): 2})
+
+        # re-running adds nothing and never double counts
+        call_command('archive_activity', '--days', '180', stdout=StringIO())
+        self.assertEqual(sum(ActivityDailyRollup.objects.values_list('count', flat=True)), 7)
+
+    def test_rollups_are_unique_per_key(self):
+        from datetime import date
+        from django.db import IntegrityError
+        from activity.archive import _add_to_rollups
+        from activity.models import ActivityDailyRollup
+        day = date(2020, 1, 1)
+        _add_to_rollups({(day, 'update', 'lead', self.user.pk): 2, (day, 'create', 'project', None): 1})
+        _add_to_rollups({(day, 'update', 'lead', self.user.pk): 3, (day, 'create', 'project', None): 4})
+        counts = {(r.action, r.performed_by_id): r.count for r in ActivityDailyRollup.objects.all()}
+        self.assertEqual(counts, {('update', self.user.pk): 5, ('create', None): 5})
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ActivityDailyRollup.objects.create(day=day, action='update', entity_type='lead', performed_by=self.user)
+
+    def test_dry_run_changes_nothing(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('archive_activity', '--dry-run', stdout=out)
+        self.assertIn('7 activity log rows', out.getvalue())
+        self.assertEqual(ActivityLog.objects.count(), 8)
@@ -0,0 +1,120 @@
+"""
+Unified project timeline: ActivityLog rows (hot and archived) and
+ProjectUpdate rows merged newest-first and cursor-paginated.
+
+Each page runs one keyset query per table (actors joined in), each limited
+to a page plus one row, and merges the three pre-sorted streams in Python.
+A page therefore costs three queries however long the project's history
+is. Archived logs keep their original ids and count as the same "log"
+source, so the order (timestamp, source, id) descending stays total and
+the cursor never skips or repeats an entry.
+"""
+
+import heapq
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from assanj_portal.pagination import KeysetPage, decode_cursor, encode_cursor
+
+
+TIMELINE_PAGE_SIZE = 50
+
+LOG_SOURCE = 'log'
+UPDATE_SOURCE = 'update'
+
+
+def _entry(source, pk, timestamp, actor, action, note):
+    return {
+        'source': source,
+        'id': pk,
+        'timestamp': timestamp,
+        'actor': actor,
+        'action': action,
+        'note': note,
+    }
+
+
+def _sort_key(entry):
+    return (entry['timestamp'], entry['source'], entry['id'])
+
+
+def _after(source, ts_field, cursor):
+    """Q selecting `source` rows that come after `cursor` in timeline order."""
+    if cursor is None:
+        return Q()
+    ts, cursor_source, cursor_id = cursor
+    if source < cursor_source:
+        return Q(**{f'{ts_field}__lte': ts})
+    if source > cursor_source:
+        return Q(**{f'{ts_field}__lt': ts})
+    return Q(**{f'{ts_field}__lt': ts}) | Q(**{ts_field: ts, 'id__lt': cursor_id})
+
+
+def _log_entries(model, project_id, cursor, limit):
+    logs = (
+        model.objects
+        .filter(_after(LOG_SOURCE, 'timestamp', cursor), entity_type='project', entity_id=project_id)
+        .select_related('performed_by')
+        .order_by('-timestamp', '-id')[:limit]
+    )
+    for log in logs:
+        yield _entry(LOG_SOURCE, log.id, log.timestamp, log.performed_by, log.action, log.note)
+
+
+def _update_entries(project_id, cursor, limit):
+    from projects.models import ProjectUpdate
+    updates = (
+        ProjectUpdate.objects
+        .filter(_after(UPDATE_SOURCE, 'created_at', cursor), project_id=project_id)
+        .select_related('user')
+        .order_by('-created_at', '-id')[:limit]
+    )
+    for update in updates:
+        yield _entry(UPDATE_SOURCE, update.id, update.created_at, update.user, 'project_update', update.message)
+
+
+def _position(values):
+    """Validate decoded cursor values as a (timestamp, source, id) position, else None."""
+    if values is None or len(values) != 3:
+        return None
+    ts, source, pk = values
+    if source not in (LOG_SOURCE, UPDATE_SOURCE) or not isinstance(pk, int) or not isinstance(ts, str):
+        return None
+    try:
+        ts = parse_datetime(ts)
+    except ValueError:
+        return None
+    if ts is None:
+        return None
+    if timezone.is_naive(ts):
+        ts = timezone.make_aware(ts)
+    return ts, source, pk
+
+
+def project_timeline(project_id, cursor=None, per_page=TIMELINE_PAGE_SIZE):
+    """Return a KeysetPage of timeline entries for `project_id` after `cursor`.
+
+    Entries are dicts with source, id, timestamp, actor, action and note. An
+    invalid cursor yields the first page.
+    """
+    from .models import ActivityLog, ArchivedActivityLog
+    position = _position(decode_cursor(cursor))
+    limit = per_page + 1
+    merged = heapq.merge(
+        _log_entries(ActivityLog, project_id, position, limit),
+        _log_entries(ArchivedActivityLog, project_id, position, limit),
+        _update_entries(project_id, position, limit),
+        key=_sort_key, reverse=True,
+    )
+    rows = []
+    for entry in merged:
+        rows.append(entry)
+        if len(rows) == limit:
+            break
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor(list(_sort_key(rows[-1])))
+    return KeysetPage(rows, next_cursor)
@@ -1,11 +1,143 @@
+"""
+Activity logging.
+
+`log_activity` never issues one INSERT per call when it can batch:
+
+* Inside `buffered_activity()` (scripts, management commands, and every
+  request via `ActivityBufferMiddleware`), rows are collected and written
+  with one `bulk_create` when the block exits cleanly.
+* Inside a transaction, each row is handed to that buffer only from its own
+  `transaction.on_commit` callback. A rolled-back transaction or savepoint
+  drops the callback, so nothing is written for work that was undone, and
+  the whole request still costs one INSERT.
+* Inside a transaction with no buffer (management commands, signal
+  handlers, background jobs), the rows join a `TransactionBatch` for that
+  transaction, again through one callback per row, and the last callback
+  to run writes them with one `bulk_create`.
+* Otherwise the row is inserted immediately.
+"""
+
+import weakref
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+
 from .models import ActivityLog
 
 
+BULK_BATCH_SIZE = 500
+
+_active_buffer = ContextVar('activity_buffer', default=None)
+_pending_batch = ContextVar('activity_pending_batch', default=None)
+
+
+class ActivityBatch:
+    """Unsaved ActivityLog rows waiting for one bulk insert."""
+
+    def __init__(self):
+        self.rows = []
+
+    def add(self, row):
+        self.rows.append(row)
+
+    def flush(self):
+        rows, self.rows = self.rows, []
+        if rows:
+            ActivityLog.objects.bulk_create(rows, batch_size=BULK_BATCH_SIZE)
+
+
+class TransactionBatch(ActivityBatch):
+    """Rows logged in one transaction outside `buffered_activity()`.
+
+    Each row gets its own on_commit callback, so a rolled-back savepoint
+    still drops its rows. Only weak references to the callbacks are kept
+    here: one dropped by a rollback is freed, while pending ones stay alive
+    in the transaction's callback list until they run. The callback that
+    finds no later live callback is the last to run, and writes the batch.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = []
+        self.flushed = False
+
+    def _last_live(self):
+        for index in range(len(self.callbacks) - 1, -1, -1):
+            if self.callbacks[index]() is not None:
+                return index
+        return None
+
+    def is_open(self):
+        """True while some callback can still run, i.e. the transaction is still going."""
+        return not self.flushed and self._last_live() is not None
+
+    def register(self, row):
+        callback = partial(self._commit_row, row, len(self.callbacks))
+        self.callbacks.append(weakref.ref(callback))
+        transaction.on_commit(callback)
+
+    def _commit_row(self, row, index):
+        self.add(row)
+        if self._last_live() == index:
+            self.flushed = True
+            self.flush()
+
+
+def _open_transaction_batch():
+    batch = _pending_batch.get()
+    if batch is None or not batch.is_open():
+        batch = TransactionBatch()
+        _pending_batch.set(batch)
+    return batch
+
+
 def log_activity(action, entity_type, entity_id, user=None, note=None):
-    ActivityLog.objects.create(
+    """Record an ActivityLog row, batched as described in the module docstring.
+
+    Returns the row. Unless it was inserted immediately, it is still unsaved
+    (pk is None) when this returns; it gets written when the buffer or
+    transaction it belongs to finishes.
+    """
+    row = ActivityLog(
         action=action,
         entity_type=entity_type,
         entity_id=entity_id,
         performed_by=user,
         note=note
     )
+    buffer = _active_buffer.get()
+    in_transaction = transaction.get_connection(DEFAULT_DB_ALIAS).in_atomic_block
+    if buffer is not None:
+        keep = partial(buffer.add, row)
+        if in_transaction:
+            transaction.on_commit(keep)
+        else:
+            keep()
+    elif in_transaction:
+        _open_transaction_batch().register(row)
+    else:
+        row.save()
+    return row
+
+
+@contextmanager
+def buffered_activity():
+    """Collect `log_activity` calls in the block and write them with one bulk insert.
+
+    Nothing is written if the block raises. Nested blocks share the outer
+    buffer. If the block exits inside a transaction, the write is deferred
+    to that transaction's commit.
+    """
+    outer = _active_buffer.get()
+    if outer is not None:
+        yield outer
+        return
+    batch = ActivityBatch()
+    token = _active_buffer.set(batch)
+    try:
+        yield batch
+    finally:
+        _active_buffer.reset(token)
+    transaction.on_commit(batch.flush)
@@ -1,58 +1,72 @@
+import heapq
+from operator import attrgetter
+
 from django.shortcuts import render
-from .models import ActivityLog
-from accounts.mixins import AdminRequiredMixin
-from django.contrib.auth.decorators import user_passes_test
+from assanj_portal.pagination import KeysetPage, encode_cursor, keyset_paginate
+from .forms import ActivityLogFilterForm
+from .models import ActivityLog, ArchivedActivityLog
+from django.contrib.auth.decorators import login_required
+
+
+ACTIVITY_PAGE_SIZE = 50
+ACTIVITY_ORDERING = ('-timestamp', '-id')
+
+
+def _browse_logs(form, cursor, per_page=ACTIVITY_PAGE_SIZE):
+    """One page of hot and archived logs merged newest-first.
 
+    Archived rows keep their original ids, so (timestamp, id) stays total
+    across both tables and one cursor continues both keyset queries.
+    """
+    pages = []
+    for model in (ActivityLog, ArchivedActivityLog):
+        logs = model.objects.select_related('performed_by')
+        if form.is_valid():
+            logs = form.filter(logs)
+        pages.append(keyset_paginate(logs, ACTIVITY_ORDERING, cursor, per_page))
+    merged = list(heapq.merge(*pages, key=attrgetter('timestamp', 'id'), reverse=True))
+    if len(merged) <= per_page and not any(page.has_next for page in pages):
+        return KeysetPage(merged, None)
+    rows = merged[:per_page]
+    return KeysetPage(rows, encode_cursor([rows[-1].timestamp, rows[-1].id]))
 
-@user_passes_test(lambda u: hasattr(u, 'profile') and (u.profile.has_role('admin') or u.profile.has_role('project_manager')))
+
+# Restricted to admin/project_manager by accounts.policy.ACCESS_POLICY
+@login_required
 def activity_logs(request):
-    logs = ActivityLog.objects.all()[:200]
-    return render(request, 'activity_logs.html', {'logs': logs})
+    """Global log browser: indexed filters plus keyset pagination on (timestamp, id)."""
+    form = ActivityLogFilterForm(request.GET)
+    page = _browse_logs(form, request.GET.get('cursor'))
+
+    # Keep the active filters on the "older" link
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    return render(request, 'activity_logs.html', {
+        'logs': page.items,
+        'filter_form': form,
+        'next_cursor': page.next_cursor,
+        'filter_query': params.urlencode(),
+    })
 
 
 def can_view_project_logs(user, project_id):
-    # Admins can always view; others must be part of the project team or creator
-    try:
-        from projects.models import Project
-        project = Project.objects.get(pk=project_id)
-    except Exception:
-        return False
-    if (
-        user.is_superuser
-        or (
-            hasattr(user, 'profile')
-            and (
-                user.profile.has_role('admin')
-                or user.profile.has_role('project_manager')
-            )
-        )
-    ):
-        return True
-    if user == project.created_by or user == project.assigned_to or user in project.assigned_team.all():
-        return True
-    return False
+    # Staff roles see every project; others must be the creator, the assigned
+    # developer or on the team. One EXISTS query (see ProjectQuerySet.can_view).
+    from projects.models import Project
+    return Project.objects.can_view(user, project_id)
 
 
+@login_required
 def activity_logs_for_project(request, pk):
     if not can_view_project_logs(request.user, pk):
         from django.http import HttpResponseForbidden
         return HttpResponseForbidden('You do not have permission to view these logs.')
 
-    # Fetch ActivityLog entries for this project
-    activity_logs = list(ActivityLog.objects.filter(entity_type='project', entity_id=pk)[:500])
-
-    # Also include ProjectUpdate entries so developers' notes appear in project activity
-    from projects.models import ProjectUpdate
-    updates = list(ProjectUpdate.objects.filter(project_id=pk)[:500])
-
-    # Normalize entries into a common structure and merge-sort by timestamp descending
-    normalized = []
-    for a in activity_logs:
-        normalized.append({'timestamp': a.timestamp, 'actor': a.performed_by, 'action': a.action, 'note': a.note})
-    for u in updates:
-        normalized.append({'timestamp': u.created_at, 'actor': u.user, 'action': 'project_update', 'note': u.message})
-
-    # Sort by timestamp desc
-    normalized.sort(key=lambda x: x['timestamp'], reverse=True)
+    from .timeline import project_timeline
+    page = project_timeline(pk, request.GET.get('cursor'))
 
-    return render(request, 'activity_logs_project.html', {'logs': normalized, 'project_id': pk})
+    return render(request, 'activity_logs_project.html', {
+        'logs': page.items,
+        'next_cursor': page.next_cursor,
+        'project_id': pk,
+    })
@@ -0,0 +1,138 @@
+"""
+Keyset (cursor) pagination shared by the dashboards and log viewers.
+
+Instead of OFFSET, each page continues from the ordering key of the last row
+of the previous page, so every page is an index range scan no matter how
+deep the user scrolls. Cursors are opaque url-safe strings.
+"""
+
+import base64
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+DEFAULT_PAGE_SIZE = 20
+
+# What a tampered cursor value can raise when it is turned into a lookup
+CURSOR_ERRORS = (ValueError, TypeError, ValidationError)
+# Keep cursor integers inside a signed 64-bit column
+_INT_LIMIT = 2 ** 63
+
+
+class KeysetPage:
+    """One page of results plus the cursor for the next page (or None)."""
+
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def encode_cursor(values):
+    """Encode a list of ordering-key values as an opaque cursor string."""
+    raw = json.dumps([_jsonable(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _is_cursor_value(value):
+    if isinstance(value, bool) or value is None:
+        return False
+    if isinstance(value, int):
+        return -_INT_LIMIT <= value < _INT_LIMIT
+    if isinstance(value, float):
+        return math.isfinite(value)
+    return isinstance(value, str)
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by `encode_cursor`; return None if it is invalid.
+
+    Only a list of strings and finite numbers is accepted; whether those
+    values suit the ordering fields is checked when the filter is built.
+    """
+    if not cursor:
+        return None
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(values, list) or not all(_is_cursor_value(v) for v in values):
+        return None
+    return values
+
+
+def _field_name(ordering):
+    return ordering.lstrip('-')
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
+
+
+def keyset_filter(ordering, values):
+    """Return a Q selecting rows strictly after `values` in `ordering`.
+
+    All ordering fields must share one direction, e.g. ('-timestamp', '-id').
+    """
+    descending = ordering[0].startswith('-')
+    op = 'lt' if descending else 'gt'
+    names = [_field_name(o) for o in ordering]
+    condition = Q()
+    for i, name in enumerate(names):
+        term = Q(**{f'{name}__{op}': values[i]})
+        for prev_name, prev_value in zip(names[:i], values[:i]):
+            term &= Q(**{prev_name: prev_value})
+        condition |= term
+    return condition
+
+
+def keyset_paginate(queryset, ordering, cursor=None, per_page=DEFAULT_PAGE_SIZE):
+    """Return a KeysetPage of `queryset` ordered by `ordering`, starting after `cursor`.
+
+    The last ordering field must be unique (normally the primary key) so the
+    order is total. An invalid cursor yields the first page.
+    """
+    ordering = tuple(ordering)
+    values = decode_cursor(cursor)
+    queryset = queryset.order_by(*ordering)
+    if values is not None and len(values) == len(ordering):
+        try:
+            queryset = queryset.filter(keyset_filter(ordering, values))
+        except CURSOR_ERRORS:
+            # Values that do not fit the fields (e.g. "abc" for a datetime)
+            pass
+    rows = list(queryset[:per_page + 1])
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor([_row_value(last, _field_name(o)) for o in ordering])
+    return KeysetPage(rows, next_cursor)
@@ -0,0 +1,62 @@
+"""
+Phone number normalization for duplicate detection.
+
+`phone_key()` reduces a free-form phone string to the digits of its national
+number, so "+91 98765 43210", "0091 98765-43210", "098765 43210" and
+"919876543210" share one key. Lead and Client store the key in an indexed `phone_key` column and
+look duplicates up with `PhoneKeyQuerySet.same_phone()`.
+
+Rules, in order:
+  * everything but digits is dropped; a leading "+" or "00" marks an
+    international number;
+  * an international number in the home country (settings.PHONE_COUNTRY_CODE)
+    loses the country code, other countries keep theirs;
+  * a national number loses one leading trunk "0";
+  * otherwise, a number exactly as long as the country code plus a national
+    number (settings.PHONE_NATIONAL_LENGTH) that starts with the code is an
+    international number typed without the "+", and loses the code.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import models
+
+
+PHONE_KEY_MAX_LENGTH = 32
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+def phone_key(value):
+    """Return the normalized key for phone string `value` ('' if it has no digits)."""
+    value = (value or '').strip()
+    digits = _NON_DIGITS.sub('', value)
+    if not digits:
+        return ''
+    country_code = getattr(settings, 'PHONE_COUNTRY_CODE', '')
+    international = value.startswith('+')
+    if not international and digits.startswith('00'):
+        digits, international = digits[2:], True
+    if international:
+        if country_code and digits.startswith(country_code):
+            digits = digits[len(country_code):]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    elif (
+        country_code and digits.startswith(country_code)
+        and len(digits) == len(country_code) + getattr(settings, 'PHONE_NATIONAL_LENGTH', 0)
+    ):
+        digits = digits[len(country_code):]
+    return digits[:PHONE_KEY_MAX_LENGTH]
+
+
+class PhoneKeyQuerySet(models.QuerySet):
+    """QuerySet for models with an indexed `phone_key` column."""
+
+    def same_phone(self, value):
+        """Rows whose phone normalizes to the same key as `value` (an index lookup)."""
+        key = phone_key(value)
+        if not key:
+            return self.none()
+        return self.filter(phone_key=key)
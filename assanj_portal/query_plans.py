@@ -0,0 +1,59 @@
+"""
+Query-plan inspection used by the index regression tests.
+
+`plan_problems(queryset)` runs EXPLAIN and returns the plan lines that show
+a table or index scan or a temporary sort, on SQLite or PostgreSQL. An
+empty list means every table is reached by an index search and the ordering
+comes straight from an index.
+"""
+
+import re
+
+from django.db import connections
+
+
+# SQLite: any "SCAN t" (with or without an index), or "USE TEMP B-TREE FOR ORDER BY/GROUP BY"
+_SQLITE_SCAN = re.compile(r'\bSCAN\b')
+_SQLITE_INDEX_SCAN = re.compile(r'\bSCAN \S+ USING (COVERING )?INDEX\b')
+_SQLITE_TEMP_SORT = re.compile(r'USE TEMP B-TREE')
+
+# PostgreSQL: sequential scans and explicit sort nodes
+_PG_SCAN = re.compile(r'\bSeq Scan on\b')
+_PG_SORT = re.compile(r'(?<!Incremental )\bSort\b(?! Key| Method)')
+
+
+def explain(queryset):
+    """Return the EXPLAIN output for `queryset` as a list of lines.
+
+    On PostgreSQL sequential scans are disabled for the statement, because
+    the planner prefers them on small test tables. That only proves an index
+    *can* serve the query, not that the planner will pick it at production
+    sizes; check EXPLAIN against real data before relying on it.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain().splitlines()
+
+
+def plan_problems(queryset, allow_index_scan=False):
+    """Return the EXPLAIN lines showing a scan or a temp sort.
+
+    `allow_index_scan` accepts SQLite "SCAN t USING [COVERING] INDEX" lines
+    for queries that have to read every row anyway (a whole-table GROUP BY)
+    or read an index in order and stop at a LIMIT.
+    """
+    vendor = connections[queryset.db].vendor
+    if vendor == 'sqlite':
+        patterns = (_SQLITE_SCAN, _SQLITE_TEMP_SORT)
+    elif vendor == 'postgresql':
+        patterns = (_PG_SCAN, _PG_SORT)
+    else:
+        return []
+    return [
+        line for line in explain(queryset)
+        if any(p.search(line) for p in patterns)
+        and not (allow_index_scan and vendor == 'sqlite' and _SQLITE_INDEX_SCAN.search(line)
+                 and not _SQLITE_TEMP_SORT.search(line))
+    ]
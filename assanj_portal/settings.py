@@ -68,8 +68,14 @@ MIDDLEWARE = [
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    # Resolve the user's role set once per request (see accounts.roles)
+    "accounts.middleware.RoleMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
+    # Role checks for views listed in accounts.policy.ACCESS_POLICY
+    "accounts.middleware.AccessPolicyMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    # One bulk insert for the request's activity log rows (see activity.utils)
+    "activity.middleware.ActivityBufferMiddleware",
 ]
 
 
@@ -129,6 +135,21 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Activity log rows older than this move to the archive (manage.py archive_activity)
+ACTIVITY_LOG_RETENTION_DAYS = 180
+
+# The lead CSV upload runs inside the request; bigger files go through
+# manage.py import_leads (see leads.importer)
+LEAD_IMPORT_MAX_UPLOAD_SIZE = 2 * 1024 * 1024
+LEAD_IMPORT_MAX_ROWS = 5000
+
+# Home country calling code; "+<code>" numbers share a duplicate key with
+# national ones (see assanj_portal.phones)
+PHONE_COUNTRY_CODE = os.getenv('PHONE_COUNTRY_CODE', '91')
+# Digits in a home-country national number; "<code><national>" typed without
+# the "+" is recognised by this length
+PHONE_NATIONAL_LENGTH = int(os.getenv('PHONE_NATIONAL_LENGTH', '10'))
+
 # Authentication redirects
 LOGIN_URL = '/login/'
 LOGIN_REDIRECT_URL = '/'
@@ -6,6 +6,8 @@ Each client belongs to a fetcher who registered them.
 from django.db import models
 from django.contrib.auth.models import User
 
+from assanj_portal.phones import PHONE_KEY_MAX_LENGTH, PhoneKeyQuerySet, phone_key
+
 
 class Client(models.Model):
     """
@@ -21,18 +23,32 @@ class Client(models.Model):
     full_name = models.CharField(max_length=200)
     business_name = models.CharField(max_length=200)
     phone = models.CharField(max_length=20)
+    # Normalized phone for duplicate lookups (see assanj_portal.phones)
+    phone_key = models.CharField(max_length=PHONE_KEY_MAX_LENGTH, blank=True, default='', editable=False)
     email = models.EmailField()
     city = models.CharField(max_length=100)
     business_category = models.CharField(max_length=100)
     user = models.OneToOneField(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='client')
     date_created = models.DateTimeField(auto_now_add=True)
-    
+
+    objects = PhoneKeyQuerySet.as_manager()
+
     class Meta:
         ordering = ['-date_created']
-    
+        indexes = [
+            models.Index(fields=['phone_key'], name='client_phone_key_idx'),
+        ]
+
     def __str__(self):
         return f"{self.business_name} - {self.full_name}"
 
+    def save(self, *args, **kwargs):
+        self.phone_key = phone_key(self.phone)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_key'}
+        super().save(*args, **kwargs)
+
 
 # Ensure that if a Client is linked to a Django User, that user's profile has the 'client' role
 from django.db.models.signals import post_save
@@ -45,7 +61,8 @@ def assign_client_role(sender, instance, created, **kwargs):
         if instance.user:
             from accounts.models import UserProfile
             profile, _ = UserProfile.objects.get_or_create(user=instance.user)
-            # Add role using helper (creates Role if missing)
+            # Add role using helper (creates Role if missing and bumps the
+            # user's cached role-set version)
             profile.add_role('client')
             profile.save()
     except Exception:
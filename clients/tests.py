@@ -1,3 +1,67 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.test import TestCase, Client as HttpClient, override_settings
+from django.urls import reverse
 
-# Create your tests here.
+from assanj_portal.phones import phone_key
+from clients.models import Client
+
+
+@override_settings(PHONE_COUNTRY_CODE='1')
+class PhoneKeyTests(TestCase):
+    def test_formats_of_one_number_share_a_key(self):
+        for raw in ('+1 (555) 123-4567', '001 555 123 4567', '555.123.4567', '(555) 1234567'):
+            self.assertEqual(phone_key(raw), '5551234567', raw)
+
+    def test_foreign_numbers_keep_their_country_code(self):
+        self.assertEqual(phone_key('+44 20 7946 0958'), '442079460958')
+        self.assertEqual(phone_key('0044 20 7946 0958'), '442079460958')
+
+    def test_national_trunk_zero_is_dropped(self):
+        self.assertEqual(phone_key('020 7946 0958'), '2079460958')
+
+    def test_country_code_typed_without_plus_is_dropped(self):
+        self.assertEqual(phone_key('15551234567'), '5551234567')
+        # Only at exactly code + national length
+        self.assertEqual(phone_key('1555123'), '1555123')
+        with self.settings(PHONE_COUNTRY_CODE='91'):
+            self.assertEqual(phone_key('919876543210'), phone_key('+91 98765 43210'))
+            self.assertEqual(phone_key('9198765432'), '9198765432')
+
+    def test_no_digits_gives_empty_key(self):
+        self.assertEqual(phone_key(''), '')
+        self.assertEqual(phone_key(None), '')
+        self.assertEqual(phone_key('n/a'), '')
+
+    def test_key_is_kept_on_save(self):
+        owner = User.objects.create_user(username='owner', password='pass')
+        client = Client.objects.create(created_by=owner, business_name='B', phone='+1 555 123 4567')
+        self.assertEqual(client.phone_key, '5551234567')
+        client.phone = '555-999-0000'
+        client.save(update_fields=['phone'])
+        client.refresh_from_db()
+        self.assertEqual(client.phone_key, '5559990000')
+        self.assertEqual(list(Client.objects.same_phone('(555) 999 0000')), [client])
+        self.assertFalse(Client.objects.same_phone('').exists())
+
+
+class CreateClientDuplicateTests(TestCase):
+    def setUp(self):
+        self.c = HttpClient()
+        self.closer = User.objects.create_user(username='closer', password='pass')
+        self.closer.profile.add_role('sales_closer')
+        Client.objects.create(created_by=self.closer, business_name='Existing Co', phone='98765 43210')
+
+    def _post(self, phone):
+        self.c.login(username='closer', password='pass')
+        return self.c.post(reverse('clients:fetcher_add_client'), {
+            'full_name': 'N', 'business_name': 'New Co', 'phone': phone,
+            'email': 'n@example.com', 'city': 'X', 'business_category': 'Y',
+        }, follow=True)
+
+    def test_warns_about_existing_client_with_same_phone(self):
+        resp = self._post('+91 98765 43210')
+        self.assertIn('Existing Co', ' '.join(str(m) for m in resp.context['messages']))
+
+    def test_no_warning_for_new_phone(self):
+        resp = self._post('91234 56789')
+        self.assertNotIn('already exists', ' '.join(str(m) for m in resp.context['messages']))
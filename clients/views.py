@@ -49,6 +49,11 @@ class CreateClientView(SalesCloserRequiredMixin, CreateView):
         self.request.session['new_client_data'] = client_data
         self.request.session.modified = True
 
+        # Indexed phone_key lookup for an existing client with this number
+        duplicate = Client.objects.same_phone(form.cleaned_data.get('phone')).values('business_name').first()
+        if duplicate:
+            messages.warning(self.request, f"A client with this phone number already exists: {duplicate['business_name']}.")
+
         return redirect('projects:fetcher_add_project')
 
 
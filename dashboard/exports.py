@@ -0,0 +1,244 @@
+"""
+Streaming CSV / NDJSON exports for accounting.
+
+Each dataset is a `values_list()` query read with `.iterator(chunk_size=...)`
+and encoded chunk by chunk, so memory stays flat however many rows are
+exported. Used by the export endpoint and the `export_data` command.
+
+CSV text cells that a spreadsheet would read as a formula (leading "=",
+"+", "-" or "@") are prefixed with "'".
+"""
+
+import csv
+import json
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class ExportError(ValueError):
+    """Raised for an unknown dataset/format or an invalid filter value."""
+
+
+class Dataset:
+    """One exportable table: its queryset, columns (header, field path) and filter fields."""
+
+    def __init__(self, model_path, columns, date_field, status_field, status_choices=None):
+        self.model_path = model_path
+        self.columns = columns
+        self.date_field = date_field
+        self.status_field = status_field
+        self.status_choices = status_choices
+
+    @property
+    def model(self):
+        from django.apps import apps
+        return apps.get_model(self.model_path)
+
+    @property
+    def headers(self):
+        return [header for header, _ in self.columns]
+
+    def queryset(self, date_from=None, date_to=None, status=None):
+        model = self.model
+        qs = model._default_manager.all()
+        if date_from:
+            qs = qs.filter(**{f'{self.date_field}__gte': _start_of(date_from)})
+        if date_to:
+            qs = qs.filter(**{f'{self.date_field}__lt': _start_of(date_to + timedelta(days=1))})
+        if status:
+            choices = self.status_choices(model) if self.status_choices else None
+            if choices is not None and status not in choices:
+                raise ExportError(f'Unknown status {status!r}.')
+            qs = qs.filter(**{self.status_field: status})
+        return qs.order_by(self.date_field, 'id').values_list(*[field for _, field in self.columns])
+
+
+def _status_values(attr, relation=None):
+    """Allowed status filter values: `attr` choices on the model, or on its `relation` FK target."""
+    def values(model):
+        if relation:
+            model = model._meta.get_field(relation).related_model
+        return {value for value, _ in getattr(model, attr)}
+    return values
+
+
+DATASETS = {
+    'activity': Dataset(
+        'activity.ActivityLog',
+        columns=[
+            ('id', 'id'),
+            ('timestamp', 'timestamp'),
+            ('action', 'action'),
+            ('entity_type', 'entity_type'),
+            ('entity_id', 'entity_id'),
+            ('performed_by', 'performed_by__username'),
+            ('note', 'note'),
+        ],
+        date_field='timestamp',
+        # "status" for activity is the action name, free-form
+        status_field='action',
+    ),
+    'projects': Dataset(
+        'projects.Project',
+        columns=[
+            ('id', 'id'),
+            ('date_created', 'date_created'),
+            ('status', 'status'),
+            ('current_stage', 'current_stage'),
+            ('project_type', 'project_type'),
+            ('client_business_name', 'client__business_name'),
+            ('client_full_name', 'client__full_name'),
+            ('client_email', 'client__email'),
+            ('client_phone', 'client__phone'),
+            ('created_by', 'created_by__username'),
+            ('assigned_to', 'assigned_to__username'),
+            ('total_price', 'total_price'),
+            ('payment_status', 'payment_status'),
+            ('admin_payment_released', 'admin_payment_released'),
+            ('fetcher_commission_amount', 'fetcher_commission_amount'),
+            ('developer_payout_amount', 'developer_payout_amount'),
+            ('designer_payout_amount', 'designer_payout_amount'),
+            ('seo_payout_amount', 'seo_payout_amount'),
+            ('gbp_payout_amount', 'gbp_payout_amount'),
+            ('social_media_payout_amount', 'social_media_payout_amount'),
+            ('agency_profit', 'agency_profit'),
+            ('date_completed', 'date_completed'),
+        ],
+        date_field='date_created',
+        status_field='status',
+        status_choices=_status_values('STATUS_CHOICES'),
+    ),
+    # Per-user payout ledger (fetcher, developer, role and manual per-user amounts)
+    'payouts': Dataset(
+        'projects.PayoutEntry',
+        columns=[
+            ('id', 'id'),
+            ('project_id', 'project_id'),
+            ('project_date_created', 'project__date_created'),
+            ('project_status', 'project__status'),
+            ('client_business_name', 'project__client__business_name'),
+            ('user', 'user__username'),
+            ('role', 'role'),
+            ('amount', 'amount'),
+            ('released', 'released'),
+        ],
+        date_field='project__date_created',
+        status_field='project__status',
+        status_choices=_status_values('STATUS_CHOICES', relation='project'),
+    ),
+    'leads': Dataset(
+        'leads.Lead',
+        columns=[
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('business_name', 'business_name'),
+            ('phone_number', 'phone_number'),
+            ('category', 'category'),
+            ('other_category', 'other_category'),
+            ('status', 'status'),
+            ('created_by', 'created_by__username'),
+            ('assigned_sales_closer', 'assigned_sales_closer__username'),
+        ],
+        date_field='created_at',
+        status_field='status',
+        status_choices=_status_values('STATUS_CHOICES'),
+    ),
+}
+
+
+def _start_of(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def parse_filters(date_from=None, date_to=None, status=None):
+    """Validate raw filter strings; return kwargs for `export_chunks`."""
+    filters = {'status': status or None}
+    for name, raw in (('date_from', date_from), ('date_to', date_to)):
+        value = None
+        if raw:
+            try:
+                value = parse_date(raw)
+            except ValueError:
+                value = None
+            if value is None:
+                raise ExportError(f'{name} must be a date (YYYY-MM-DD).')
+        filters[name] = value
+    return filters
+
+
+def get_dataset(name):
+    try:
+        return DATASETS[name]
+    except KeyError:
+        raise ExportError(f'Unknown dataset {name!r}; choose from {", ".join(DATASETS)}.')
+
+
+# Leading characters that make spreadsheets evaluate a cell as a formula
+FORMULA_PREFIXES = ('=', '+', '-', '@')
+
+
+def _csv_cell(value):
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return _cell(value)
+
+
+def _cell(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class _Echo:
+    """File-like object whose write() returns the line for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow([_csv_cell(v) for v in row])
+
+
+def _ndjson_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(headers, map(_cell, row))), ensure_ascii=False) + '\n'
+
+
+def export_chunks(name, fmt='csv', chunk_size=EXPORT_CHUNK_SIZE, **filters):
+    """Yield the export of dataset `name` as text chunks of up to `chunk_size` rows.
+
+    Validation happens before the first chunk, so errors surface as
+    ExportError from this call rather than mid-stream.
+    """
+    dataset = get_dataset(name)
+    if fmt not in EXPORT_FORMATS:
+        raise ExportError(f'Unknown format {fmt!r}; choose from {", ".join(EXPORT_FORMATS)}.')
+    rows = dataset.queryset(**filters).iterator(chunk_size=chunk_size)
+    encode = _csv_lines if fmt == 'csv' else _ndjson_lines
+    lines = encode(dataset.headers, rows)
+    return _join_chunks(lines, chunk_size)
+
+
+def _join_chunks(lines, size):
+    while True:
+        chunk = ''.join(islice(lines, size))
+        if not chunk:
+            return
+        yield chunk
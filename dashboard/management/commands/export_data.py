@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from dashboard.exports import DATASETS, EXPORT_CHUNK_SIZE, EXPORT_FORMATS, ExportError, export_chunks, parse_filters
+
+
+class Command(BaseCommand):
+    help = 'Stream activity logs, projects or leads as CSV or NDJSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=sorted(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--date-from', help='Only rows on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--date-to', help='Only rows on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--status', help='Only rows with this status (action name for activity).')
+        parser.add_argument('--output', '-o', help='Write to this file instead of stdout.')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            filters = parse_filters(options['date_from'], options['date_to'], options['status'])
+            chunks = export_chunks(options['dataset'], options['format'], options['chunk_size'], **filters)
+        except ExportError as exc:
+            raise CommandError(str(exc))
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as fh:
+                for chunk in chunks:
+                    fh.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
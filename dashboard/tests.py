@@ -1,3 +1,4 @@
+from django.db.models import Count
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
@@ -39,3 +40,242 @@ class ClientDashboardTests(TestCase):
         # Recent updates and activity should be in the rendered page
         self.assertContains(resp, 'Initial update')
         self.assertContains(resp, 'Created')
+
+
+class ClientFeedTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.c = Client()
+        self.user = User.objects.create_user(username='feeduser', password='pass')
+        self.user.profile.add_role('client')
+        business = BusinessClient.objects.create(created_by=self.user, full_name='O', business_name='Feed', phone='1', email='a@b.com', city='X', business_category='Other', user=self.user)
+        self.projects = []
+        for n in range(3):
+            proj = Project.objects.create(client=business, created_by=self.user, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='', contact_info_address='', deadline='2099-12-31', status='assigned')
+            ProjectUpdate.objects.bulk_create([ProjectUpdate(project=proj, user=self.user, message=f'u{i}') for i in range(7)])
+            ActivityLog.objects.bulk_create([ActivityLog(action='update', entity_type='project', entity_id=proj.id, performed_by=self.user) for i in range(12)])
+            self.projects.append(proj)
+
+    def feed_queries(self, ctx):
+        return [q['sql'] for q in ctx.captured_queries if 'projects_projectupdate' in q['sql'] or 'activity_activitylog' in q['sql']]
+
+    def test_feed_is_two_windowed_queries_then_cached(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        self.c.login(username='feeduser', password='pass')
+        url = reverse('dashboard:client_dashboard')
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.c.get(url)
+        feed = self.feed_queries(ctx)
+        self.assertEqual(len(feed), 2)
+        self.assertTrue(all('ROW_NUMBER' in sql for sql in feed))
+        for p in resp.context['projects']:
+            self.assertEqual([u.message for u in p.recent_updates], ['u6', 'u5', 'u4', 'u3', 'u2'])
+            self.assertEqual(len(p.recent_logs), 10)
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.c.get(url)
+        self.assertEqual(self.feed_queries(ctx), [])
+        self.assertEqual(len(resp.context['projects'][0].recent_updates), 5)
+
+
+class DashboardLandingTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.closer = User.objects.create_user(username='closer', password='pass')
+        self.closer.profile.roles.clear()
+        self.closer.profile.add_role('sales_closer')
+
+    def test_login_lands_directly_on_role_dashboard(self):
+        resp = self.c.post(reverse('accounts:login'), {'username': 'closer', 'password': 'pass'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertEqual(resp['Location'], reverse('leads:sales_closer_dashboard'))
+
+    def test_router_reuses_session_landing(self):
+        self.c.login(username='closer', password='pass')
+        self.c.get(reverse('dashboard:dashboard'))
+        self.assertEqual(self.c.session['dashboard_landing']['url'], 'leads:sales_closer_dashboard')
+        with self.assertNumQueries(3):
+            # session, user and role mask; the landing itself comes from the session
+            resp = self.c.get(reverse('dashboard:dashboard'))
+        self.assertEqual(resp['Location'], reverse('leads:sales_closer_dashboard'))
+
+    def test_role_change_recomputes_landing(self):
+        self.c.login(username='closer', password='pass')
+        self.c.get(reverse('dashboard:dashboard'))
+        self.closer.profile.add_role('project_manager')
+        resp = self.c.get(reverse('dashboard:dashboard'))
+        self.assertEqual(resp['Location'], reverse('projects:admin_projects'))
+
+
+class ClientFeedArchiveTests(TestCase):
+    def test_archived_project_logs_fill_the_feed(self):
+        from activity.models import ArchivedActivityLog
+        user = User.objects.create_user(username='feed_client', password='pass')
+        user.profile.add_role('client')
+        business = BusinessClient.objects.create(created_by=user, full_name='Owner', business_name='Feed', phone='1', email='a@b.com', city='C', business_category='Other', user=user)
+        project = Project.objects.create(client=business, created_by=user, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31')
+        ActivityLog.objects.create(action='update', entity_type='project', entity_id=project.pk, note='hot entry')
+        ArchivedActivityLog.objects.create(id=10 ** 6, action='create', entity_type='project', entity_id=project.pk, timestamp='2020-01-01T00:00:00Z', note='archived entry')
+        c = Client()
+        c.login(username='feed_client', password='pass')
+        resp = c.get(reverse('dashboard:client_dashboard'))
+        self.assertEqual(resp.status_code, 200)
+        notes = [log.note for log in resp.context['projects'][0].recent_logs]
+        self.assertEqual(notes, ['hot entry', 'archived entry'])
+
+
+class DashboardQueryPlanTests(TestCase):
+    """EXPLAIN every hot dashboard query against a seeded dataset.
+
+    Fails when a plan scans a table or index or sorts in a temp B-tree, so a
+    dropped index or a query that stops matching one is caught in CI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        from django.db import connection
+        from leads.models import Lead
+
+        cls.users = [User.objects.create_user(username=f'plan_{i}', password='pass') for i in range(20)]
+        business = BusinessClient.objects.create(created_by=cls.users[0], full_name='O', business_name='Plans', phone='1', email='a@b.com', city='C', business_category='Other')
+        statuses = [s for s, _ in Project.STATUS_CHOICES]
+        Project.objects.bulk_create([
+            Project(
+                client=business, created_by=cls.users[i % 20], assigned_to=cls.users[(i + 7) % 20],
+                project_type='custom', website_type='business', business_description='',
+                contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='',
+                deadline='2099-12-31', status=statuses[i % len(statuses)],
+                admin_payment_released=bool(i % 2),
+            )
+            for i in range(2000)
+        ])
+        lead_statuses = [s for s, _ in Lead.STATUS_CHOICES]
+        Lead.objects.bulk_create([
+            Lead(
+                business_name=f'Lead {i}', phone_number=str(i), category='Other',
+                status=lead_statuses[i % len(lead_statuses)],
+                created_by=cls.users[i % 20], assigned_sales_closer=cls.users[(i + 3) % 20],
+            )
+            for i in range(2000)
+        ])
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action='update', entity_type='project' if i % 3 else 'lead', entity_id=i % 500, performed_by=cls.users[i % 20])
+            for i in range(4000)
+        ])
+        if connection.vendor in ('sqlite', 'postgresql'):
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def assertIndexedPlan(self, queryset, allow_index_scan=False):
+        from assanj_portal.query_plans import plan_problems
+        problems = plan_problems(queryset, allow_index_scan=allow_index_scan)
+        self.assertEqual(problems, [], f'Unindexed plan for:\n{queryset.query}')
+
+    def test_admin_status_buckets(self):
+        from projects.views import ADMIN_BUCKET_ORDERING
+        # counting every row: a covering index scan is the best there is
+        self.assertIndexedPlan(Project.objects.order_by().values('status').annotate(n=Count('pk')), allow_index_scan=True)
+        self.assertIndexedPlan(Project.objects.filter(status='assigned').order_by(*ADMIN_BUCKET_ORDERING)[:21])
+
+    def test_fetcher_dashboard(self):
+        user = self.users[1]
+        self.assertIndexedPlan(Project.objects.visible_to(user, 'created').filter(status='new'))
+        self.assertIndexedPlan(Project.objects.visible_to(user, 'created').filter(status__in=['assigned', 'in_progress']))
+
+    def test_developer_dashboard(self):
+        user = self.users[2]
+        self.assertIndexedPlan(Project.objects.visible_to(user, 'assigned').filter(status='in_progress'))
+        self.assertIndexedPlan(Project.objects.visible_to(user, 'execution'))
+        self.assertIndexedPlan(Project.objects.visible_to(user, 'execution').filter(status='in_progress'))
+
+    def test_payment_release_queue(self):
+        self.assertIndexedPlan(Project.objects.filter(status='completed', admin_payment_released=False))
+
+    def test_lead_dashboards(self):
+        from leads.models import Lead
+        user = self.users[3]
+        self.assertIndexedPlan(Lead.objects.filter(created_by=user).order_by('-created_at'))
+        self.assertIndexedPlan(Lead.objects.filter(assigned_sales_closer=user, status='meeting_booked'))
+        self.assertIndexedPlan(Lead.objects.order_by().values('status').annotate(n=Count('pk')), allow_index_scan=True)
+
+    def test_project_activity_log(self):
+        self.assertIndexedPlan(ActivityLog.objects.filter(entity_type='project', entity_id=42).order_by('-timestamp')[:10])
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        from leads.models import Lead
+        self.c = Client()
+        self.admin = User.objects.create_user(username='exporter', password='pass')
+        self.admin.profile.add_role('admin')
+        business = BusinessClient.objects.create(created_by=self.admin, full_name='Owner, Jr', business_name='Export Co', phone='1', email='a@b.com', city='C', business_category='Other')
+        for status in ('new', 'completed', 'completed'):
+            Project.objects.create(client=business, created_by=self.admin, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31', status=status, fetcher_commission_amount='125.50')
+        Lead.objects.create(business_name='L', phone_number='9', category='Other', created_by=self.admin)
+
+    def test_csv_export_streams_filtered_projects(self):
+        import csv
+        self.c.login(username='exporter', password='pass')
+        resp = self.c.get(reverse('dashboard:export_data', args=['projects']), {'status': 'completed'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        self.assertIn('attachment', resp['Content-Disposition'])
+        rows = list(csv.DictReader(b''.join(resp.streaming_content).decode().splitlines()))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['client_full_name'], 'Owner, Jr')
+        self.assertEqual(rows[0]['fetcher_commission_amount'], '125.50')
+
+    def test_ndjson_export_and_bad_filters(self):
+        import json
+        self.c.login(username='exporter', password='pass')
+        url = reverse('dashboard:export_data', args=['leads'])
+        resp = self.c.get(url, {'format': 'ndjson', 'date_from': '2000-01-01'})
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['business_name'] for line in lines], ['L'])
+        self.assertEqual(self.c.get(url, {'date_to': 'yesterday'}).status_code, 400)
+        self.assertEqual(self.c.get(url, {'status': 'bogus'}).status_code, 400)
+        self.assertEqual(self.c.get(reverse('dashboard:export_data', args=['users'])).status_code, 400)
+
+    def test_csv_cells_cannot_start_formulas(self):
+        import csv
+        import json
+        from leads.models import Lead
+        Lead.objects.create(business_name='=HYPERLINK("http://x")', phone_number='+91 98765 43210', category='Other', other_category='@SUM(A1)', created_by=self.admin)
+        self.c.login(username='exporter', password='pass')
+        url = reverse('dashboard:export_data', args=['leads'])
+        rows = list(csv.DictReader(b''.join(self.c.get(url).streaming_content).decode().splitlines()))
+        self.assertEqual(rows[-1]['business_name'], '\'=HYPERLINK("http://x")')
+        self.assertEqual(rows[-1]['phone_number'], "'+91 98765 43210")
+        self.assertEqual(rows[-1]['other_category'], "'@SUM(A1)")
+        # NDJSON is data, not a spreadsheet: values stay as stored
+        lines = b''.join(self.c.get(url, {'format': 'ndjson'}).streaming_content).decode().splitlines()
+        self.assertEqual(json.loads(lines[-1])['business_name'], '=HYPERLINK("http://x")')
+
+    def test_payout_ledger_export(self):
+        import csv
+        self.c.login(username='exporter', password='pass')
+        url = reverse('dashboard:export_data', args=['payouts'])
+        rows = list(csv.DictReader(b''.join(self.c.get(url, {'status': 'completed'}).streaming_content).decode().splitlines()))
+        self.assertEqual(
+            [(r['user'], r['role'], r['amount'], r['project_status']) for r in rows],
+            [('exporter', 'fetcher', '125.50', 'completed')] * 2,
+        )
+        self.assertEqual(self.c.get(url, {'status': 'bogus'}).status_code, 400)
+
+    def test_export_requires_staff_role(self):
+        caller = User.objects.create_user(username='export_caller', password='pass')
+        caller.profile.add_role('cold_caller')
+        self.c.login(username='export_caller', password='pass')
+        resp = self.c.get(reverse('dashboard:export_data', args=['projects']))
+        self.assertEqual(resp.status_code, 302)
+
+    def test_command_writes_in_chunks(self):
+        from io import StringIO
+        from django.core.management import call_command
+        out = StringIO()
+        call_command('export_data', 'projects', '--status', 'new', '--chunk-size', '1', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith('id,date_created,status'))
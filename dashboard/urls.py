@@ -13,4 +13,5 @@ urlpatterns = [
     path('execution/', views.execution_dashboard, name='execution_dashboard'),
     path('client/', views.client_dashboard, name='client_dashboard'),
     path('my-projects/', my_projects, name='my_projects'),
+    path('exports/<slug:dataset>/', views.export_data, name='export_data'),
 ]
@@ -7,6 +7,51 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.core.cache import cache
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+from accounts.roles import has_role, get_role_names, role_state_token
+
+
+# Landing dashboard per role, first match wins.
+DASHBOARD_PRIORITY = (
+    (frozenset({'admin', 'project_manager'}), 'projects:admin_projects'),
+    (frozenset({'cold_caller'}), 'leads:cold_caller_dashboard'),
+    (frozenset({'sales_closer'}), 'leads:sales_closer_dashboard'),
+    (frozenset({'designer', 'developer', 'seo', 'gbp'}), 'dashboard:execution_dashboard'),
+    (frozenset({'client'}), 'dashboard:client_dashboard'),
+)
+
+# Session key holding {'version': <role cache version>, 'url': <url name>}
+LANDING_SESSION_KEY = 'dashboard_landing'
+
+
+def resolve_landing(user):
+    """Return the URL name of the user's landing dashboard, or None."""
+    roles = get_role_names(user)
+    for allowed, url_name in DASHBOARD_PRIORITY:
+        if not roles.isdisjoint(allowed):
+            return url_name
+    # Support users who are linked to a Client object even if their profile lacks the role
+    if hasattr(user, 'client'):
+        return 'dashboard:client_dashboard'
+    return None
+
+
+def get_landing(request):
+    """Return the landing URL name for `request.user`, remembered in the session.
+
+    The stored value is tied to the user's role state (see
+    `accounts.roles.role_state_token`), so a role change makes the next
+    request recompute it.
+    """
+    version = role_state_token(request.user)
+    stored = request.session.get(LANDING_SESSION_KEY)
+    if stored and stored.get('version') == version:
+        return stored['url']
+    url_name = resolve_landing(request.user)
+    if url_name:
+        request.session[LANDING_SESSION_KEY] = {'version': version, 'url': url_name}
+    return url_name
 
 
 @login_required
@@ -15,79 +60,32 @@ def dashboard_router(request):
     Main dashboard router.
     Redirects user to appropriate dashboard based on their role.
     """
-    # Allow users linked as client to proceed even if a profile is missing
-    if not hasattr(request.user, 'profile') and not hasattr(request.user, 'client'):
-        messages.error(request, 'User profile not found. Please contact admin.')
-        return redirect('accounts:login')
-    
-    profile = getattr(request.user, 'profile', None)
-
-    # Admin / Project Manager -> Admin dashboard
-    if profile and (profile.has_role('admin') or profile.has_role('project_manager')):
-        return redirect('projects:admin_projects')
-
-    # Cold Caller -> Cold Caller Dashboard
-    if profile and profile.has_role('cold_caller'):
-        return redirect('leads:cold_caller_dashboard')
+    landing = get_landing(request)
+    if landing:
+        return redirect(landing)
 
-    # Sales Closer -> Sales Closer Dashboard
-    if profile and profile.has_role('sales_closer'):
-        return redirect('leads:sales_closer_dashboard')
-
-    # Execution roles -> Execution Dashboard
-    if profile and (profile.has_role('designer') or profile.has_role('developer') or profile.has_role('seo') or profile.has_role('gbp')):
-        return redirect('dashboard:execution_dashboard')
-
-    # Client -> Client Dashboard
-    # Support users who are linked to a Client object even if their profile lacks the role
-    if (profile and profile.has_role('client')) or hasattr(request.user, 'client'):
-        return redirect('dashboard:client_dashboard')
-
-    messages.error(request, 'Invalid user role. Please contact admin.')
+    if not hasattr(request.user, 'profile'):
+        messages.error(request, 'User profile not found. Please contact admin.')
+    else:
+        messages.error(request, 'Invalid user role. Please contact admin.')
     return redirect('accounts:login')
 
 @login_required
 def fetcher_dashboard(request):
     """
     Fetcher dashboard showing quick actions and project summary.
+    Access is restricted by accounts.policy.ACCESS_POLICY.
     """
-    if not hasattr(request.user, 'profile') or not request.user.profile.has_role('cold_caller'):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard:dashboard')
-    
-    from projects.models import Project
+    from projects.models import Project, PayoutEntry
     from clients.models import Client
-    from django.db.models import Sum, Q
     
-    projects = Project.objects.filter(created_by=request.user)
+    projects = Project.objects.visible_to(request.user, 'created')
     clients = Client.objects.filter(created_by=request.user)
     
-    # Cache earnings calculations - 5 minute cache per user
-    cache_key = f'fetcher_earnings_{request.user.id}'
-    cached_earnings = cache.get(cache_key)
-    
-    if cached_earnings:
-        total_earnings = cached_earnings['total_earnings']
-        pending_earnings = cached_earnings['pending_earnings']
-    else:
-        # Calculate earnings
-        total_earnings = projects.filter(
-            admin_payment_released=True
-        ).aggregate(
-            total=Sum('fetcher_commission_amount')
-        )['total'] or 0
-        
-        pending_earnings = projects.filter(
-            status='completed',
-            admin_payment_released=False
-        ).aggregate(
-            total=Sum('fetcher_commission_amount')
-        )['total'] or 0
-        
-        cache.set(cache_key, {
-            'total_earnings': total_earnings,
-            'pending_earnings': pending_earnings,
-        }, 300)  # 5 minutes
+    # Commission earnings: one indexed SUM over the payout ledger, always current
+    earnings = PayoutEntry.objects.filter(user=request.user, role='fetcher').earnings()
+    total_earnings = earnings['total']
+    pending_earnings = earnings['pending']
     
     context = {
         'total_projects': projects.count(),
@@ -126,8 +124,7 @@ def execution_dashboard(request):
         completed_projects = cached_data['completed_projects']
         ongoing_projects = cached_data['ongoing_projects']
     else:
-        projects = Project.objects.filter(assigned_team=user) | Project.objects.filter(assigned_to=user)
-        projects = projects.distinct()
+        projects = Project.objects.visible_to(user, 'execution')
         
         # Separate completed and ongoing projects
         completed_projects = projects.filter(status__in=['completed', 'payment_done']).order_by('-date_completed')
@@ -146,14 +143,32 @@ def execution_dashboard(request):
     })
 
 
+CLIENT_FEED_TIMEOUT = 120  # 2 minutes
+CLIENT_FEED_UPDATES = 5
+CLIENT_FEED_LOGS = 10
+
+
+def top_per_partition(queryset, partition, ordering, limit):
+    """Return the first `limit` rows of `queryset` per `partition` value in one query.
+
+    Ranks rows with ROW_NUMBER() OVER (PARTITION BY partition ORDER BY
+    ordering) and keeps ranks 1..limit; rows come back grouped by partition
+    in `ordering` order.
+    """
+    order_by = [F(f[1:]).desc() if f.startswith('-') else F(f).asc() for f in ordering]
+    return queryset.annotate(
+        feed_rank=Window(RowNumber(), partition_by=F(partition), order_by=order_by)
+    ).filter(feed_rank__lte=limit).order_by(partition, 'feed_rank')
+
+
 @login_required
 def client_dashboard(request):
     """Client dashboard — shows projects, recent updates and activity logs."""
     from projects.models import Project, ProjectUpdate
-    from activity.models import ActivityLog
+    from activity.models import ActivityLog, ArchivedActivityLog
 
     # Allow admins to view client dashboard for debugging, else ensure user is a client
-    if not (hasattr(request.user, 'client') or (hasattr(request.user, 'profile') and request.user.profile.has_role('client'))):
+    if not (has_role(request.user, 'client') or hasattr(request.user, 'client')):
         messages.error(request, 'You are not registered as a client.')
         return redirect('dashboard:dashboard')
 
@@ -165,29 +180,56 @@ def client_dashboard(request):
         messages.error(request, 'A client record is not linked to your account. Please contact support.')
         return redirect('dashboard:dashboard')
 
-    projects = Project.objects.filter(client=client)
+    projects = list(Project.objects.visible_to(request.user, 'client'))
+    project_ids = [p.id for p in projects]
 
-    # Cache recent updates and logs per project - 2 minute cache
+    # Recent updates and logs per project: one batched cache read, then one
+    # windowed query per feed for whatever was missing - 2 minute cache
+    update_keys = {pid: f'project_{pid}_updates' for pid in project_ids}
+    log_keys = {pid: f'project_{pid}_logs' for pid in project_ids}
+    cached = cache.get_many(list(update_keys.values()) + list(log_keys.values()))
+    fresh = {}
+
+    missing = [pid for pid, key in update_keys.items() if key not in cached]
+    if missing:
+        updates = top_per_partition(
+            ProjectUpdate.objects.filter(project_id__in=missing).select_related('user'),
+            'project_id', ('-created_at', '-id'), CLIENT_FEED_UPDATES,
+        )
+        feed = {pid: [] for pid in missing}
+        for update in updates:
+            feed[update.project_id].append(update)
+        fresh.update({update_keys[pid]: rows for pid, rows in feed.items()})
+
+    missing = [pid for pid, key in log_keys.items() if key not in cached]
+    if missing:
+        logs = top_per_partition(
+            ActivityLog.objects.filter(entity_type='project', entity_id__in=missing).select_related('performed_by'),
+            'entity_id', ('-timestamp', '-id'), CLIENT_FEED_LOGS,
+        )
+        feed = {pid: [] for pid in missing}
+        for log in logs:
+            feed[log.entity_id].append(log)
+        # Projects with a short hot feed may have older entries in the archive
+        short = [pid for pid, rows in feed.items() if len(rows) < CLIENT_FEED_LOGS]
+        if short:
+            archived = top_per_partition(
+                ArchivedActivityLog.objects.filter(entity_type='project', entity_id__in=short).select_related('performed_by'),
+                'entity_id', ('-timestamp', '-id'), CLIENT_FEED_LOGS,
+            )
+            for log in archived:
+                feed[log.entity_id].append(log)
+            for pid in short:
+                feed[pid].sort(key=lambda log: (log.timestamp, log.id), reverse=True)
+                del feed[pid][CLIENT_FEED_LOGS:]
+        fresh.update({log_keys[pid]: rows for pid, rows in feed.items()})
+
+    if fresh:
+        cache.set_many(fresh, CLIENT_FEED_TIMEOUT)
+        cached.update(fresh)
     for p in projects:
-        # Cache key for each project's updates
-        cache_key_updates = f'project_{p.id}_updates'
-        cached_updates = cache.get(cache_key_updates)
-        
-        if cached_updates:
-            p.recent_updates = cached_updates
-        else:
-            p.recent_updates = list(ProjectUpdate.objects.filter(project=p).order_by('-created_at')[:5])
-            cache.set(cache_key_updates, p.recent_updates, 120)  # 2 minutes
-        
-        # Cache key for each project's logs
-        cache_key_logs = f'project_{p.id}_logs'
-        cached_logs = cache.get(cache_key_logs)
-        
-        if cached_logs:
-            p.recent_logs = cached_logs
-        else:
-            p.recent_logs = list(ActivityLog.objects.filter(entity_type='project', entity_id=p.id).order_by('-timestamp')[:10])
-            cache.set(cache_key_logs, p.recent_logs, 120)  # 2 minutes
+        p.recent_updates = cached[update_keys[p.id]]
+        p.recent_logs = cached[log_keys[p.id]]
 
     context = {
         'projects': projects,
@@ -198,18 +240,14 @@ def client_dashboard(request):
 
 @login_required
 def my_projects(request):
-    """My Projects view for project managers and closers to see projects they created."""
-    profile = getattr(request.user, 'profile', None)
-    
-    # Allow project_manager and sales_closer to see their created projects
-    if not (profile and (profile.has_role('project_manager') or profile.has_role('sales_closer') or profile.has_role('cold_caller'))):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard:dashboard')
-    
+    """My Projects view for project managers and closers to see projects they created.
+
+    Access is restricted by accounts.policy.ACCESS_POLICY.
+    """
     from projects.models import Project
     
     # Get all projects created by this user
-    projects = Project.objects.filter(created_by=request.user).select_related('client', 'assigned_to').prefetch_related('assigned_team')
+    projects = Project.objects.visible_to(request.user, 'created').select_related('client', 'assigned_to')
     
     context = {
         'projects': projects,
@@ -221,3 +259,28 @@ def my_projects(request):
     }
     
     return render(request, 'my_projects.html', context)
+
+
+@login_required
+def export_data(request, dataset):
+    """Stream a dataset as CSV or NDJSON (?format=, date_from=, date_to=, status=).
+
+    Access is restricted by accounts.policy.ACCESS_POLICY.
+    """
+    from django.http import HttpResponseBadRequest, StreamingHttpResponse
+    from django.utils import timezone
+    from .exports import EXPORT_FORMATS, ExportError, export_chunks, parse_filters
+
+    fmt = request.GET.get('format', 'csv')
+    try:
+        filters = parse_filters(
+            request.GET.get('date_from'), request.GET.get('date_to'), request.GET.get('status'),
+        )
+        chunks = export_chunks(dataset, fmt, **filters)
+    except ExportError as exc:
+        return HttpResponseBadRequest(str(exc))
+
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[fmt])
+    filename = f'{dataset}-{timezone.localdate():%Y%m%d}.{fmt}'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
@@ -0,0 +1,148 @@
+"""
+Automatic distribution of unassigned leads to sales closers.
+
+Strategies:
+  * round_robin  - closers take turns in id order;
+  * least_loaded - each lead goes to the closer with the fewest open leads;
+  * weighted     - each lead goes to the closer with the lowest share of
+                   their `UserProfile.lead_capacity` in use; full closers are
+                   skipped, so leads may stay unassigned.
+
+Open-pipeline counts come from one grouped aggregate over
+(assigned_sales_closer, status), which the lead_closer_status_idx index
+covers. Leads are read as ids in keyset batches and written back with one
+UPDATE per closer per batch, so one run costs a few queries per batch. Each
+UPDATE re-checks that the lead is still unassigned, so a lead assigned
+concurrently (e.g. by an admin edit) is left alone and not counted.
+"""
+
+import heapq
+from collections import defaultdict
+from itertools import cycle
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+
+from accounts.roles import role_filter
+from activity.utils import log_activity
+
+from .models import Lead
+
+
+OPEN_STATUSES = ('new', 'contacted', 'meeting_booked')
+ASSIGN_BATCH_SIZE = 1000
+STRATEGY_CHOICES = [
+    ('least_loaded', 'Lowest open pipeline'),
+    ('round_robin', 'Round robin'),
+    ('weighted', 'Weighted by capacity'),
+]
+
+
+class AssignmentError(ValueError):
+    """Raised for an unknown strategy."""
+
+
+def sales_closers():
+    """Active users with the sales_closer role, as {user_id: lead_capacity}."""
+    rows = (
+        User.objects.filter(role_filter(['sales_closer']), is_active=True)
+        .order_by('id').values_list('id', 'profile__lead_capacity')
+    )
+    return dict(rows)
+
+
+def open_pipeline(closer_ids):
+    """{closer_id: open lead count} for `closer_ids`, from one grouped aggregate."""
+    counts = dict.fromkeys(closer_ids, 0)
+    rows = (
+        Lead.objects.filter(assigned_sales_closer__in=list(counts), status__in=OPEN_STATUSES)
+        .values('assigned_sales_closer').annotate(n=Count('id')).order_by()
+        .values_list('assigned_sales_closer', 'n')
+    )
+    counts.update(rows)
+    return counts
+
+
+def unassigned_leads():
+    return Lead.objects.filter(assigned_sales_closer__isnull=True, status__in=OPEN_STATUSES)
+
+
+def _round_robin(capacities, loads):
+    yield from cycle(capacities)
+
+
+def _least_loaded(capacities, loads):
+    heap = [(loads[closer_id], closer_id) for closer_id in capacities]
+    heapq.heapify(heap)
+    while True:
+        load, closer_id = heapq.heappop(heap)
+        yield closer_id
+        heapq.heappush(heap, (load + 1, closer_id))
+
+
+def _weighted(capacities, loads):
+    heap = [
+        (loads[closer_id] / capacity, loads[closer_id], closer_id)
+        for closer_id, capacity in capacities.items()
+        if loads[closer_id] < capacity
+    ]
+    heapq.heapify(heap)
+    while heap:
+        _, load, closer_id = heapq.heappop(heap)
+        yield closer_id
+        load += 1
+        if load < capacities[closer_id]:
+            heapq.heappush(heap, (load / capacities[closer_id], load, closer_id))
+
+
+_PICKERS = {
+    'round_robin': _round_robin,
+    'least_loaded': _least_loaded,
+    'weighted': _weighted,
+}
+
+
+def assign_leads(strategy='least_loaded', user=None, batch_size=ASSIGN_BATCH_SIZE, leads=None):
+    """Assign unassigned open leads (or the `leads` queryset) with `strategy`.
+
+    Returns {closer_id: number of leads assigned}, counting only the rows
+    actually updated (see the module docstring). One ActivityLog summary
+    entry is written per run.
+    """
+    if strategy not in _PICKERS:
+        raise AssignmentError(f'Unknown strategy {strategy!r}; choose from {", ".join(_PICKERS)}.')
+    capacities = sales_closers()
+    assigned = dict.fromkeys(capacities, 0)
+    if not capacities:
+        return assigned
+    picker = _PICKERS[strategy](capacities, open_pipeline(capacities))
+    queryset = (unassigned_leads() if leads is None else leads).filter(assigned_sales_closer__isnull=True)
+
+    with transaction.atomic():
+        last_id = 0
+        exhausted = False
+        while not exhausted:
+            ids = list(queryset.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            last_id = ids[-1]
+            batch = defaultdict(list)
+            for lead_id in ids:
+                closer_id = next(picker, None)
+                if closer_id is None:
+                    exhausted = True
+                    break
+                batch[closer_id].append(lead_id)
+            for closer_id, lead_ids in batch.items():
+                assigned[closer_id] += Lead.objects.filter(
+                    id__in=lead_ids, assigned_sales_closer__isnull=True,
+                ).update(assigned_sales_closer_id=closer_id)
+
+        total = sum(assigned.values())
+        if total:
+            log_activity(
+                'auto_assign_leads', 'lead', None, user,
+                note=f'Assigned {total} leads to {sum(1 for n in assigned.values() if n)} sales closers ({strategy})',
+            )
+    return assigned
@@ -1,4 +1,10 @@
 from django import forms
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models import Q
+
+from accounts.roles import role_filter
+from .assignment import STRATEGY_CHOICES
 from .models import Lead
 
 
@@ -19,8 +25,40 @@ class LeadForm(forms.ModelForm):
 
 class AdminLeadForm(LeadForm):
     """Form used by admins to edit leads and assign a sales closer."""
-    assigned_sales_closer = forms.ModelChoiceField(queryset=__import__('django.contrib.auth.models', fromlist=['User']).User.objects.all(), required=False,
+    assigned_sales_closer = forms.ModelChoiceField(queryset=User.objects.filter(role_filter(['sales_closer']), is_active=True).order_by('username'), required=False,
                                                    widget=forms.Select(attrs={'class': 'w-full px-3 py-2 border rounded-md'}))
 
     class Meta(LeadForm.Meta):
         fields = LeadForm.Meta.fields + ['assigned_sales_closer']
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Keep the current assignee selectable even if they lost the role or were deactivated,
+        # so saving the form does not fail or silently unassign the lead
+        current = self.instance.assigned_sales_closer_id
+        if current:
+            field = self.fields['assigned_sales_closer']
+            field.queryset = User.objects.filter(
+                Q(role_filter(['sales_closer']), is_active=True) | Q(pk=current),
+            ).order_by('username')
+
+
+class LeadImportForm(forms.Form):
+    """CSV upload for `leads.importer`; columns follow LeadForm's fields."""
+    file = forms.FileField(widget=forms.ClearableFileInput(attrs={'class': 'w-full text-sm', 'accept': '.csv,text/csv'}))
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        limit = settings.LEAD_IMPORT_MAX_UPLOAD_SIZE
+        if upload.size > limit:
+            raise forms.ValidationError(
+                f'The file is larger than {limit // (1024 * 1024)} MB. '
+                'Ask an admin to import it with "manage.py import_leads".',
+                code='too_large',
+            )
+        return upload
+
+
+class LeadAutoAssignForm(forms.Form):
+    """Strategy picker for `leads.assignment.assign_leads`."""
+    strategy = forms.ChoiceField(choices=STRATEGY_CHOICES, widget=forms.Select(attrs={'class': 'px-3 py-2 border rounded-md text-sm'}))
@@ -0,0 +1,141 @@
+"""
+Bulk CSV lead import.
+
+The CSV is read row by row with csv.DictReader, so a file of any size is
+never held in memory. Rows are validated with `LeadForm` and handled in
+batches. Each batch makes one IN query on `phone_key` to skip leads that
+already exist, one `bulk_create`, one search-index write and one summary
+ActivityLog entry. Phones repeated within the file are skipped after their
+first row. Used by the upload view (which caps the file size and row count,
+since it runs inside the request) and the `import_leads` command.
+"""
+
+import csv
+
+from django.db import transaction
+
+from activity.utils import log_activity
+from assanj_portal.phones import phone_key
+
+from .forms import LeadForm
+from .models import Lead
+from .search import index_leads
+
+
+IMPORT_BATCH_SIZE = 500
+IMPORT_COLUMNS = ('business_name', 'phone_number', 'category', 'other_category', 'status', 'meeting_details')
+REQUIRED_COLUMNS = ('business_name', 'phone_number', 'category')
+MAX_REPORTED_ERRORS = 50
+
+
+class LeadImportError(ValueError):
+    """Raised when the file itself cannot be imported (e.g. missing columns)."""
+
+
+class ImportResult:
+    """Running totals for one import; `errors` keeps the first few invalid rows."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.existing = 0
+        self.repeated = 0
+        self.invalid = 0
+        self.batches = 0
+        self.errors = []
+
+    def add_error(self, line, messages):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((line, messages))
+
+    def summary(self):
+        return (
+            f'{self.rows} rows: {self.created} created, {self.existing} already existed, '
+            f'{self.repeated} repeated in file, {self.invalid} invalid'
+        )
+
+
+def _normalize_header(name):
+    return (name or '').strip().lower().replace(' ', '_')
+
+
+def _row_data(row):
+    data = {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+    data['status'] = data['status'] or 'new'
+    return data
+
+
+def _form_errors(form):
+    return '; '.join(
+        f'{field}: {" ".join(messages)}' if field != '__all__' else ' '.join(messages)
+        for field, messages in form.errors.items()
+    )
+
+
+def _save_batch(batch, user, result, dry_run):
+    """Insert the leads of `batch` (a list of (line, lead)) not already in the table."""
+    keys = {lead.phone_key for _, lead in batch if lead.phone_key}
+    existing = set(Lead.objects.filter(phone_key__in=keys).values_list('phone_key', flat=True)) if keys else set()
+    leads = [lead for _, lead in batch if not (lead.phone_key and lead.phone_key in existing)]
+    result.existing += len(batch) - len(leads)
+    result.batches += 1
+    result.created += len(leads)
+    if dry_run or not leads:
+        return
+    with transaction.atomic():
+        Lead.objects.bulk_create(leads)
+        # bulk_create skips the save signals that keep the search index current
+        index_leads(leads)
+        log_activity(
+            'import_leads', 'lead', None, user,
+            note=f'Imported {len(leads)} leads from CSV lines {batch[0][0]}-{batch[-1][0]}',
+        )
+
+
+def import_leads(lines, user, batch_size=IMPORT_BATCH_SIZE, dry_run=False, progress=None, max_rows=None):
+    """Import leads from CSV text `lines` (any iterable of str) created by `user`.
+
+    `progress`, if given, is called with the ImportResult after every batch.
+    With `dry_run` rows are validated and deduplicated but nothing is
+    written. Reading a row past `max_rows` raises LeadImportError; batches
+    before it stay imported. Returns the ImportResult.
+    """
+    reader = csv.DictReader(lines)
+    reader.fieldnames = [_normalize_header(name) for name in (reader.fieldnames or [])]
+    missing = [column for column in REQUIRED_COLUMNS if column not in reader.fieldnames]
+    if missing:
+        raise LeadImportError(f'Missing column(s): {", ".join(missing)}.')
+
+    result = ImportResult()
+    seen_keys = set()
+    batch = []
+    for row in reader:
+        if max_rows is not None and result.rows >= max_rows:
+            raise LeadImportError(f'The file has more than {max_rows} rows.')
+        result.rows += 1
+        line = reader.line_num
+        form = LeadForm(_row_data(row))
+        if not form.is_valid():
+            result.add_error(line, _form_errors(form))
+            continue
+        lead = form.instance
+        lead.created_by = user
+        # bulk_create bypasses Lead.save(), which normally sets the key
+        lead.phone_key = phone_key(lead.phone_number)
+        if lead.phone_key:
+            if lead.phone_key in seen_keys:
+                result.repeated += 1
+                continue
+            seen_keys.add(lead.phone_key)
+        batch.append((line, lead))
+        if len(batch) >= batch_size:
+            _save_batch(batch, user, result, dry_run)
+            batch = []
+            if progress:
+                progress(result)
+    if batch:
+        _save_batch(batch, user, result, dry_run)
+        if progress:
+            progress(result)
+    return result
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.assignment import ASSIGN_BATCH_SIZE, STRATEGY_CHOICES, assign_leads
+
+
+class Command(BaseCommand):
+    help = 'Distribute unassigned open leads among active sales closers.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strategy', default='least_loaded', choices=[value for value, _ in STRATEGY_CHOICES],
+            help='round_robin, least_loaded (default) or weighted (by UserProfile.lead_capacity).',
+        )
+        parser.add_argument('--batch-size', type=int, default=ASSIGN_BATCH_SIZE)
+        parser.add_argument('--user', help='Username recorded on the activity log entry.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"Unknown user {options['user']!r}.")
+
+        assigned = assign_leads(options['strategy'], user=user, batch_size=options['batch_size'])
+        if not assigned:
+            raise CommandError('There are no active sales closers.')
+        names = dict(User.objects.filter(id__in=assigned).values_list('id', 'username'))
+        for closer_id, count in assigned.items():
+            if options['verbosity'] > 1 or count:
+                self.stdout.write(f'  {names[closer_id]}: {count}')
+        self.stdout.write(self.style.SUCCESS(f"Assigned {sum(assigned.values())} leads ({options['strategy']})."))
@@ -0,0 +1,46 @@
+import csv
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from leads.importer import IMPORT_BATCH_SIZE, LeadImportError, import_leads
+
+
+class Command(BaseCommand):
+    help = (
+        'Import leads from a CSV file. Rows are validated like the add-lead form, '
+        'deduplicated by normalized phone and inserted in batches.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import.')
+        parser.add_argument('--user', required=True, help='Username recorded as the creator of the leads.')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Validate and count without writing anything.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        try:
+            user = User.objects.get(username=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"Unknown user {options['user']!r}.")
+
+        def progress(result):
+            self.stdout.write(f'  batch {result.batches}: {result.summary()}')
+
+        try:
+            with open(options['path'], encoding='utf-8-sig', newline='') as handle:
+                result = import_leads(
+                    handle, user, batch_size=options['batch_size'],
+                    dry_run=options['dry_run'], progress=progress,
+                )
+        except OSError as exc:
+            raise CommandError(f'Could not read {options["path"]}: {exc}')
+        except (LeadImportError, UnicodeDecodeError, csv.Error) as exc:
+            raise CommandError(str(exc))
+
+        for line, problem in result.errors:
+            self.stderr.write(f'  line {line}: {problem}')
+        prefix = 'Dry run, nothing written. ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f'{prefix}{result.summary()}.'))
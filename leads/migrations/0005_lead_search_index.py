@@ -0,0 +1,87 @@
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copy of the search table layout in leads.search at the time of this
+# migration; later changes to that module must not alter what this creates.
+SEARCH_FIELDS = ('business_name', 'phone_number', 'category', 'other_category', 'meeting_details')
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_sqlite(apps, schema_editor):
+    Lead = apps.get_model('leads', 'Lead')
+    rows = Lead.objects.using(schema_editor.connection.alias).order_by('id').values_list('id', *SEARCH_FIELDS)
+    insert = (
+        'INSERT INTO leads_lead_search (rowid, lead_id, business_name, phone_number, phone_digits, '
+        'category, other_category, meeting_details) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)'
+    )
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for pk, business_name, phone_number, category, other_category, meeting_details in rows.iterator(
+            chunk_size=BACKFILL_BATCH_SIZE,
+        ):
+            batch.append((
+                pk, pk, business_name or '', phone_number or '', re.sub(r'\D', '', phone_number or ''),
+                category or '', other_category or '', meeting_details or '',
+            ))
+            if len(batch) == BACKFILL_BATCH_SIZE:
+                cursor.executemany(insert, batch)
+                batch = []
+        if batch:
+            cursor.executemany(insert, batch)
+
+
+def install_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE leads_lead_search USING fts5('
+            'lead_id UNINDEXED, business_name, phone_number, phone_digits, category, other_category, '
+            "meeting_details, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        backfill_sqlite(apps, schema_editor)
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE TABLE leads_lead_search ('
+            'lead_id bigint PRIMARY KEY REFERENCES leads_lead (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute('CREATE INDEX leads_lead_search_document_idx ON leads_lead_search USING GIN (document)')
+        schema_editor.execute(
+            'INSERT INTO leads_lead_search (lead_id, document) SELECT id, '
+            "setweight(to_tsvector('simple', business_name), 'A') || "
+            "setweight(to_tsvector('simple', phone_number), 'B') || "
+            "setweight(to_tsvector('simple', regexp_replace(phone_number, '\\D', '', 'g')), 'B') || "
+            "setweight(to_tsvector('simple', category), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(other_category, '')), 'C') || "
+            "setweight(to_tsvector('simple', coalesce(meeting_details, '')), 'D') "
+            'FROM leads_lead'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    schema_editor.execute('DROP TABLE IF EXISTS leads_lead_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0004_lead_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, drop_search_index),
+        # The table above is vendor DDL; this only records the unmanaged model
+        migrations.CreateModel(
+            name='LeadSearchDocument',
+            fields=[
+                ('lead', models.OneToOneField(db_column='lead_id', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_document', serialize=False, to='leads.lead')),
+            ],
+            options={
+                'db_table': 'leads_lead_search',
+                'managed': False,
+            },
+        ),
+    ]
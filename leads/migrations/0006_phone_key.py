@@ -0,0 +1,61 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:10
+
+import re
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copy of assanj_portal.phones.phone_key as of this migration, so later
+# changes to the live normalizer don't alter what it writes
+_NON_DIGITS = re.compile(r'\D')
+
+
+def phone_key(value):
+    value = (value or '').strip()
+    digits = _NON_DIGITS.sub('', value)
+    if not digits:
+        return ''
+    international = value.startswith('+')
+    if not international and digits.startswith('00'):
+        digits, international = digits[2:], True
+    if international:
+        country_code = getattr(settings, 'PHONE_COUNTRY_CODE', '')
+        if country_code and digits.startswith(country_code):
+            digits = digits[len(country_code):]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    return digits[:32]
+
+
+def backfill_phone_keys(apps, schema_editor):
+    Lead = apps.get_model('leads', 'Lead')
+    batch = []
+    for obj in Lead.objects.only('id', 'phone_number').iterator(chunk_size=1000):
+        obj.phone_key = phone_key(obj.phone_number)
+        batch.append(obj)
+        if len(batch) == 1000:
+            Lead.objects.bulk_update(batch, ['phone_key'])
+            batch = []
+    Lead.objects.bulk_update(batch, ['phone_key'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0005_lead_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lead',
+            name='phone_key',
+            field=models.CharField(blank=True, default='', editable=False, max_length=32),
+        ),
+        migrations.RunPython(backfill_phone_keys, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['phone_key'], name='lead_phone_key_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-16 23:19
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0006_phone_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lead',
+            index=models.Index(fields=['assigned_sales_closer', 'created_at', 'id'], name='lead_closer_created_idx'),
+        ),
+    ]
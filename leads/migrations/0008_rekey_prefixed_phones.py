@@ -0,0 +1,54 @@
+import re
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Frozen copy of assanj_portal.phones.phone_key as of this migration, so later
+# changes to the live normalizer don't alter what it writes
+_NON_DIGITS = re.compile(r'\D')
+
+
+def phone_key(value):
+    value = (value or '').strip()
+    digits = _NON_DIGITS.sub('', value)
+    if not digits:
+        return ''
+    country_code = getattr(settings, 'PHONE_COUNTRY_CODE', '')
+    international = value.startswith('+')
+    if not international and digits.startswith('00'):
+        digits, international = digits[2:], True
+    if international:
+        if country_code and digits.startswith(country_code):
+            digits = digits[len(country_code):]
+    elif digits.startswith('0'):
+        digits = digits[1:]
+    elif (
+        country_code and digits.startswith(country_code)
+        and len(digits) == len(country_code) + getattr(settings, 'PHONE_NATIONAL_LENGTH', 0)
+    ):
+        digits = digits[len(country_code):]
+    return digits[:32]
+
+
+def rekey_phones(apps, schema_editor):
+    """Recompute keys that changed when "<code><national>" numbers started losing the code."""
+    Lead = apps.get_model('leads', 'Lead')
+    batch = []
+    for obj in Lead.objects.only('id', 'phone_number', 'phone_key').iterator(chunk_size=1000):
+        key = phone_key(obj.phone_number)
+        if key != obj.phone_key:
+            obj.phone_key = key
+            batch.append(obj)
+    Lead.objects.bulk_update(batch, ['phone_key'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0007_lead_closer_created_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(rekey_phones, migrations.RunPython.noop),
+    ]
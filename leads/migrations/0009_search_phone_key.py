@@ -0,0 +1,59 @@
+from django.db import migrations
+
+
+# Index the stored phone key in place of the raw phone digits (see
+# leads.search). Both directions are plain SQL over leads_lead, which
+# 0008 has re-keyed.
+
+SQLITE_LAYOUT = (
+    'CREATE VIRTUAL TABLE leads_lead_search USING fts5('
+    'lead_id UNINDEXED, business_name, phone_number, {phone}, category, other_category, '
+    "meeting_details, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+SQLITE_FILL = (
+    'INSERT INTO leads_lead_search (rowid, lead_id, business_name, phone_number, {phone}, '
+    'category, other_category, meeting_details) '
+    "SELECT id, id, business_name, phone_number, phone_key, category, coalesce(other_category, ''), "
+    "coalesce(meeting_details, '') FROM leads_lead"
+)
+POSTGRES_FILL = (
+    'UPDATE leads_lead_search SET document = '
+    "setweight(to_tsvector('simple', l.business_name), 'A') || "
+    "setweight(to_tsvector('simple', l.phone_number), 'B') || "
+    "setweight(to_tsvector('simple', {phone}), 'B') || "
+    "setweight(to_tsvector('simple', l.category), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(l.other_category, '')), 'C') || "
+    "setweight(to_tsvector('simple', coalesce(l.meeting_details, '')), 'D') "
+    'FROM leads_lead l WHERE l.id = leads_lead_search.lead_id'
+)
+
+
+def _reindex(schema_editor, sqlite_column, postgres_phone):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        # FTS5 columns cannot be renamed, so the table is rebuilt
+        schema_editor.execute('DROP TABLE leads_lead_search')
+        schema_editor.execute(SQLITE_LAYOUT.format(phone=sqlite_column))
+        schema_editor.execute(SQLITE_FILL.format(phone=sqlite_column))
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_FILL.format(phone=postgres_phone))
+
+
+def index_phone_keys(apps, schema_editor):
+    _reindex(schema_editor, 'phone_key', 'l.phone_key')
+
+
+def index_phone_digits(apps, schema_editor):
+    # Back to the 0005 layout; SQLite has no regexp_replace, so its digits column gets the key
+    _reindex(schema_editor, 'phone_digits', "regexp_replace(l.phone_number, '\\D', '', 'g')")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('leads', '0008_rekey_prefixed_phones'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_phone_keys, index_phone_digits),
+    ]
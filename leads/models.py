@@ -1,5 +1,37 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from assanj_portal.phones import PHONE_KEY_MAX_LENGTH, PhoneKeyQuerySet, phone_key
+from .search import SEARCH_FIELDS, index_leads, remove_leads
+
+
+class LeadQuerySet(PhoneKeyQuerySet):
+    def status_counts(self):
+        """Lead count per status (plus 'total') in one conditional aggregate."""
+        counts = {
+            status: models.Count('id', filter=models.Q(status=status))
+            for status, _ in Lead.STATUS_CHOICES
+        }
+        return self.aggregate(total=models.Count('id'), **counts)
+
+    def with_project_totals(self):
+        """Annotate `project_count` and `project_value` (sum of total_price) per lead."""
+        from projects.models import Project
+        projects = Project.objects.filter(lead=models.OuterRef('pk')).order_by().values('lead')
+        return self.annotate(
+            project_count=Coalesce(
+                models.Subquery(projects.annotate(n=models.Count('id')).values('n')), 0,
+            ),
+            project_value=Coalesce(
+                models.Subquery(projects.annotate(value=models.Sum('total_price')).values('value')),
+                models.Value(Decimal('0')), output_field=models.DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
 
 
 class Lead(models.Model):
@@ -20,6 +52,8 @@ class Lead(models.Model):
 
     business_name = models.CharField(max_length=255)
     phone_number = models.CharField(max_length=50)
+    # Normalized phone_number for duplicate lookups (see assanj_portal.phones)
+    phone_key = models.CharField(max_length=PHONE_KEY_MAX_LENGTH, blank=True, default='', editable=False)
     category = models.CharField(max_length=50, choices=CATEGORY_CHOICES)
     other_category = models.CharField(max_length=255, blank=True, null=True)
     status = models.CharField(max_length=50, choices=STATUS_CHOICES, default='new')
@@ -41,5 +75,57 @@ class Lead(models.Model):
 
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = LeadQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'created_at'], name='lead_creator_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='lead_created_idx'),
+            models.Index(fields=['assigned_sales_closer', 'status'], name='lead_closer_status_idx'),
+            models.Index(fields=['assigned_sales_closer', 'created_at', 'id'], name='lead_closer_created_idx'),
+            models.Index(fields=['status'], name='lead_status_idx'),
+            models.Index(fields=['phone_key'], name='lead_phone_key_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.phone_key = phone_key(self.phone_number)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone_number' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_key'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f"{self.business_name} ({self.phone_number})"
+
+
+class LeadSearchDocument(models.Model):
+    """A lead's row in the full-text table (see leads.search), exposed only so searches can join it.
+
+    The table is vendor-specific DDL owned by migration 0005; leads.search
+    writes to it.
+    """
+    lead = models.OneToOneField(
+        Lead,
+        primary_key=True,
+        db_column='lead_id',
+        db_constraint=False,
+        on_delete=models.DO_NOTHING,
+        related_name='search_document'
+    )
+
+    class Meta:
+        managed = False
+        db_table = 'leads_lead_search'
+
+
+@receiver(post_save, sender=Lead)
+def index_lead_for_search(sender, instance, update_fields=None, **kwargs):
+    """Keep the full-text search entry (see leads.search) in step with the lead."""
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    index_leads([instance])
+
+
+@receiver(post_delete, sender=Lead)
+def remove_lead_from_search(sender, instance, **kwargs):
+    remove_leads(sender, [instance.pk])
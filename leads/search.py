@@ -0,0 +1,242 @@
+"""
+Full-text lead search.
+
+Leads are mirrored into the `leads_lead_search` table keyed by lead id: an
+FTS5 virtual table on SQLite, a tsvector column with a GIN index on
+PostgreSQL. Migration 0005 creates it; both sit behind the same small
+backend interface (index / remove / search) so views never see vendor SQL.
+The mirror is kept current by the Lead save/delete signals; code that
+bypasses signals (bulk_create, update()) calls `index_leads` itself.
+
+`search_leads()` joins a Lead queryset to the search table (through the
+unmanaged `LeadSearchDocument` model), so one statement evaluates the match
+once and reads each hit's `search_rank` (higher is better) from the same
+row. Callers keep their own filters and page with `SEARCH_ORDERING`.
+
+Phones are indexed as typed and as their `phone_key`. A digit term in a
+query also matches as its key, and a query that looks like one phone number
+("+91 98765 43210") is also read as that number's key, so any spelling of
+a number finds the lead.
+"""
+
+import re
+
+from django.db import connections, router
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+from assanj_portal.phones import phone_key
+
+
+# Indexed fields, in column order; the phone key goes in as an extra column
+# so "9876543210" finds "098765 43210".
+SEARCH_FIELDS = ('business_name', 'phone_number', 'category', 'other_category', 'meeting_details')
+SEARCH_ORDERING = ('-search_rank', '-id')
+SEARCH_TABLE = 'leads_lead_search'
+
+_TERM_RE = re.compile(r'\w+', re.UNICODE)
+_PHONE_QUERY_RE = re.compile(r'\+?[\d\s().-]*\d[\d\s().-]*')
+
+
+def parse_terms(query):
+    """Split free text into search terms; punctuation and operators are dropped."""
+    return _TERM_RE.findall(query or '')
+
+
+def _spellings(term):
+    """The ways a query term may appear in the index: digit runs also as a phone key."""
+    if term.isdigit():
+        key = phone_key(term)
+        if key and key != term:
+            return (term, key)
+    return (term,)
+
+
+def parse_query(query):
+    """Readings of `query` for the backends: any reading may match.
+
+    A reading is a list of terms that must all match; a term is a tuple of
+    spellings, any of which may match.
+    """
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    readings = [[_spellings(term) for term in terms]]
+    if _PHONE_QUERY_RE.fullmatch(query.strip()):
+        key = phone_key(query)
+        if key and [(key,)] not in readings:
+            readings.append([(key,)])
+    return readings
+
+
+def _document(row):
+    """(id, *SEARCH_FIELDS) -> (id, business, phone, phone key, category, other, meeting)."""
+    pk, business_name, phone_number, category, other_category, meeting_details = row
+    return (
+        pk, business_name or '', phone_number or '', phone_key(phone_number),
+        category or '', other_category or '', meeting_details or '',
+    )
+
+
+def _boolean(readings, spelling, any_of, all_of):
+    """Render `readings` as a boolean match expression in a backend's syntax."""
+    def group(parts, joiner):
+        return parts[0] if len(parts) == 1 else '(' + f' {joiner} '.join(parts) + ')'
+
+    return group([
+        group([group([spelling(s) for s in term], any_of) for term in reading], all_of)
+        for reading in readings
+    ], any_of)
+
+
+def _joined(queryset):
+    # INNER JOIN leads_lead_search ON lead_id = leads_lead.id; the expressions
+    # below refer to the joined table by name (it is only ever joined once)
+    return queryset.filter(search_document__isnull=False)
+
+
+class SQLiteSearchBackend:
+    # bm25 column weights: lead id (unindexed), business, phone, phone key, category, other category, meeting
+    weights = (0.0, 10.0, 5.0, 5.0, 2.0, 2.0, 1.0)
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def remove(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        placeholders = ', '.join(['%s'] * len(ids))
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', ids)
+
+    def index(self, rows):
+        documents = [_document(row) for row in rows]
+        if not documents:
+            return
+        self.remove(doc[0] for doc in documents)
+        with self.connection.cursor() as cursor:
+            # rowid mirrors lead_id so removals are rowid lookups
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (rowid, lead_id, business_name, phone_number, phone_key, '
+                'category, other_category, meeting_details) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)',
+                [(doc[0], *doc) for doc in documents],
+            )
+
+    def match_expression(self, readings):
+        # Each spelling quoted (so no FTS syntax leaks through) and prefix-matched
+        return _boolean(readings, lambda term: '"%s"*' % term.replace('"', '""'), 'OR', 'AND')
+
+    def search(self, queryset, readings):
+        weights = ', '.join(str(w) for w in self.weights)
+        return _joined(queryset).filter(
+            RawSQL(f'{SEARCH_TABLE} MATCH %s', (self.match_expression(readings),), output_field=BooleanField()),
+        ).annotate(search_rank=RawSQL(f'-bm25({SEARCH_TABLE}, {weights})', (), output_field=FloatField()))
+
+
+class PostgresSearchBackend:
+    config = 'simple'
+    # setweight labels, same column order as the SQLite columns after lead_id
+    labels = ('A', 'B', 'B', 'C', 'C', 'D')
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def remove(self, ids):
+        ids = list(ids)
+        if not ids:
+            return
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE lead_id = ANY(%s)', [ids])
+
+    def index(self, rows):
+        documents = [_document(row) for row in rows]
+        if not documents:
+            return
+        vector = ' || '.join(
+            f"setweight(to_tsvector('{self.config}', %s), '{label}')" for label in self.labels
+        )
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SEARCH_TABLE} (lead_id, document) VALUES (%s, {vector}) '
+                'ON CONFLICT (lead_id) DO UPDATE SET document = EXCLUDED.document',
+                documents,
+            )
+
+    def match_expression(self, readings):
+        return _boolean(readings, lambda term: f'{term}:*', '|', '&')
+
+    def search(self, queryset, readings):
+        match = self.match_expression(readings)
+        tsquery = f"to_tsquery('{self.config}', %s)"
+        return _joined(queryset).filter(
+            RawSQL(f'{SEARCH_TABLE}.document @@ {tsquery}', (match,), output_field=BooleanField()),
+        ).annotate(search_rank=RawSQL(
+            f'ts_rank({SEARCH_TABLE}.document, {tsquery})', (match,), output_field=FloatField(),
+        ))
+
+
+class FallbackSearchBackend:
+    """Unindexed icontains search for databases without a native full-text engine."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def remove(self, ids):
+        pass
+
+    def index(self, rows):
+        pass
+
+    def search(self, queryset, readings):
+        matches = Q()
+        for reading in readings:
+            every_term = Q()
+            for term in reading:
+                condition = Q()
+                for spelling in term:
+                    for field in (*SEARCH_FIELDS, 'phone_key'):
+                        condition |= Q(**{f'{field}__icontains': spelling})
+                every_term &= condition
+            matches |= every_term
+        queryset = queryset.filter(matches)
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend(connection):
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)(connection)
+
+
+def _backend_for(model):
+    return get_backend(connections[router.db_for_write(model)])
+
+
+def index_leads(leads):
+    """Add or refresh the search entries for `leads` (Lead instances)."""
+    leads = list(leads)
+    if not leads:
+        return
+    rows = [(lead.pk, *(getattr(lead, field) for field in SEARCH_FIELDS)) for lead in leads]
+    _backend_for(type(leads[0])).index(rows)
+
+
+def remove_leads(model, ids):
+    """Drop the search entries for lead `ids`."""
+    _backend_for(model).remove(ids)
+
+
+def search_leads(queryset, query):
+    """Narrow a Lead queryset to leads matching `query`, annotated with `search_rank`.
+
+    Returns the queryset unchanged (no `search_rank`) when `query` has no terms.
+    """
+    readings = parse_query(query)
+    if not readings:
+        return queryset
+    return get_backend(connections[queryset.db]).search(queryset, readings)
@@ -1,7 +1,14 @@
-from django.test import TestCase, Client
+import io
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth.models import User
 from leads.models import Lead
+from leads.search import search_leads
+from activity.models import ActivityLog
 from accounts.models import Role, UserProfile
 
 
@@ -19,3 +26,514 @@ class LeadsTests(TestCase):
         # After add, redirect to cold caller dashboard
         self.assertEqual(resp.status_code, 302)
         self.assertTrue(Lead.objects.filter(business_name='B').exists())
+
+
+class ColdCallerLeadTableTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.caller.profile.add_role('cold_caller')
+        self.other = User.objects.create_user(username='other', password='pass')
+        self.other.profile.add_role('cold_caller')
+        self.pm = User.objects.create_user(username='pm', password='pass')
+        self.pm.profile.add_role('project_manager')
+
+    def _make_leads(self, user, count):
+        Lead.objects.bulk_create([
+            Lead(business_name=f'{user.username}-{i}', phone_number=str(i), category='Other', created_by=user)
+            for i in range(count)
+        ])
+
+    def _query_count(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.c.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(ctx)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.c.login(username='caller', password='pass')
+        url = reverse('leads:cold_caller_dashboard')
+        self._make_leads(self.caller, 2)
+        self.c.get(url)
+        _, few = self._query_count(url)
+        self._make_leads(self.other, 20)
+        _, many = self._query_count(url)
+        self.assertEqual(few, many)
+
+    def test_row_permissions_follow_ownership_and_role(self):
+        self._make_leads(self.caller, 1)
+        self._make_leads(self.other, 1)
+        url = reverse('leads:cold_caller_dashboard')
+
+        self.c.login(username='caller', password='pass')
+        resp = self.c.get(url)
+        rows = {lead.business_name: lead.can_manage for lead in resp.context['leads']}
+        self.assertEqual(rows, {'caller-0': True, 'other-0': False})
+
+        self.c.login(username='pm', password='pass')
+        resp = self.c.get(url)
+        self.assertTrue(all(lead.can_manage for lead in resp.context['leads']))
+
+    def test_pages_cover_every_lead_once(self):
+        from leads.views import LEAD_PAGE_SIZE
+        self._make_leads(self.caller, LEAD_PAGE_SIZE + 3)
+        self._make_leads(self.other, 2)
+        self.c.login(username='caller', password='pass')
+        url = reverse('leads:cold_caller_dashboard')
+
+        seen, params = [], {'my_leads': '1'}
+        while True:
+            resp = self.c.get(url, params)
+            seen.extend(lead.id for lead in resp.context['leads'])
+            if not resp.context['next_cursor']:
+                break
+            params = {'my_leads': '1', 'cursor': resp.context['next_cursor']}
+
+        expected = Lead.objects.filter(created_by=self.caller).order_by('-created_at', '-id')
+        self.assertEqual(seen, list(expected.values_list('id', flat=True)))
+
+
+class LeadSearchTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.pm = User.objects.create_user(username='pm', password='pass')
+        self.pm.profile.add_role('project_manager')
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.caller.profile.add_role('cold_caller')
+
+    def _lead(self, business_name, phone='000', category='Other', created_by=None, **extra):
+        return Lead.objects.create(
+            business_name=business_name, phone_number=phone, category=category,
+            created_by=created_by or self.pm, **extra,
+        )
+
+    def _search(self, q, **params):
+        resp = self.c.get(reverse('leads:filter'), {'q': q, **params})
+        self.assertEqual(resp.status_code, 200)
+        return [lead.business_name for lead in resp.context['leads']]
+
+    def test_matches_every_indexed_field(self):
+        self._lead('Bright Smiles', phone='(555) 123-4567', category='Dentist')
+        self._lead('Acme Builders', category='Other', other_category='Roofing')
+        self._lead('Quiet Clinic', category='Clinic', meeting_details='Call back about landscaping')
+        self.c.login(username='pm', password='pass')
+
+        self.assertEqual(self._search('bright'), ['Bright Smiles'])
+        self.assertEqual(self._search('5551234567'), ['Bright Smiles'])
+        self.assertEqual(self._search('dentist'), ['Bright Smiles'])
+        self.assertEqual(self._search('roof'), ['Acme Builders'])
+        self.assertEqual(self._search('landscaping'), ['Quiet Clinic'])
+        self.assertEqual(self._search('nothing here'), [])
+
+    @override_settings(PHONE_COUNTRY_CODE='91')
+    def test_any_spelling_of_a_phone_finds_the_lead(self):
+        self._lead('Trunk Zero', phone='098765 43210')
+        self._lead('Plus Code', phone='+91 91234-56789')
+        self.c.login(username='pm', password='pass')
+        for q in ('9876543210', '09876543210', '+91 98765 43210', '919876543210', '98765 43210', '0098765'):
+            self.assertEqual(self._search(q), ['Trunk Zero'], q)
+        for q in ('9123456789', '091234 56789', '+91 91234 56789', '(912) 345-6789'):
+            self.assertEqual(self._search(q), ['Plus Code'], q)
+        self.assertEqual(self._search('98765 99999'), [])
+
+    def test_tampered_cursor_returns_first_page(self):
+        from activity.tests import tampered_cursors
+        self._lead('Garden Notes')
+        self.c.login(username='pm', password='pass')
+        for cursor in tampered_cursors(['abc', 'def']):
+            self.assertEqual(self._search('garden', cursor=cursor), ['Garden Notes'], cursor)
+            self.assertEqual(self._search('', cursor=cursor), ['Garden Notes'], cursor)
+
+    def test_business_name_hits_rank_first(self):
+        self._lead('Garden Notes', meeting_details='garden garden')
+        self._lead('Oak Garden Center')
+        self._lead('Plain Lead', meeting_details='wants a garden page')
+        self.c.login(username='pm', password='pass')
+        results = self._search('garden')
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[-1], 'Plain Lead')
+
+    def test_rank_comes_from_the_joined_match(self):
+        self._lead('Garden Notes')
+        with CaptureQueriesContext(connection) as ctx:
+            results = list(search_leads(Lead.objects.all(), 'garden'))
+        self.assertEqual([lead.business_name for lead in results], ['Garden Notes'])
+        sql = ctx.captured_queries[0]['sql']
+        # One match evaluated on the joined table, not a subquery per candidate row
+        self.assertIn('JOIN "leads_lead_search"', sql)
+        self.assertEqual(sql.count('SELECT'), 1)
+        self.assertEqual(sql.count('MATCH') + sql.count('@@'), 1)
+
+    def test_index_follows_save_and_delete(self):
+        lead = self._lead('Old Name')
+        self.c.login(username='pm', password='pass')
+        lead.business_name = 'New Name'
+        lead.save()
+        self.assertEqual(self._search('old'), [])
+        self.assertEqual(self._search('new'), ['New Name'])
+        lead.delete()
+        self.assertEqual(self._search('new'), [])
+
+    def test_role_restrictions_and_status_still_apply(self):
+        self._lead('Harbor Cafe', created_by=self.caller)
+        self._lead('Harbor Bakery', status='contacted')
+        self.c.login(username='caller', password='pass')
+        self.assertEqual(self._search('harbor'), ['Harbor Cafe'])
+        self.c.login(username='pm', password='pass')
+        self.assertEqual(self._search('harbor', status='contacted'), ['Harbor Bakery'])
+
+    def test_search_syntax_is_not_interpreted(self):
+        self._lead('Star Motors')
+        self.c.login(username='pm', password='pass')
+        self.assertEqual(self._search('star" -(* ^'), ['Star Motors'])
+        self.assertEqual(len(self._search('"')), 1)
+
+    def test_results_page_with_cursor(self):
+        from leads.views import LEAD_PAGE_SIZE
+        for i in range(LEAD_PAGE_SIZE + 5):
+            self._lead(f'Metro Shop {i}')
+        self._lead('Unrelated')
+        self.c.login(username='pm', password='pass')
+        url = reverse('leads:filter')
+
+        seen, params = [], {'q': 'metro'}
+        while True:
+            resp = self.c.get(url, params)
+            seen.extend(lead.id for lead in resp.context['leads'])
+            if not resp.context['next_cursor']:
+                break
+            params = {'q': 'metro', 'cursor': resp.context['next_cursor']}
+        self.assertEqual(len(seen), LEAD_PAGE_SIZE + 5)
+        self.assertEqual(len(set(seen)), len(seen))
+
+
+class LeadPhoneDuplicateTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.caller.profile.add_role('cold_caller')
+        self.closer = User.objects.create_user(username='closer', password='pass')
+        self.closer.profile.add_role('sales_closer')
+
+    def _messages(self, resp):
+        return ' '.join(str(m) for m in resp.context['messages'])
+
+    def test_add_lead_warns_about_same_phone(self):
+        Lead.objects.create(business_name='First Co', phone_number='98765 43210', category='Other', created_by=self.closer)
+        self.c.login(username='caller', password='pass')
+        resp = self.c.post(reverse('leads:add_lead'), {
+            'business_name': 'Second Co', 'phone_number': '+91 98765-43210', 'category': 'Other', 'status': 'new',
+        }, follow=True)
+        self.assertTrue(Lead.objects.filter(business_name='Second Co').exists())
+        self.assertIn('First Co', self._messages(resp))
+        self.assertIn('closer', self._messages(resp))
+
+    def test_mark_won_links_client_by_phone(self):
+        from clients.models import Client as BusinessClient
+        existing = BusinessClient.objects.create(created_by=self.closer, business_name='Acme Ltd', phone='5551234567')
+        lead = Lead.objects.create(
+            business_name='ACME', phone_number='(555) 123-4567', category='Other',
+            created_by=self.caller, assigned_sales_closer=self.closer,
+        )
+        self.c.login(username='closer', password='pass')
+        self.c.get(reverse('leads:mark_won', args=[lead.pk]))
+        self.assertEqual(BusinessClient.objects.count(), 1)
+        self.assertEqual(lead.projects.get().client, existing)
+
+    def test_mark_won_without_lead_creator_makes_client_for_closer(self):
+        lead = Lead.objects.create(
+            business_name='Orphan Co', phone_number='91234 56789', category='Other', assigned_sales_closer=self.closer,
+        )
+        self.c.login(username='closer', password='pass')
+        self.c.get(reverse('leads:mark_won', args=[lead.pk]))
+        lead.refresh_from_db()
+        self.assertEqual(lead.status, 'deal_won')
+        self.assertEqual(lead.projects.get().client.created_by, self.closer)
+
+
+class LeadImportTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.caller.profile.add_role('cold_caller')
+
+    def _csv(self, rows, header='business_name,phone_number,category,status'):
+        return '\n'.join([header, *rows]) + '\n'
+
+    def test_imports_valid_rows_and_skips_duplicates(self):
+        from leads.importer import import_leads
+        Lead.objects.create(business_name='Known', phone_number='98765 43210', category='Other')
+        data = self._csv([
+            'Alpha,+91 98765 43210,Dentist,new',   # already a lead
+            'Beta,91234 56789,Clinic,',           # blank status -> new
+            'Gamma,0912-345-6789,Other,contacted', # same phone as Beta
+            ',11111 22222,Other,new',              # missing business name
+            'Delta,22222 33333,Plumbing,new',      # bad category
+            'Epsilon,33333 44444,Construction,new',
+        ])
+        result = import_leads(io.StringIO(data), self.caller, batch_size=2)
+
+        self.assertEqual((result.rows, result.created, result.existing, result.repeated, result.invalid), (6, 2, 1, 1, 2))
+        self.assertEqual([line for line, _ in result.errors], [5, 6])
+        beta = Lead.objects.get(business_name='Beta')
+        self.assertEqual((beta.status, beta.created_by, beta.phone_key), ('new', self.caller, '9123456789'))
+        self.assertTrue(Lead.objects.filter(business_name='Epsilon').exists())
+        # Imported leads are searchable although bulk_create skips the signals
+        self.assertEqual(list(search_leads(Lead.objects.all(), 'epsilon')), [Lead.objects.get(business_name='Epsilon')])
+
+    def test_queries_and_logs_are_per_batch(self):
+        from leads.importer import import_leads
+        rows = [f'Shop {i},90000 {i:05d},Other,new' for i in range(10)]
+        with self.captureOnCommitCallbacks(execute=True), CaptureQueriesContext(connection) as ctx:
+            result = import_leads(io.StringIO(self._csv(rows)), self.caller, batch_size=5)
+        self.assertEqual((result.created, result.batches), (10, 2))
+        lead_selects = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and 'leads_lead' in q['sql']]
+        lead_inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT INTO "leads_lead"')]
+        self.assertEqual(len(lead_selects), 2)
+        self.assertEqual(len(lead_inserts), 2)
+        logs = ActivityLog.objects.filter(action='import_leads')
+        self.assertEqual(logs.count(), 2)
+
+    def test_missing_columns_are_rejected(self):
+        from leads.importer import LeadImportError, import_leads
+        with self.assertRaises(LeadImportError):
+            import_leads(io.StringIO('name,phone\nA,1\n'), self.caller)
+
+    def test_dry_run_writes_nothing(self):
+        from leads.importer import import_leads
+        result = import_leads(io.StringIO(self._csv(['A,90000 00001,Other,new'])), self.caller, dry_run=True)
+        self.assertEqual(result.created, 1)
+        self.assertFalse(Lead.objects.exists())
+
+    def test_upload_endpoint(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.c.login(username='caller', password='pass')
+        upload = SimpleUploadedFile('leads.csv', self._csv(['Upload Co,90000 00002,Other,new']).encode('utf-8-sig'), content_type='text/csv')
+        resp = self.c.post(reverse('leads:import_leads'), {'file': upload})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['result'].created, 1)
+        self.assertTrue(Lead.objects.filter(business_name='Upload Co', created_by=self.caller).exists())
+
+    def test_upload_rejects_files_over_the_size_limit(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        self.c.login(username='caller', password='pass')
+        data = self._csv([f'Big {i},90002 {i:05d},Other,new' for i in range(50)]).encode()
+        with self.settings(LEAD_IMPORT_MAX_UPLOAD_SIZE=len(data) - 1):
+            resp = self.c.post(reverse('leads:import_leads'), {'file': SimpleUploadedFile('leads.csv', data)})
+        self.assertIn('import_leads', ' '.join(resp.context['form'].errors['file']))
+        self.assertFalse(Lead.objects.exists())
+
+    def test_upload_past_the_row_limit_reports_what_was_kept(self):
+        from django.core.files.uploadedfile import SimpleUploadedFile
+        from leads.importer import IMPORT_BATCH_SIZE
+        self.c.login(username='caller', password='pass')
+        rows = [f'Many {i},90003 {i:05d},Other,new' for i in range(IMPORT_BATCH_SIZE + 1)]
+        upload = SimpleUploadedFile('leads.csv', self._csv(rows).encode())
+        with self.settings(LEAD_IMPORT_MAX_ROWS=IMPORT_BATCH_SIZE):
+            resp = self.c.post(reverse('leads:import_leads'), {'file': upload})
+        self.assertEqual(Lead.objects.count(), IMPORT_BATCH_SIZE)
+        self.assertEqual(resp.context['result'].created, IMPORT_BATCH_SIZE)
+        message = ' '.join(str(m) for m in resp.context['messages'])
+        self.assertIn(f'more than {IMPORT_BATCH_SIZE} rows', message)
+        self.assertIn(f'The {IMPORT_BATCH_SIZE} leads created before that were kept', message)
+
+    def test_command_reports_progress(self):
+        import tempfile
+        from django.core.management import call_command
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as handle:
+            handle.write(self._csv([f'Cmd {i},90001 {i:05d},Other,new' for i in range(3)]))
+        out = io.StringIO()
+        call_command('import_leads', handle.name, user='caller', batch_size=2, stdout=out)
+        self.assertIn('batch 2:', out.getvalue())
+        self.assertEqual(Lead.objects.filter(business_name__startswith='Cmd').count(), 3)
+
+
+class SalesCloserDashboardTests(TestCase):
+    def setUp(self):
+        self.c = Client()
+        self.closer = User.objects.create_user(username='closer', password='pass')
+        self.closer.profile.add_role('sales_closer')
+        self.url = reverse('leads:sales_closer_dashboard')
+
+    def _lead(self, name, status='new', closer=None):
+        return Lead.objects.create(
+            business_name=name, phone_number='0', category='Other', status=status,
+            assigned_sales_closer=closer or self.closer,
+        )
+
+    def _project(self, lead, price):
+        from clients.models import Client as BusinessClient
+        from projects.models import Project
+        client = BusinessClient.objects.create(created_by=self.closer, business_name=lead.business_name, phone='1')
+        return Project.objects.create(
+            client=client, created_by=self.closer, project_type='custom', website_type='business',
+            business_description='', contact_info_phone='1', contact_info_email='a@b.c',
+            contact_info_address='x', deadline='2099-12-31', total_price=price, lead=lead,
+        )
+
+    def test_counts_and_per_lead_project_totals(self):
+        won = self._lead('Won Co', 'deal_won')
+        self._lead('Meet A', 'meeting_booked')
+        self._lead('Meet B', 'meeting_booked')
+        self._lead('Elsewhere', 'deal_won', closer=User.objects.create_user(username='other'))
+        self._project(won, '1000.00')
+        self._project(won, '250.50')
+        self.c.login(username='closer', password='pass')
+        resp = self.c.get(self.url)
+
+        self.assertEqual((resp.context['deals_won'], resp.context['meetings']), (1, 2))
+        self.assertEqual(resp.context['status_counts']['total'], 3)
+        self.assertEqual(resp.context['total_value'], Decimal('1250.50'))
+        rows = {lead.business_name: (lead.project_count, lead.project_value) for lead in resp.context['leads']}
+        self.assertEqual(rows['Won Co'], (2, Decimal('1250.50')))
+        self.assertEqual(rows['Meet A'], (0, Decimal('0')))
+
+    def test_query_count_is_fixed(self):
+        self.c.login(username='closer', password='pass')
+        self.c.get(self.url)
+        with CaptureQueriesContext(connection) as few:
+            self.c.get(self.url)
+        for i in range(15):
+            self._project(self._lead(f'Lead {i}', 'deal_won'), '10')
+        with CaptureQueriesContext(connection) as many:
+            self.c.get(self.url)
+        self.assertEqual(len(few), len(many))
+        lead_queries = [q for q in many.captured_queries if 'leads_lead' in q['sql']]
+        self.assertEqual(len(lead_queries), 3)
+
+    def test_leads_are_paginated(self):
+        from leads.views import LEAD_PAGE_SIZE
+        for i in range(LEAD_PAGE_SIZE + 2):
+            self._lead(f'Lead {i}')
+        self.c.login(username='closer', password='pass')
+        first = self.c.get(self.url)
+        self.assertEqual(len(first.context['leads']), LEAD_PAGE_SIZE)
+        second = self.c.get(self.url, {'cursor': first.context['next_cursor']})
+        self.assertEqual(len(second.context['leads']), 2)
+        self.assertIsNone(second.context['next_cursor'])
+
+
+class LeadAssignmentTests(TestCase):
+    def setUp(self):
+        self.closers = []
+        for name in ('ana', 'ben', 'cam'):
+            user = User.objects.create_user(username=name, password='pass')
+            user.profile.add_role('sales_closer')
+            self.closers.append(user)
+        self.ana, self.ben, self.cam = self.closers
+        self.caller = User.objects.create_user(username='caller', password='pass')
+        self.caller.profile.add_role('cold_caller')
+
+    def _leads(self, count, closer=None, status='new'):
+        Lead.objects.bulk_create([
+            Lead(business_name=f'L{i}', phone_number=str(i), category='Other', status=status, assigned_sales_closer=closer)
+            for i in range(count)
+        ])
+
+    def _loads(self):
+        from leads.assignment import open_pipeline
+        return open_pipeline([c.id for c in self.closers])
+
+    def test_least_loaded_evens_out_pipelines(self):
+        from leads.assignment import assign_leads
+        self._leads(4, closer=self.ana)
+        self._leads(3, closer=self.ben, status='deal_won')  # closed leads do not count
+        self._leads(8)
+        assigned = assign_leads('least_loaded')
+        self.assertEqual(sum(assigned.values()), 8)
+        self.assertEqual(self._loads(), {self.ana.id: 4, self.ben.id: 4, self.cam.id: 4})
+        self.assertFalse(Lead.objects.filter(assigned_sales_closer__isnull=True, status='new').exists())
+
+    def test_round_robin_takes_turns(self):
+        from leads.assignment import assign_leads
+        self._leads(7)
+        assigned = assign_leads('round_robin', batch_size=2)
+        self.assertEqual(assigned, {self.ana.id: 3, self.ben.id: 2, self.cam.id: 2})
+
+    def test_weighted_respects_capacity(self):
+        from accounts.models import UserProfile
+        from leads.assignment import assign_leads
+        UserProfile.objects.filter(user=self.ana).update(lead_capacity=6)
+        UserProfile.objects.filter(user=self.ben).update(lead_capacity=3)
+        UserProfile.objects.filter(user=self.cam).update(lead_capacity=0)
+        self._leads(1, closer=self.ben)
+        self._leads(20)
+        assigned = assign_leads('weighted')
+        self.assertEqual(assigned, {self.ana.id: 6, self.ben.id: 2, self.cam.id: 0})
+        self.assertEqual(Lead.objects.filter(assigned_sales_closer__isnull=True).count(), 12)
+
+    def test_queries_are_per_batch(self):
+        from leads.assignment import assign_leads
+        self._leads(30)
+        with CaptureQueriesContext(connection) as small:
+            assign_leads('round_robin', batch_size=10)
+        Lead.objects.update(assigned_sales_closer=None)
+        with CaptureQueriesContext(connection) as large:
+            assign_leads('round_robin', batch_size=30)
+        pipeline = [q for q in small.captured_queries if 'GROUP BY' in q['sql']]
+        self.assertEqual(len(pipeline), 1)
+        self.assertLess(len(large), len(small))
+
+    def test_unknown_strategy_is_rejected(self):
+        from leads.assignment import AssignmentError, assign_leads
+        with self.assertRaises(AssignmentError):
+            assign_leads('random')
+
+    def test_admin_endpoint_and_access(self):
+        admin = User.objects.create_user(username='boss', password='pass')
+        admin.profile.add_role('admin')
+        self._leads(3)
+        c = Client()
+        c.login(username='caller', password='pass')
+        c.post(reverse('leads:auto_assign'), {'strategy': 'round_robin'})
+        self.assertEqual(Lead.objects.filter(assigned_sales_closer__isnull=True).count(), 3)
+
+        c.login(username='boss', password='pass')
+        resp = c.post(reverse('leads:auto_assign'), {'strategy': 'round_robin'})
+        self.assertEqual(resp.status_code, 302)
+        self.assertFalse(Lead.objects.filter(assigned_sales_closer__isnull=True).exists())
+
+    def test_admin_form_only_offers_sales_closers(self):
+        from leads.forms import AdminLeadForm
+        choices = set(AdminLeadForm().fields['assigned_sales_closer'].queryset)
+        self.assertEqual(choices, set(self.closers))
+
+    def test_concurrent_assignments_are_not_overwritten(self):
+        from itertools import cycle
+        from unittest import mock
+        from leads.assignment import _PICKERS, assign_leads
+        self._leads(3)
+        raced = Lead.objects.order_by('id').first()
+
+        def racing(capacities, loads):
+            # An admin assigns a lead after the batch ids were read
+            Lead.objects.filter(pk=raced.pk).update(assigned_sales_closer=self.cam)
+            yield from cycle(capacities)
+
+        with mock.patch.dict(_PICKERS, {'round_robin': racing}):
+            assigned = assign_leads('round_robin')
+        raced.refresh_from_db()
+        self.assertEqual(raced.assigned_sales_closer, self.cam)
+        self.assertEqual(assigned, {self.ana.id: 0, self.ben.id: 1, self.cam.id: 1})
+
+    def test_admin_form_keeps_the_current_assignee(self):
+        from leads.forms import AdminLeadForm
+        self._leads(1, closer=self.ana)
+        lead = Lead.objects.get()
+        self.ana.is_active = False
+        self.ana.save()
+        self.assertNotIn(self.ana, AdminLeadForm().fields['assigned_sales_closer'].queryset)
+        form = AdminLeadForm({
+            'business_name': lead.business_name, 'phone_number': lead.phone_number, 'category': 'Other',
+            'status': 'new', 'assigned_sales_closer': self.ana.pk,
+        }, instance=lead)
+        self.assertTrue(form.is_valid(), form.errors)
+        self.assertEqual(form.save().assigned_sales_closer, self.ana)
+
+    def test_command_prints_per_closer_totals(self):
+        from django.core.management import call_command
+        self._leads(3)
+        out = io.StringIO()
+        call_command('assign_leads', strategy='round_robin', stdout=out)
+        self.assertIn('Assigned 3 leads (round_robin).', out.getvalue())
+        self.assertIn('ana: 1', out.getvalue())
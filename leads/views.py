@@ -1,50 +1,61 @@
+import csv
+import io
+
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
 from .models import Lead
-from .forms import LeadForm, AdminLeadForm
+from .search import SEARCH_ORDERING, parse_terms, search_leads
+from .forms import LeadForm, AdminLeadForm, LeadImportForm, LeadAutoAssignForm
+from .assignment import assign_leads
+from .importer import LeadImportError, import_leads
 from accounts.mixins import SalesCloserRequiredMixin
+from accounts.roles import role_filter, get_role_names, has_any_role
 from django.views import View
 from projects.models import Project
 from activity.utils import log_activity
+from projects.cache_utils import invalidate_admin_cache
 from django.db import models
+from assanj_portal.pagination import keyset_paginate
+
+# Role access for these views is declared in accounts.policy.ACCESS_POLICY
+# and enforced by AccessPolicyMiddleware; object-level rules stay below.
+
+LEAD_PAGE_SIZE = 25
+LEAD_ORDERING = ('-created_at', '-id')
+
 
 @login_required
 def cold_caller_dashboard(request):
-    if not (
-        request.user.profile.has_role('cold_caller')
-        or request.user.profile.has_role('project_manager')
-        or request.user.profile.has_role('admin')
-    ):
-        messages.error(request, 'Access denied. You do not have permissions to view leads.')
-        return redirect('cold_caller_dashboard')
-
     show_my_leads = request.GET.get('my_leads') == '1'
 
     if show_my_leads:
-        leads = Lead.objects.filter(created_by=request.user).order_by('-created_at')
+        leads = Lead.objects.filter(created_by=request.user)
     else:
-        leads = Lead.objects.all().order_by('-created_at')
-
-    my_leads = Lead.objects.filter(created_by=request.user)
-
-    projects = Project.objects.filter(lead__in=my_leads)
-    total_earned = projects.aggregate(
-        models.Sum('fetcher_commission_amount')
-    )['fetcher_commission_amount__sum'] or 0
-
-    pending = projects.filter(
-        payment_status__in=['not_paid', 'paid_advance']
-    ).aggregate(
-        models.Sum('fetcher_commission_amount')
-    )['fetcher_commission_amount__sum'] or 0
+        leads = Lead.objects.all()
+    page = keyset_paginate(leads, LEAD_ORDERING, request.GET.get('cursor'), LEAD_PAGE_SIZE)
+
+    # Row permissions decided once here instead of per row in the template
+    can_manage_all = has_any_role(request.user, ('admin', 'project_manager'))
+    for lead in page:
+        lead.can_manage = can_manage_all or lead.created_by_id == request.user.id
+
+    earnings = Project.objects.filter(lead__created_by=request.user).aggregate(
+        total=models.Sum('fetcher_commission_amount'),
+        pending=models.Sum(
+            'fetcher_commission_amount',
+            filter=models.Q(payment_status__in=['not_paid', 'paid_advance']),
+        ),
+    )
 
     context = {
-        'total_earned': total_earned,
-        'pending': pending,
+        'total_earned': earnings['total'] or 0,
+        'pending': earnings['pending'] or 0,
         'form': LeadForm(),
-        'leads': leads,
+        'leads': page.items,
+        'next_cursor': page.next_cursor,
         'show_my_leads': show_my_leads,
     }
     return render(request, 'cold_caller_dashboard.html', context)
@@ -58,10 +69,22 @@ def add_lead(request):
             lead = form.save(commit=False)
             lead.created_by = request.user
             lead.save()
+            # Indexed phone_key lookup; the lead is still saved, the caller is warned
+            duplicate = (
+                Lead.objects.same_phone(lead.phone_number).exclude(pk=lead.pk)
+                .order_by('-created_at').values('business_name', 'created_by__username').first()
+            )
+            if duplicate:
+                messages.warning(
+                    request,
+                    f"This phone number is already on lead \"{duplicate['business_name']}\""
+                    f" (added by {duplicate['created_by__username'] or 'unknown'}).",
+                )
             # Log meeting details when meeting_booked
             if lead.status == 'meeting_booked' and lead.meeting_details:
                 log_activity('meeting_booked', 'lead', lead.id, request.user, note=lead.meeting_details)
             log_activity('create_lead', 'lead', lead.id, request.user)
+            invalidate_admin_cache()
             messages.success(request, 'Lead created successfully.')
             return redirect('leads:cold_caller_dashboard')
         else:
@@ -69,17 +92,75 @@ def add_lead(request):
     return redirect('leads:cold_caller_dashboard')
 
 
+@login_required
+def import_leads_csv(request):
+    """Upload a CSV of leads; rows are validated, deduplicated by phone and bulk inserted."""
+    result = None
+    form = LeadImportForm(request.POST or None, request.FILES or None)
+    if request.method == 'POST' and form.is_valid():
+        # Decode the upload lazily so the rows are streamed, not read into memory
+        lines = io.TextIOWrapper(form.cleaned_data['file'].file, encoding='utf-8-sig', newline='')
+        # The running totals, as of the last batch written, if the import fails partway
+        written = []
+        try:
+            result = import_leads(
+                lines, request.user, max_rows=settings.LEAD_IMPORT_MAX_ROWS, progress=written.append,
+            )
+        except (LeadImportError, UnicodeDecodeError, csv.Error) as exc:
+            result = written[-1] if written else None
+            if result is not None and result.created:
+                invalidate_admin_cache()
+                messages.error(
+                    request,
+                    f'Import stopped: {exc} The {result.created} leads created before that were kept; '
+                    'uploading the file again skips them as already existing.',
+                )
+            else:
+                messages.error(request, f'Could not import the file: {exc}')
+        else:
+            if result.created:
+                invalidate_admin_cache()
+            messages.success(request, f'Import finished. {result.summary()}.')
+    return render(request, 'import_leads.html', {
+        'form': form,
+        'result': result,
+        'max_rows': settings.LEAD_IMPORT_MAX_ROWS,
+        'max_upload_mb': settings.LEAD_IMPORT_MAX_UPLOAD_SIZE // (1024 * 1024),
+    })
+
+
+@login_required
+def auto_assign_leads(request):
+    """Distribute unassigned open leads among sales closers (POST from the admin dashboard)."""
+    if request.method != 'POST':
+        return redirect('projects:admin_projects')
+    form = LeadAutoAssignForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, 'Choose a valid assignment strategy.')
+        return redirect('projects:admin_projects')
+    assigned = assign_leads(form.cleaned_data['strategy'], user=request.user)
+    total = sum(assigned.values())
+    if not assigned:
+        messages.warning(request, 'There are no active sales closers to assign leads to.')
+    elif total:
+        messages.success(request, f'Assigned {total} leads to {sum(1 for n in assigned.values() if n)} sales closers.')
+    else:
+        messages.info(request, 'No leads were assigned.')
+    return redirect('projects:admin_projects')
+
+
 @login_required
 def edit_lead(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
     # cold caller can edit only own leads; admin can edit all
-    if not (request.user.profile.has_role('admin') or request.user.profile.has_role('project_manager')  or lead.created_by == request.user):
+    if not (has_any_role(request.user, ('admin', 'project_manager')) or lead.created_by_id == request.user.id):
         messages.error(request, 'You do not have permission to edit this lead.')
         return redirect('leads:cold_caller_dashboard')
 
+    is_admin = 'admin' in get_role_names(request.user)
     if request.method == 'POST':
         # Admins can assign a sales closer, others cannot
-        if request.user.profile.has_role('admin'):
+        if is_admin:
             form = AdminLeadForm(request.POST, instance=lead)
         else:
             # Ensure the assigned_sales_closer cannot be changed by non-admins
@@ -90,10 +171,11 @@ def edit_lead(request, pk):
         if form.is_valid():
             form.save()
             log_activity('edit_lead', 'lead', lead.id, request.user)
+            invalidate_admin_cache()
             messages.success(request, 'Lead updated successfully.')
             return redirect('leads:cold_caller_dashboard')
     else:
-        if request.user.profile.has_role('admin'):
+        if is_admin:
             form = AdminLeadForm(instance=lead)
         else:
             form = LeadForm(instance=lead)
@@ -104,64 +186,75 @@ def edit_lead(request, pk):
 @login_required
 def delete_lead(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
-    if not (request.user.profile.has_role('admin') or request.user.profile.has_role('project_manager') or lead.created_by == request.user):
+    if not (has_any_role(request.user, ('admin', 'project_manager')) or lead.created_by_id == request.user.id):
         messages.error(request, 'You do not have permission to delete this lead.')
         return redirect('leads:cold_caller_dashboard')
 
     lead.delete()
     log_activity('delete_lead', 'lead', pk, request.user)
+    invalidate_admin_cache()
     messages.success(request, 'Lead deleted successfully.')
     return redirect('leads:cold_caller_dashboard')
 
 
 class SalesCloserDashboardView(View):
     def get(self, request):
-        if not request.user.profile.has_role('sales_closer') and not request.user.profile.has_role('admin') and not request.user.profile.has_role('project_manager'):
-            messages.error(request, 'You do not have permission to view this page.')
-            return redirect('dashboard:dashboard')
         leads = Lead.objects.filter(assigned_sales_closer=request.user)
-        # summary
-        deals_won = leads.filter(status='deal_won').count()
-        meetings = leads.filter(status='meeting_booked').count()
-        # sum value of projects created from these leads (if any)
-        from projects.models import Project
-        projects = Project.objects.filter(lead__in=leads)
-        total_value = projects.aggregate(models.Sum('total_price'))['total_price__sum'] or 0
-        return render(request, 'sales_closer_dashboard.html', {'leads': leads, 'deals_won': deals_won, 'meetings': meetings, 'total_value': total_value})
+        # summary: every status count in one query, project value through a join
+        counts = leads.status_counts()
+        total_value = Project.objects.filter(lead__assigned_sales_closer=request.user).aggregate(
+            total=models.Sum('total_price'),
+        )['total'] or 0
+        page = keyset_paginate(leads.with_project_totals(), LEAD_ORDERING, request.GET.get('cursor'), LEAD_PAGE_SIZE)
+        context = {
+            'leads': page.items,
+            'next_cursor': page.next_cursor,
+            'status_counts': counts,
+            'deals_won': counts['deal_won'],
+            'meetings': counts['meeting_booked'],
+            'total_value': total_value,
+        }
+        return render(request, 'sales_closer_dashboard.html', context)
+
 
 @login_required
 def filter_leads(request):
     """Filter leads by status and search term for the current user (callers see their leads)."""
-    if not (request.user.profile.has_role('cold_caller') or request.user.profile.has_role('sales_closer') or request.user.profile.has_role('admin') or request.user.profile.has_role('project_manager')):
-        messages.error(request, 'Access denied.')
-        return redirect('dashboard:dashboard')
-
+    roles = get_role_names(request.user)
     status = request.GET.get('status')
     q = request.GET.get('q', '').strip()
 
     qs = Lead.objects.all()
     # If caller, restrict to their leads
-    if request.user.profile.has_role('cold_caller') and not request.user.profile.has_role('admin'):
+    if 'cold_caller' in roles and 'admin' not in roles:
         qs = qs.filter(created_by=request.user)
     # If sales_closer, restrict to assigned leads
-    if request.user.profile.has_role('sales_closer') and not request.user.profile.has_role('admin'):
+    if 'sales_closer' in roles and 'admin' not in roles:
         qs = qs.filter(assigned_sales_closer=request.user)
 
     if status:
         qs = qs.filter(status=status)
-    if q:
-        qs = qs.filter(business_name__icontains=q)
 
-    return render(request, 'filter.html', {'leads': qs})
+    # Ranked full-text matches across the indexed fields (see leads.search)
+    ordering = LEAD_ORDERING
+    if parse_terms(q):
+        qs = search_leads(qs, q)
+        ordering = SEARCH_ORDERING
+    page = keyset_paginate(qs, ordering, request.GET.get('cursor'), LEAD_PAGE_SIZE)
+
+    context = {
+        'leads': page.items,
+        'next_cursor': page.next_cursor,
+        'status': status or '',
+        'q': q,
+        'status_choices': Lead.STATUS_CHOICES,
+    }
+    return render(request, 'filter.html', context)
 
 
 @login_required
 def sales_closer_onboard(request):
     """Create client + starter project from Sales Closer dashboard (onboarding flow)."""
-    if not (request.user.profile.has_role('sales_closer') or request.user.profile.has_role('admin') or request.user.profile.has_role('project_manager')):
-        messages.error(request, 'You do not have permission to onboard clients.')
-        return redirect('dashboard:dashboard')
-
     if request.method == 'POST':
         business_name = request.POST.get('business_name', '').strip()
         phone = request.POST.get('phone', '').strip()
@@ -197,7 +290,7 @@ def sales_closer_onboard(request):
 def mark_won(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
     # only assigned sales closer or admin
-    if not (request.user.profile.has_role('admin')  or request.user.profile.has_role('project_manager') or lead.assigned_sales_closer == request.user):
+    if not (has_any_role(request.user, ('admin', 'project_manager')) or lead.assigned_sales_closer_id == request.user.id):
         messages.error(request, 'You do not have permission to perform this action.')
         return redirect('leads:sales_closer_dashboard')
 
@@ -206,12 +299,16 @@ def mark_won(request, pk):
 
     # Create a Project automatically and assign to admin/project_manager
     client = None
-    # If a Client matching business_name exists, link, else create a Client
+    # Link the oldest Client with the same normalized phone, else create one
     from clients.models import Client
-    client_obj, created = Client.objects.get_or_create(business_name=lead.business_name, defaults={'phone': lead.phone_number, 'created_by': lead.created_by})
+    client_obj = Client.objects.same_phone(lead.phone_number).order_by('date_created', 'pk').first()
+    if client_obj is None:
+        client_obj = Client.objects.create(
+            business_name=lead.business_name, phone=lead.phone_number, created_by=lead.created_by or request.user,
+        )
 
     # Create project with created_by as the cold caller who created the lead (so they see it in their projects list)
-    creator = lead.created_by if lead.created_by else User.objects.filter(profile__roles__name='admin').first()
+    creator = lead.created_by or User.objects.filter(role_filter(['admin'])).order_by('pk').first() or request.user
     
     project = Project.objects.create(
         client=client_obj,
@@ -233,6 +330,7 @@ def mark_won(request, pk):
     # Move ownership to admin/project manager (we leave created_by as a system admin if not assigned)
     log_activity('lead_marked_won', 'lead', lead.id, request.user)
     log_activity('project_created', 'project', project.id, request.user)
+    invalidate_admin_cache()
 
     messages.success(request, 'Lead marked as won and project created successfully.')
     return redirect('leads:sales_closer_dashboard')
@@ -241,13 +339,14 @@ def mark_won(request, pk):
 @login_required
 def mark_lost(request, pk):
     lead = get_object_or_404(Lead, pk=pk)
-    if not (request.user.profile.has_role('admin')  or request.user.profile.has_role('project_manager') or lead.assigned_sales_closer == request.user):
+    if not (has_any_role(request.user, ('admin', 'project_manager')) or lead.assigned_sales_closer_id == request.user.id):
         messages.error(request, 'You do not have permission to perform this action.')
         return redirect('leads:sales_closer_dashboard')
 
     lead.status = 'deal_lost'
     lead.save()
     log_activity('lead_marked_lost', 'lead', lead.id, request.user)
+    invalidate_admin_cache()
     messages.success(request, 'Lead marked as lost.')
     return redirect('leads:sales_closer_dashboard')
 
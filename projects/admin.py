@@ -3,7 +3,7 @@ Admin configuration for Project model.
 """
 
 from django.contrib import admin
-from .models import Project
+from .models import Project, PayoutEntry
 
 
 @admin.register(Project)
@@ -74,3 +74,11 @@ class ProjectAdmin(admin.ModelAdmin):
             )
         }),
     )
+
+
+@admin.register(PayoutEntry)
+class PayoutEntryAdmin(admin.ModelAdmin):
+    list_display = ('project', 'user', 'role', 'amount', 'released')
+    list_filter = ('role', 'released')
+    search_fields = ('user__username', 'project__client__business_name')
+    raw_id_fields = ('project', 'user')
@@ -5,6 +5,7 @@ Forms for Project creation and management.
 import json
 from django import forms
 from django.contrib.auth.models import User
+from accounts.roles import role_filter
 from .models import Project
 
 
@@ -175,11 +176,11 @@ class AdminAssignForm(forms.Form):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.fields['assigned_to'].queryset = User.objects.filter(
-            profile__roles__name='developer'
+            role_filter(['developer'])
         )
         # Add assigned team selection (designers, developers, seo, gbp)
         self.fields['assigned_team'] = forms.ModelMultipleChoiceField(
-            queryset=User.objects.filter(profile__roles__name__in=['designer', 'developer', 'seo', 'gbp']).distinct(),
+            queryset=User.objects.filter(role_filter(['designer', 'developer', 'seo', 'gbp'])),
             required=False,
             label='Assigned Team'
         )
@@ -0,0 +1,89 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:40
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Frozen copies of accounts.roles.ROLE_BITS and Project.ROLE_PAYOUT_FIELDS
+ROLE_BITS = {'designer': 1 << 2, 'seo': 1 << 4, 'gbp': 1 << 5, 'social_media': 1 << 6}
+ROLE_PAYOUT_FIELDS = (
+    ('designer', 'designer_payout_amount'),
+    ('seo', 'seo_payout_amount'),
+    ('gbp', 'gbp_payout_amount'),
+    ('social_media', 'social_media_payout_amount'),
+)
+
+
+def backfill_payout_entries(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    PayoutEntry = apps.get_model('projects', 'PayoutEntry')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    masks = dict(UserProfile.objects.values_list('user_id', 'role_mask'))
+    # assigned_payments keys are not foreign keys; stale ids of deleted users are skipped
+    user_ids = set(User.objects.values_list('pk', flat=True))
+    batch = []
+    for project in Project.objects.prefetch_related('assigned_team').iterator(chunk_size=500):
+        entries = {}
+
+        def add(user_id, role, amount):
+            if user_id and amount:
+                entries[(user_id, role)] = PayoutEntry(
+                    project_id=project.pk, user_id=user_id, role=role,
+                    amount=Decimal(str(amount)), released=project.admin_payment_released,
+                )
+
+        add(project.created_by_id, 'fetcher', project.fetcher_commission_amount)
+        add(project.assigned_to_id, 'developer', project.developer_payout_amount)
+        for key, amount in (project.assigned_payments or {}).items():
+            try:
+                user_id = int(key)
+                amount = Decimal(str(amount))
+            except (TypeError, ValueError, InvalidOperation):
+                continue
+            if user_id not in user_ids:
+                continue
+            if user_id == project.assigned_to_id and project.developer_payout_amount:
+                continue
+            add(user_id, 'assigned', amount)
+        for member in project.assigned_team.all():
+            mask = masks.get(member.pk) or 0
+            for role, field in ROLE_PAYOUT_FIELDS:
+                if mask & ROLE_BITS[role]:
+                    add(member.pk, role, getattr(project, field))
+        batch.extend(entries.values())
+        if len(batch) >= 1000:
+            PayoutEntry.objects.bulk_create(batch)
+            batch = []
+    PayoutEntry.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_alter_project_current_stage'),
+        ('accounts', '0003_userprofile_role_mask'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayoutEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('fetcher', 'Fetcher Commission'), ('developer', 'Developer'), ('assigned', 'Assigned Payment'), ('designer', 'Designer'), ('seo', 'SEO'), ('gbp', 'GBP'), ('social_media', 'Social Media')], max_length=20)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('released', models.BooleanField(default=False)),
+                ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_entries', to='projects.project')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payout_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'released'], name='payout_user_released_idx')],
+                'constraints': [models.UniqueConstraint(fields=('project', 'user', 'role'), name='unique_payout_entry')],
+            },
+        ),
+        migrations.RunPython(backfill_payout_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,132 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:44
+
+from decimal import Decimal, InvalidOperation
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+# ProjectAssignment.ROLE_CHOICES order: a member's first matching role wins
+ASSIGNMENT_ROLES = ('designer', 'developer', 'seo', 'gbp', 'social_media')
+
+
+def copy_assigned_payments(apps, schema_editor):
+    """Move the assigned_payments JSON into ProjectAssignment.amount and set roles.
+
+    Payout recipients who were not on the team get a row with
+    is_member=False, so the move doesn't make the project visible to them.
+    Every row's role is filled from the user's roles, as Project.set_team does.
+    """
+    Project = apps.get_model('projects', 'Project')
+    ProjectAssignment = apps.get_model('projects', 'ProjectAssignment')
+    UserProfile = apps.get_model('accounts', 'UserProfile')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    user_ids = set(User.objects.values_list('pk', flat=True))
+
+    projects = Project.objects.exclude(assigned_payments__isnull=True).exclude(assigned_payments={})
+    for project in projects.iterator(chunk_size=500):
+        payouts = {}
+        for key, amount in (project.assigned_payments or {}).items():
+            try:
+                user_id = int(key)
+                payouts[user_id] = Decimal(str(amount))
+            except (TypeError, ValueError, InvalidOperation):
+                continue
+        existing = {a.user_id: a for a in ProjectAssignment.objects.filter(project_id=project.pk)}
+        changed, created = [], []
+        for user_id, amount in payouts.items():
+            if user_id in existing:
+                existing[user_id].amount = amount
+                changed.append(existing[user_id])
+            elif user_id in user_ids:
+                created.append(ProjectAssignment(
+                    project_id=project.pk, user_id=user_id, amount=amount, is_member=False,
+                ))
+        ProjectAssignment.objects.bulk_update(changed, ['amount'])
+        ProjectAssignment.objects.bulk_create(created)
+
+    names = {}
+    memberships = UserProfile.roles.through.objects.filter(role__name__in=ASSIGNMENT_ROLES)
+    for user_id, name in memberships.values_list('userprofile__user_id', 'role__name'):
+        names.setdefault(user_id, set()).add(name)
+    for user_id, held in names.items():
+        role = next(role for role in ASSIGNMENT_ROLES if role in held)
+        ProjectAssignment.objects.filter(user_id=user_id).update(role=role)
+
+
+def restore_assigned_payments(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    ProjectAssignment = apps.get_model('projects', 'ProjectAssignment')
+    payouts = {}
+    for project_id, user_id, amount in ProjectAssignment.objects.filter(
+        amount__isnull=False
+    ).values_list('project_id', 'user_id', 'amount'):
+        payouts.setdefault(project_id, {})[str(user_id)] = float(amount)
+    for project in Project.objects.filter(pk__in=payouts):
+        project.assigned_payments = payouts[project.pk]
+        project.save(update_fields=['assigned_payments'])
+    # Payout-only rows were never team members
+    ProjectAssignment.objects.filter(is_member=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userprofile_role_mask'),
+        ('projects', '0008_payoutentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Adopt the existing auto-created assigned_team table as the through model
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.CreateModel(
+                    name='ProjectAssignment',
+                    fields=[
+                        ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                        ('project', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assignments', to='projects.project')),
+                        ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='project_assignments', to=settings.AUTH_USER_MODEL)),
+                    ],
+                    options={
+                        'db_table': 'projects_project_assigned_team',
+                        'unique_together': {('project', 'user')},
+                    },
+                ),
+                migrations.AlterField(
+                    model_name='project',
+                    name='assigned_team',
+                    field=models.ManyToManyField(blank=True, related_name='team_projects', through='projects.ProjectAssignment', to=settings.AUTH_USER_MODEL),
+                ),
+            ],
+        ),
+        migrations.AlterModelTable(
+            name='projectassignment',
+            table=None,
+        ),
+        migrations.AddField(
+            model_name='projectassignment',
+            name='role',
+            field=models.CharField(blank=True, choices=[('designer', 'Designer'), ('developer', 'Developer'), ('seo', 'SEO'), ('gbp', 'GBP'), ('social_media', 'Social Media')], default='', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='projectassignment',
+            name='amount',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectassignment',
+            name='is_member',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddIndex(
+            model_name='projectassignment',
+            index=models.Index(fields=['user', 'project'], name='assignment_user_project_idx'),
+        ),
+        migrations.RunPython(copy_assigned_payments, restore_assigned_payments),
+        migrations.RemoveField(
+            model_name='project',
+            name='assigned_payments',
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clients', '0002_client_user'),
+        ('leads', '0003_lead_lead_creator_created_idx_and_more'),
+        ('projects', '0009_projectassignment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'date_created', 'id'], name='project_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['created_by', 'status'], name='project_creator_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['assigned_to', 'status'], name='project_assignee_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(fields=['status', 'admin_payment_released'], name='project_status_released_idx'),
+        ),
+    ]
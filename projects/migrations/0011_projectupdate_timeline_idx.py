@@ -0,0 +1,19 @@
+# Generated by Django 5.2.6 on 2026-10-16 22:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_project_project_status_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='projectupdate',
+            index=models.Index(fields=['project', 'created_at', 'id'], name='projectupdate_timeline_idx'),
+        ),
+    ]
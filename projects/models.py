@@ -1,9 +1,72 @@
 import json
+from decimal import Decimal
 from django.db import models
+from django.db.models import Q, Sum
+from django.db.models.signals import post_save, m2m_changed
+from django.dispatch import receiver
 from django.contrib.auth.models import User
+from accounts.models import roles_changed
 from clients.models import Client
 
 
+class ProjectQuerySet(models.QuerySet):
+    # Scope name -> relations that make a project visible to a user
+    VISIBILITY_SCOPES = {
+        'created': ('created_by',),
+        'assigned': ('assigned_to',),
+        'team': ('team',),
+        'execution': ('assigned_to', 'team'),
+        'involved': ('created_by', 'assigned_to', 'team'),
+        'client': ('client',),
+    }
+
+    def visible_to(self, user, scope='execution'):
+        """Return projects `user` can see under `scope` (see VISIBILITY_SCOPES).
+
+        Team membership is an `id IN (...)` over the user's ProjectAssignment
+        rows, read from the (user, project) index, so projects are fetched by
+        primary key instead of probing every row; no join fans out rows and
+        no DISTINCT is needed.
+        """
+        try:
+            relations = self.VISIBILITY_SCOPES[scope]
+        except KeyError:
+            raise ValueError(f"Unknown project visibility scope: {scope!r}")
+        if not getattr(user, 'is_authenticated', False):
+            return self.none()
+        predicate = Q()
+        for relation in relations:
+            if relation == 'team':
+                predicate |= Q(pk__in=ProjectAssignment.objects.filter(
+                    user=user, is_member=True,
+                ).values('project_id'))
+            elif relation == 'client':
+                predicate |= Q(client__user=user)
+            else:
+                predicate |= Q(**{relation: user})
+        return self.filter(predicate)
+
+    # Roles that may see every project
+    STAFF_ROLES = ('admin', 'project_manager')
+
+    def viewable_by(self, user, scope='involved'):
+        """Like `visible_to`, but superusers and staff roles see every project.
+
+        The role check uses the request's memoized role set, so
+        `viewable_by(user).filter(pk=pk).exists()` is a single EXISTS query.
+        """
+        from accounts.roles import has_any_role
+        if getattr(user, 'is_superuser', False) or (
+            getattr(user, 'is_authenticated', False) and has_any_role(user, self.STAFF_ROLES)
+        ):
+            return self.all()
+        return self.visible_to(user, scope)
+
+    def can_view(self, user, project_id, scope='involved'):
+        """Return True if `user` may see project `project_id` (one EXISTS query)."""
+        return self.viewable_by(user, scope).filter(pk=project_id).exists()
+
+
 class Project(models.Model):
     """
     Main project model with complete workflow tracking.
@@ -111,7 +174,9 @@ class Project(models.Model):
     payment_60_received = models.BooleanField(default=False)
 
     # Assigned team members (designers, developers, seo, gbp, etc.)
-    assigned_team = models.ManyToManyField(User, related_name='team_projects', blank=True)
+    assigned_team = models.ManyToManyField(
+        User, related_name='team_projects', blank=True, through='ProjectAssignment'
+    )
 
     # Project workflow stage (strict order enforced in views)
     STAGE_CHOICES = [
@@ -195,28 +260,298 @@ class Project(models.Model):
         blank=True
     )
 
-    # Optional per-user payouts stored as JSON: {"user_id": amount}
-    assigned_payments = models.JSONField(default=dict, blank=True, null=True)
+    objects = ProjectQuerySet.as_manager()
+
+    class Meta:
+        # One index per hot dashboard filter; (status, date_created, id) also
+        # serves plain status lookups and the admin keyset buckets.
+        indexes = [
+            models.Index(fields=['status', 'date_created', 'id'], name='project_status_created_idx'),
+            models.Index(fields=['created_by', 'status'], name='project_creator_status_idx'),
+            models.Index(fields=['assigned_to', 'status'], name='project_assignee_status_idx'),
+            models.Index(fields=['status', 'admin_payment_released'], name='project_status_released_idx'),
+        ]
 
     def get_user_payout(self, user):
-        """Return payout amount for a specific user for this project."""
+        """Return payout amount for a specific user for this project.
+
+        Querysets annotated with `user_assignment_amount` (see
+        `ProjectAssignment.amount_for`) for the same user skip the lookup.
+        """
         if not user:
             return 0
         # If user is the main assigned developer use developer_payout_amount
-        if self.assigned_to and self.assigned_to == user and self.developer_payout_amount:
+        if self.assigned_to_id and self.assigned_to_id == user.id and self.developer_payout_amount:
             return float(self.developer_payout_amount)
-        # Check assigned_payments mapping
-        try:
-            payments = self.assigned_payments or {}
-            uid = str(user.id)
-            # support both str keys and int keys
-            if uid in payments:
-                return float(payments[uid])
-            if user.id in payments:
-                return float(payments[user.id])
-        except Exception:
-            return 0
-        return 0
+        if 'user_assignment_amount' in self.__dict__:
+            amount = self.user_assignment_amount
+        else:
+            amount = self.assignments.filter(user=user).values_list('amount', flat=True).first()
+        return float(amount) if amount else 0
+
+    def set_team(self, members, payouts=None):
+        """Sync the assigned team and per-user payouts ({user_id: amount}) in bulk.
+
+        Users with a payout who are not in `members` get a payout-only row
+        (is_member=False): they are paid but don't join the team or see the
+        project. Existing amounts are kept unless `payouts` names the user.
+        Rebuilds the payout ledger once.
+        """
+        from accounts.roles import ROLE_BITS
+        payouts = {int(k): Decimal(str(v)) for k, v in (payouts or {}).items()}
+        member_ids = {m.pk for m in members}
+        wanted = member_ids | set(payouts)
+        existing = {a.user_id: a for a in self.assignments.all()}
+
+        self.assignments.exclude(user_id__in=wanted).delete()
+        changed = []
+        for user_id, assignment in existing.items():
+            if user_id not in wanted:
+                continue
+            is_member = user_id in member_ids
+            amount = payouts.get(user_id, assignment.amount)
+            if (assignment.amount, assignment.is_member) != (amount, is_member):
+                assignment.amount, assignment.is_member = amount, is_member
+                changed.append(assignment)
+        ProjectAssignment.objects.bulk_update(changed, ['amount', 'is_member'])
+
+        new_ids = wanted - set(existing)
+        masks = dict(User.objects.filter(pk__in=new_ids).values_list('pk', 'profile__role_mask'))
+        ProjectAssignment.objects.bulk_create([
+            ProjectAssignment(
+                project=self, user_id=user_id, amount=payouts.get(user_id),
+                is_member=user_id in member_ids,
+                role=next(
+                    (role for role, _ in ProjectAssignment.ROLE_CHOICES
+                     if (masks.get(user_id) or 0) & ROLE_BITS[role]),
+                    '',
+                ),
+            )
+            for user_id in new_ids if user_id in masks
+        ])
+        self.rebuild_payout_entries()
+
+    # Execution roles paid from a per-role project field when the team member has that role
+    ROLE_PAYOUT_FIELDS = (
+        ('designer', 'designer_payout_amount'),
+        ('seo', 'seo_payout_amount'),
+        ('gbp', 'gbp_payout_amount'),
+        ('social_media', 'social_media_payout_amount'),
+    )
+
+    def build_payout_entries(self):
+        """Return unsaved PayoutEntry rows describing who earns what on this project."""
+        from accounts.roles import ROLE_BITS
+        released = self.admin_payment_released
+        entries = {}
+
+        def add(user_id, role, amount):
+            if user_id and amount:
+                entries[(user_id, role)] = PayoutEntry(
+                    project=self, user_id=user_id, role=role,
+                    amount=Decimal(str(amount)), released=released,
+                )
+
+        add(self.created_by_id, 'fetcher', self.fetcher_commission_amount)
+        add(self.assigned_to_id, 'developer', self.developer_payout_amount)
+
+        if self.pk:
+            team = self.assignments.values_list('user_id', 'amount', 'is_member', 'user__profile__role_mask')
+            for user_id, amount, is_member, mask in team:
+                # Manual per-user payouts; the assigned developer is already paid above
+                if not (user_id == self.assigned_to_id and self.developer_payout_amount):
+                    add(user_id, 'assigned', amount)
+                if not is_member:
+                    continue
+                for role, field in self.ROLE_PAYOUT_FIELDS:
+                    if (mask or 0) & ROLE_BITS[role]:
+                        add(user_id, role, getattr(self, field))
+        return list(entries.values())
+
+    def team_members(self):
+        """Users on the team, without payout-only recipients (one query)."""
+        return User.objects.filter(project_assignments__project=self, project_assignments__is_member=True)
+
+    def rebuild_payout_entries(self):
+        """Replace this project's ledger rows with freshly computed ones."""
+        PayoutEntry.objects.filter(project=self).delete()
+        PayoutEntry.objects.bulk_create(self.build_payout_entries())
+
+    # Fields build_payout_entries reads from the project row itself
+    PAYOUT_FIELDS = (
+        'created_by_id', 'assigned_to_id', 'fetcher_commission_amount', 'developer_payout_amount',
+        *(field for _, field in ROLE_PAYOUT_FIELDS), 'admin_payment_released',
+    )
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._payout_state = instance.payout_state()
+        return instance
+
+    def payout_state(self):
+        """Loaded values of PAYOUT_FIELDS (deferred ones as None), to detect ledger changes."""
+        return {field: self.__dict__.get(field) for field in self.PAYOUT_FIELDS}
+
+
+class ProjectAssignment(models.Model):
+    """
+    Team membership for `Project.assigned_team`, with the member's role on the
+    project and an optional manual payout. Indexed on user so "my projects"
+    and earnings lookups are joins rather than scans.
+
+    Rows with is_member=False only carry a payout for someone outside the
+    team; they grant no visibility and are left out of `Project.team_members()`.
+    """
+
+    ROLE_CHOICES = [
+        ('designer', 'Designer'),
+        ('developer', 'Developer'),
+        ('seo', 'SEO'),
+        ('gbp', 'GBP'),
+        ('social_media', 'Social Media'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='assignments')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='project_assignments')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES, blank=True, default='')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    is_member = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = [('project', 'user')]
+        indexes = [
+            models.Index(fields=['user', 'project'], name='assignment_user_project_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} on Project #{self.project_id}"
+
+    @classmethod
+    def amount_for(cls, user):
+        """Subquery for annotating projects with `user`'s manual payout."""
+        return models.Subquery(
+            cls.objects.filter(project=models.OuterRef('pk'), user=user).values('amount')[:1]
+        )
+
+
+class PayoutEntryQuerySet(models.QuerySet):
+    def earnings(self):
+        """Return {'total': released, 'pending': completed-but-unreleased} in one query."""
+        totals = self.aggregate(
+            total=Sum('amount', filter=Q(released=True)),
+            pending=Sum('amount', filter=Q(released=False, project__status='completed')),
+        )
+        return {
+            'total': totals['total'] or Decimal('0'),
+            'pending': totals['pending'] or Decimal('0'),
+        }
+
+
+class PayoutEntry(models.Model):
+    """
+    Materialized payout ledger: one row per (project, user, role).
+    Rebuilt from the project's payout fields when they or the team change,
+    and a member's role rows when their roles change, so earnings pages are
+    a single SUM instead of Python loops.
+    """
+
+    ROLE_CHOICES = [
+        ('fetcher', 'Fetcher Commission'),
+        ('developer', 'Developer'),
+        ('assigned', 'Assigned Payment'),
+        ('designer', 'Designer'),
+        ('seo', 'SEO'),
+        ('gbp', 'GBP'),
+        ('social_media', 'Social Media'),
+    ]
+
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='payout_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payout_entries')
+    role = models.CharField(max_length=20, choices=ROLE_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    released = models.BooleanField(default=False)
+
+    objects = PayoutEntryQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'user', 'role'], name='unique_payout_entry'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'released'], name='payout_user_released_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} - {self.role} - {self.amount} (Project #{self.project_id})"
+
+
+@receiver(post_save, sender=Project)
+def sync_payout_entries(sender, instance, created=False, raw=False, update_fields=None, **kwargs):
+    """Keep the payout ledger in step with the project's payout fields.
+
+    Saves that leave every PAYOUT_FIELDS value alone don't touch the ledger;
+    a release alone flips `released` in place.
+    """
+    if raw:
+        return
+    if update_fields is not None and not (
+        {name.removesuffix('_id') for name in update_fields}
+        & {name.removesuffix('_id') for name in Project.PAYOUT_FIELDS}
+    ):
+        return
+    state = instance.payout_state()
+    previous = getattr(instance, '_payout_state', None)
+    instance._payout_state = state
+    if created or previous is None:
+        instance.rebuild_payout_entries()
+        return
+    changed = {field for field in Project.PAYOUT_FIELDS if state[field] != previous[field]}
+    if changed == {'admin_payment_released'}:
+        PayoutEntry.objects.filter(project=instance).update(released=instance.admin_payment_released)
+    elif changed:
+        instance.rebuild_payout_entries()
+
+
+@receiver(roles_changed)
+def sync_role_payouts_on_role_change(sender, user_id, role_mask, **kwargs):
+    """Recompute a user's role-derived ledger rows across their team projects."""
+    from accounts.roles import ROLE_BITS
+    roles = [role for role, _ in Project.ROLE_PAYOUT_FIELDS]
+    PayoutEntry.objects.filter(user_id=user_id, role__in=roles).delete()
+    entries = []
+    projects = (
+        Project.objects.filter(assignments__user_id=user_id, assignments__is_member=True)
+        .only(*Project.PAYOUT_FIELDS)
+    )
+    for project in projects:
+        for role, field in Project.ROLE_PAYOUT_FIELDS:
+            amount = getattr(project, field)
+            if amount and role_mask & ROLE_BITS[role]:
+                entries.append(PayoutEntry(
+                    project=project, user_id=user_id, role=role,
+                    amount=amount, released=project.admin_payment_released,
+                ))
+    PayoutEntry.objects.bulk_create(entries)
+
+
+@receiver(m2m_changed, sender=Project.assigned_team.through)
+def sync_payout_entries_on_team_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.rebuild_payout_entries()
+        return
+    # instance is a User; pk_set holds project ids (None on clear, so
+    # remember the affected projects before the rows go away)
+    if action == 'pre_clear':
+        instance._cleared_team_project_ids = list(instance.team_projects.values_list('pk', flat=True))
+        return
+    if action == 'post_clear':
+        pk_set = getattr(instance, '_cleared_team_project_ids', [])
+    elif action not in ('post_add', 'post_remove'):
+        return
+    for project in Project.objects.filter(pk__in=pk_set or []):
+        project.rebuild_payout_entries()
 
 
 class ProjectUpdate(models.Model):
@@ -228,6 +563,9 @@ class ProjectUpdate(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['project', 'created_at', 'id'], name='projectupdate_timeline_idx'),
+        ]
 
     def __str__(self):
         return f"Update for Project #{self.project.id} by {self.user} at {self.created_at}"
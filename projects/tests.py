@@ -1,9 +1,11 @@
+import re
+from decimal import Decimal
 from django.test import TestCase, Client
 from django.urls import reverse
 from django.contrib.auth.models import User
 from accounts.models import Role, UserProfile
 from leads.models import Lead
-from projects.models import Project
+from projects.models import Project, ProjectAssignment, PayoutEntry
 
 
 class AdminLeadsOverviewTests(TestCase):
@@ -337,3 +339,280 @@ class ExecutionEarningsTests(TestCase):
         resp = self.c.get(reverse('my_earnings'))
         self.assertAlmostEqual(resp.context['pending'], 250.00)
 
+
+
+class AdminDashboardCountsTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        from clients.models import Client as BusinessClient
+        cache.clear()
+        self.c = Client()
+        self.admin = User.objects.create_user(username='admin_counts', password='pass')
+        self.admin.profile.add_role('admin')
+        business = BusinessClient.objects.create(created_by=self.admin, full_name='O', business_name='B', phone='1', email='a@b.com', city='C', business_category='Other')
+        for status in ['new', 'new', 'assigned', 'completed']:
+            Project.objects.create(client=business, created_by=self.admin, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31', status=status)
+        Lead.objects.create(business_name='L1', phone_number='1', category='Other', status='new')
+        Lead.objects.create(business_name='L2', phone_number='2', category='Other', status='deal_won')
+
+    def test_counts_are_cached_as_integers(self):
+        from django.core.cache import cache
+        self.c.login(username='admin_counts', password='pass')
+        resp = self.c.get(reverse('projects:admin_projects'))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['project_counts'], {'new': 2, 'assigned': 1, 'in_progress': 0, 'completed': 1, 'payment_done': 0})
+        self.assertEqual(resp.context['lead_counts']['deal_won'], 1)
+        self.assertEqual(cache.get('admin_projects_status_counts')['new'], 2)
+        self.assertEqual(cache.get('admin_leads_overview')['new'], 1)
+
+    def test_count_by_status_is_one_query(self):
+        from projects.views import count_by_status
+        with self.assertNumQueries(1):
+            counts = count_by_status(Project.objects.all(), Project.STATUS_CHOICES)
+        self.assertEqual(counts['new'], 2)
+
+
+class AdminBucketPaginationTests(TestCase):
+    def setUp(self):
+        from clients.models import Client as BusinessClient
+        self.c = Client()
+        self.admin = User.objects.create_user(username='admin_pages', password='pass')
+        self.admin.profile.add_role('admin')
+        business = BusinessClient.objects.create(created_by=self.admin, full_name='O', business_name='Paged', phone='1', email='a@b.com', city='C', business_category='Other')
+        self.projects = [
+            Project.objects.create(client=business, created_by=self.admin, project_type='custom', website_type='business', business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='', deadline='2099-12-31', status='new')
+            for _ in range(25)
+        ]
+
+    def test_first_paint_shows_first_page_only(self):
+        self.c.login(username='admin_pages', password='pass')
+        resp = self.c.get(reverse('projects:admin_projects'))
+        self.assertEqual(len(resp.context['new_projects']), 20)
+        self.assertIsNotNone(resp.context['new_next'])
+        self.assertIsNone(resp.context['assigned_next'])
+        self.assertContains(resp, 'Load more')
+
+    def test_bucket_fragment_continues_after_cursor(self):
+        self.c.login(username='admin_pages', password='pass')
+        first = self.c.get(reverse('projects:admin_projects'))
+        resp = self.c.get(reverse('projects:admin_project_bucket', args=['new']), {'cursor': first.context['new_next']})
+        self.assertEqual(resp.status_code, 200)
+        seen = {p.pk for p in first.context['new_projects']} | {p.pk for p in resp.context['projects']}
+        self.assertEqual(seen, {p.pk for p in self.projects})
+        self.assertIsNone(resp.context['next_cursor'])
+        self.assertNotContains(resp, 'Load more')
+
+    def test_unknown_bucket_is_404(self):
+        self.c.login(username='admin_pages', password='pass')
+        resp = self.c.get(reverse('projects:admin_project_bucket', args=['bogus']))
+        self.assertEqual(resp.status_code, 404)
+
+
+class PayoutLedgerTests(TestCase):
+    def setUp(self):
+        from clients.models import Client as BusinessClient
+        self.fetcher = User.objects.create_user(username='ledger_fetcher', password='pass')
+        self.fetcher.profile.add_role('cold_caller')
+        self.dev = User.objects.create_user(username='ledger_dev', password='pass')
+        self.dev.profile.add_role('developer')
+        self.seo = User.objects.create_user(username='ledger_seo', password='pass')
+        self.seo.profile.add_role('seo')
+        business = BusinessClient.objects.create(created_by=self.fetcher, full_name='O', business_name='Ledger', phone='1', email='a@b.com', city='C', business_category='Other')
+        self.project = Project.objects.create(
+            client=business, created_by=self.fetcher, project_type='custom', website_type='business',
+            business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='',
+            deadline='2099-12-31', status='completed', assigned_to=self.dev,
+            fetcher_commission_amount=Decimal('50'), developer_payout_amount=Decimal('200'), seo_payout_amount=Decimal('30'),
+        )
+        self.project.assigned_team.add(self.seo)
+
+    def test_ledger_rows_follow_project_and_team(self):
+        rows = set(PayoutEntry.objects.values_list('user__username', 'role', 'amount'))
+        self.assertEqual(rows, {
+            ('ledger_fetcher', 'fetcher', Decimal('50.00')),
+            ('ledger_dev', 'developer', Decimal('200.00')),
+            ('ledger_seo', 'seo', Decimal('30.00')),
+        })
+        self.project.assigned_team.remove(self.seo)
+        self.assertFalse(PayoutEntry.objects.filter(user=self.seo).exists())
+
+    def test_earnings_move_from_pending_to_total_on_release(self):
+        earnings = PayoutEntry.objects.filter(user=self.dev).earnings()
+        self.assertEqual(earnings, {'total': Decimal('0'), 'pending': Decimal('200')})
+        self.project.admin_payment_released = True
+        self.project.save()
+        earnings = PayoutEntry.objects.filter(user=self.dev).earnings()
+        self.assertEqual(earnings, {'total': Decimal('200'), 'pending': Decimal('0')})
+
+    def test_role_changes_rebuild_role_rows(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seo.profile.add_role('designer')
+        self.project.designer_payout_amount = Decimal('40')
+        self.project.save()
+        self.assertEqual(
+            set(PayoutEntry.objects.filter(user=self.seo).values_list('role', 'amount')),
+            {('seo', Decimal('30.00')), ('designer', Decimal('40.00'))},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seo.profile.remove_role('seo')
+        self.assertEqual(
+            list(PayoutEntry.objects.filter(user=self.seo).values_list('role', flat=True)), ['designer'],
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seo.profile.add_role('seo')
+        self.assertEqual(PayoutEntry.objects.filter(user=self.seo, role='seo').count(), 1)
+
+    def test_saves_without_payout_changes_leave_ledger_alone(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        project = Project.objects.get(pk=self.project.pk)
+        ids = set(PayoutEntry.objects.values_list('id', flat=True))
+        project.current_stage = 'full_dev'
+        with CaptureQueriesContext(connection) as ctx:
+            project.save()
+        self.assertFalse([q for q in ctx.captured_queries if 'projects_payoutentry' in q['sql']])
+        project.admin_payment_released = True
+        project.save()
+        self.assertEqual(set(PayoutEntry.objects.values_list('id', flat=True)), ids)
+        self.assertFalse(PayoutEntry.objects.filter(released=False).exists())
+        project.developer_payout_amount = Decimal('250')
+        project.save()
+        self.assertEqual(PayoutEntry.objects.get(user=self.dev).amount, Decimal('250.00'))
+
+    def test_my_earnings_is_one_query_over_ledger(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        c = Client()
+        c.login(username='ledger_seo', password='pass')
+        with CaptureQueriesContext(connection) as ctx:
+            resp = c.get(reverse('projects:my_earnings'))
+        earning_queries = [q['sql'] for q in ctx.captured_queries if 'projects_' in q['sql']]
+        self.assertEqual(len(earning_queries), 1)
+        self.assertIn('projects_payoutentry', earning_queries[0])
+        self.assertAlmostEqual(resp.context['pending'], 30.0)
+
+
+class ProjectAssignmentTests(TestCase):
+    def setUp(self):
+        from clients.models import Client as BusinessClient
+        self.admin = User.objects.create_user(username='assign_admin', password='pass')
+        self.admin.profile.add_role('admin')
+        self.dev = User.objects.create_user(username='assign_dev', password='pass')
+        self.dev.profile.add_role('developer')
+        self.designer = User.objects.create_user(username='assign_designer', password='pass')
+        self.designer.profile.add_role('designer')
+        business = BusinessClient.objects.create(created_by=self.admin, full_name='O', business_name='Team', phone='1', email='a@b.com', city='C', business_category='Other')
+        self.project = Project.objects.create(
+            client=business, created_by=self.admin, project_type='custom', website_type='business',
+            business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='',
+            deadline='2099-12-31', status='completed',
+        )
+
+    def test_assign_view_stores_team_roles_and_payouts(self):
+        c = Client()
+        c.login(username='assign_admin', password='pass')
+        resp = c.post(reverse('projects:admin_assign', args=[self.project.pk]), {
+            'assigned_to': self.dev.pk,
+            'assigned_team': [self.designer.pk],
+            'assigned_payments': 'assign_designer:1500\nnobody:10\nnot a line',
+        })
+        self.assertEqual(resp.status_code, 302)
+        rows = set(self.project.assignments.values_list('user__username', 'role', 'amount'))
+        self.assertEqual(rows, {('assign_designer', 'designer', Decimal('1500.00'))})
+        self.assertEqual(self.project.get_user_payout(self.designer), 1500.0)
+        self.assertTrue(PayoutEntry.objects.filter(user=self.designer, role='assigned', amount=Decimal('1500')).exists())
+
+    def test_set_team_keeps_amounts_and_drops_removed_members(self):
+        self.project.set_team([self.designer], {self.dev.pk: Decimal('800')})
+        self.assertEqual(list(self.project.team_members()), [self.designer])
+        self.project.set_team([self.dev])
+        self.assertEqual(list(self.project.team_members()), [self.dev])
+        self.assertEqual(list(self.project.assignments.values_list('user', 'amount')), [(self.dev.pk, Decimal('800.00'))])
+        project = Project.objects.annotate(user_assignment_amount=ProjectAssignment.amount_for(self.dev)).get()
+        with self.assertNumQueries(0):
+            self.assertEqual(project.get_user_payout(self.dev), 800.0)
+
+
+    def test_payout_only_recipients_are_paid_but_not_on_the_team(self):
+        self.project.designer_payout_amount = Decimal('300')
+        self.project.save()
+        self.project.set_team([self.dev], {self.designer.pk: Decimal('100')})
+        self.assertEqual(list(self.project.team_members()), [self.dev])
+        self.assertFalse(Project.objects.visible_to(self.designer, 'execution').exists())
+        self.assertTrue(Project.objects.visible_to(self.dev, 'team').exists())
+        # the manual amount only; the designer role payout is for team members
+        self.assertEqual(
+            list(PayoutEntry.objects.filter(user=self.designer).values_list('role', 'amount')),
+            [('assigned', Decimal('100.00'))],
+        )
+        self.designer.profile.add_role('seo')
+        self.assertEqual(PayoutEntry.objects.filter(user=self.designer).count(), 1)
+        self.project.set_team([self.dev, self.designer])
+        self.assertTrue(Project.objects.visible_to(self.designer, 'execution').exists())
+        self.assertEqual(self.project.get_user_payout(self.designer), 100.0)
+        self.assertTrue(PayoutEntry.objects.filter(user=self.designer, role='designer').exists())
+
+
+class ProjectVisibilityTests(TestCase):
+    def setUp(self):
+        from clients.models import Client as BusinessClient
+        self.owner = User.objects.create_user(username='vis_owner', password='pass')
+        self.owner.profile.add_role('cold_caller')
+        self.dev = User.objects.create_user(username='vis_dev', password='pass')
+        self.dev.profile.add_role('developer')
+        self.designer = User.objects.create_user(username='vis_designer', password='pass')
+        self.designer.profile.add_role('designer')
+        business = BusinessClient.objects.create(created_by=self.owner, full_name='O', business_name='Vis', phone='1', email='a@b.com', city='C', business_category='Other')
+
+        def make(**kwargs):
+            return Project.objects.create(
+                client=business, created_by=self.owner, project_type='custom', website_type='business',
+                business_description='', contact_info_phone='1', contact_info_email='a@b.com', contact_info_address='',
+                deadline='2099-12-31', **kwargs
+            )
+        self.mine = make(assigned_to=self.dev)
+        self.shared = make(assigned_to=self.dev)
+        self.shared.assigned_team.add(self.dev, self.designer)
+        self.other = make()
+
+    def test_scopes(self):
+        self.assertEqual(set(Project.objects.visible_to(self.dev, 'execution')), {self.mine, self.shared})
+        self.assertEqual(list(Project.objects.visible_to(self.designer, 'execution')), [self.shared])
+        self.assertEqual(list(Project.objects.visible_to(self.designer, 'assigned')), [])
+        self.assertEqual(Project.objects.visible_to(self.owner, 'created').count(), 3)
+        self.assertEqual(Project.objects.visible_to(self.designer, 'involved').count(), 1)
+        with self.assertRaises(ValueError):
+            Project.objects.visible_to(self.dev, 'bogus')
+
+    def test_execution_scope_uses_id_subquery_without_distinct(self):
+        qs = Project.objects.visible_to(self.dev, 'execution')
+        sql = str(qs.query).upper()
+        self.assertIn('"ID" IN (SELECT', sql)
+        self.assertNotIn('EXISTS', sql)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertNotIn('JOIN', sql)
+        # a member on both relations still appears once
+        self.assertEqual(qs.filter(pk=self.shared.pk).count(), 1)
+
+    def test_team_lookup_plan_uses_assignment_index(self):
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('plan assertions are written for SQLite')
+        for scope in ('team', 'execution', 'involved'):
+            plan = Project.objects.visible_to(self.designer, scope).explain()
+            self.assertNotIn('TEMP B-TREE', plan)
+            # the member's assignments come from the index, projects by primary key
+            self.assertRegex(plan, r'SEARCH U0 USING (COVERING )?INDEX')
+            self.assertNotRegex(plan, r'SCAN U0')
+            self.assertFalse(
+                [line for line in plan.splitlines() if re.search(r'\bSCAN projects_project\b', line)],
+                f'{scope}: {plan}',
+            )
+
+    def test_detail_view_is_visible_to_team_member_only(self):
+        c = Client()
+        c.login(username='vis_designer', password='pass')
+        url = reverse('projects:developer_project_detail', args=[self.shared.pk])
+        self.assertEqual(c.get(url).status_code, 200)
+        url = reverse('projects:developer_project_detail', args=[self.mine.pk])
+        self.assertEqual(c.get(url).status_code, 404)
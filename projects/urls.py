@@ -8,6 +8,7 @@ from .views import (
     FetcherProjectListView,
     FetcherProjectDetailView,
     AdminProjectListView,
+    AdminProjectBucketView,
     AdminProjectDetailView,
     AdminAssignDeveloperView,
     AdminPaymentReleaseView,
@@ -32,6 +33,7 @@ urlpatterns = [
     path('fetcher/<int:pk>/', FetcherProjectDetailView.as_view(), name='fetcher_project_detail'),
     
     path('admin-panel/', AdminProjectListView.as_view(), name='admin_projects'),
+    path('admin-panel/bucket/<slug:status>/', AdminProjectBucketView.as_view(), name='admin_project_bucket'),
     path('admin-panel/<int:pk>/', AdminProjectDetailView.as_view(), name='admin_project_detail'),
     path('admin-panel/<int:pk>/assign/', AdminAssignDeveloperView.as_view(), name='admin_assign'),
     path('admin-panel/<int:pk>/release/', AdminPaymentReleaseView.as_view(), name='admin_payment_release'),
@@ -3,6 +3,8 @@ Views for Project management.
 Handles the complete project workflow for all roles.
 """
 
+from decimal import Decimal, InvalidOperation
+
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.generic import CreateView, ListView, DetailView, UpdateView
@@ -13,9 +15,13 @@ from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.views.decorators.cache import cache_page
 from django.utils.decorators import method_decorator
+from django.http import Http404
+from django.views import View
+from assanj_portal.pagination import keyset_paginate
 from accounts.mixins import FetcherRequiredMixin, AdminRequiredMixin, DeveloperRequiredMixin, ProjectExecutionMixin, ProjectManagerRequiredMixin
+from accounts.roles import role_filter
 from clients.models import Client
-from .models import Project, ProjectUpdate
+from .models import Project, ProjectUpdate, ProjectAssignment, PayoutEntry
 from .forms import ProjectForm, AdminAssignForm, DeveloperUpdateForm
 
 from django.db import transaction, models
@@ -143,21 +149,14 @@ class FetcherProjectListView(FetcherRequiredMixin, ListView):
     context_object_name = 'projects'
 
     def get_queryset(self):
-        return Project.objects.filter(created_by=self.request.user)
+        return Project.objects.visible_to(self.request.user, 'created')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        projects = self.get_queryset()
-        # earnings for fetcher: sum fetcher_commission_amount for projects where admin_payment_released
-        total = 0
-        pending = 0
-        for p in projects:
-            if p.admin_payment_released and p.fetcher_commission_amount:
-                total += float(p.fetcher_commission_amount)
-            elif p.status == 'completed' and not p.admin_payment_released and p.fetcher_commission_amount:
-                pending += float(p.fetcher_commission_amount)
-        context['total_earnings'] = total
-        context['pending_earnings'] = pending
+        # earnings for fetcher: commission rows from the payout ledger
+        earnings = PayoutEntry.objects.filter(user=self.request.user, role='fetcher').earnings()
+        context['total_earnings'] = float(earnings['total'])
+        context['pending_earnings'] = float(earnings['pending'])
         return context
 
 
@@ -168,11 +167,31 @@ class FetcherProjectDetailView(FetcherRequiredMixin, DetailView):
     context_object_name = 'project'
 
     def get_queryset(self):
-        return Project.objects.filter(created_by=self.request.user)
+        # Same permission path as the project activity log
+        return Project.objects.viewable_by(self.request.user, 'created')
 
 
 
 # ============ ADMIN DASHBOARD VIEW ============
+def count_by_status(queryset, choices):
+    """Return {status: count} for every status in `choices` using one GROUP BY query."""
+    from django.db.models import Count
+    counts = dict.fromkeys((value for value, _ in choices), 0)
+    for row in queryset.order_by().values('status').annotate(n=Count('pk')):
+        counts[row['status']] = row['n']
+    return counts
+
+
+ADMIN_BUCKET_PAGE_SIZE = 20
+ADMIN_BUCKET_ORDERING = ('-date_created', '-id')
+
+
+def admin_bucket_page(status, cursor=None):
+    """Return one keyset page of projects in `status` for the admin dashboard."""
+    queryset = Project.objects.filter(status=status).select_related('client')
+    return keyset_paginate(queryset, ADMIN_BUCKET_ORDERING, cursor, ADMIN_BUCKET_PAGE_SIZE)
+
+
 class AdminProjectListView(ProjectManagerRequiredMixin, ListView):
     """View for admin/project manager to see all projects."""
     model = Project
@@ -184,61 +203,36 @@ class AdminProjectListView(ProjectManagerRequiredMixin, ListView):
                                                     'assigned_to')
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Sum
-        
+        from django.db.models import Sum, Q
+        from leads.models import Lead
+        from leads.forms import LeadAutoAssignForm
+
         context = super().get_context_data(**kwargs)
-        projects = self.get_queryset()
+
+        # Each status bucket shows only its first keyset page; further pages
+        # load from AdminProjectBucketView. Counts come from one GROUP BY
+        # query and are cached as plain integers.
+        for status, _ in Project.STATUS_CHOICES:
+            page = admin_bucket_page(status)
+            context[f'{status}_projects'] = page.items
+            context[f'{status}_next'] = page.next_cursor
 
         # Cache project status counts - 5 minute cache
         cache_key = 'admin_projects_status_counts'
-        cached_data = cache.get(cache_key)
-        
-        if cached_data:
-            context['new_projects'] = cached_data['new_projects']
-            context['assigned_projects'] = cached_data['assigned_projects']
-            context['in_progress_projects'] = cached_data['in_progress_projects']
-            context['completed_projects'] = cached_data['completed_projects']
-            context['payment_done_projects'] = cached_data['payment_done_projects']
-        else:
-            context['new_projects'] = projects.filter(status='new')
-            context['assigned_projects'] = projects.filter(status='assigned')
-            context['in_progress_projects'] = projects.filter(status='in_progress')
-            context['completed_projects'] = projects.filter(status='completed')
-            context['payment_done_projects'] = projects.filter(status='payment_done')
-            
-            cache.set(cache_key, {
-                'new_projects': context['new_projects'],
-                'assigned_projects': context['assigned_projects'],
-                'in_progress_projects': context['in_progress_projects'],
-                'completed_projects': context['completed_projects'],
-                'payment_done_projects': context['payment_done_projects'],
-            }, 300)  # 5 minutes
+        project_counts = cache.get(cache_key)
+        if project_counts is None:
+            project_counts = count_by_status(Project.objects.all(), Project.STATUS_CHOICES)
+            cache.set(cache_key, project_counts, 300)  # 5 minutes
+        context['project_counts'] = project_counts
 
         # Cache leads overview - 5 minute cache
         cache_key_leads = 'admin_leads_overview'
-        cached_leads = cache.get(cache_key_leads)
-        
-        if cached_leads:
-            context['leads_new'] = cached_leads['leads_new']
-            context['leads_contacted'] = cached_leads['leads_contacted']
-            context['leads_meetings'] = cached_leads['leads_meetings']
-            context['leads_won'] = cached_leads['leads_won']
-            context['leads_lost'] = cached_leads['leads_lost']
-        else:
-            from leads.models import Lead
-            context['leads_new'] = Lead.objects.filter(status='new')
-            context['leads_contacted'] = Lead.objects.filter(status='contacted')
-            context['leads_meetings'] = Lead.objects.filter(status='meeting_booked')
-            context['leads_won'] = Lead.objects.filter(status='deal_won')
-            context['leads_lost'] = Lead.objects.filter(status='deal_lost')
-            
-            cache.set(cache_key_leads, {
-                'leads_new': context['leads_new'],
-                'leads_contacted': context['leads_contacted'],
-                'leads_meetings': context['leads_meetings'],
-                'leads_won': context['leads_won'],
-                'leads_lost': context['leads_lost'],
-            }, 300)  # 5 minutes
+        lead_counts = cache.get(cache_key_leads)
+        if lead_counts is None:
+            lead_counts = count_by_status(Lead.objects.all(), Lead.STATUS_CHOICES)
+            cache.set(cache_key_leads, lead_counts, 300)  # 5 minutes
+        context['lead_counts'] = lead_counts
+        context['auto_assign_form'] = LeadAutoAssignForm()
         
         # Cache agency earnings calculations - 10 minute cache
         cache_key_earnings = 'admin_agency_earnings'
@@ -248,18 +242,13 @@ class AdminProjectListView(ProjectManagerRequiredMixin, ListView):
             context['total_profit'] = cached_earnings['total_profit']
             context['pending_profit'] = cached_earnings['pending_profit']
         else:
-            total_profit = projects.filter(
-                admin_payment_released=True
-            ).aggregate(
-                total=Sum('agency_profit')
-            )['total'] or 0
-            
-            pending_profit = projects.filter(
-                status='completed',
-                admin_payment_released=False
-            ).aggregate(
-                total=Sum('agency_profit')
-            )['total'] or 0
+            # Both totals in one conditional aggregate
+            totals = Project.objects.aggregate(
+                total_profit=Sum('agency_profit', filter=Q(admin_payment_released=True)),
+                pending_profit=Sum('agency_profit', filter=Q(status='completed', admin_payment_released=False)),
+            )
+            total_profit = totals['total_profit'] or 0
+            pending_profit = totals['pending_profit'] or 0
             
             context['total_profit'] = total_profit
             context['pending_profit'] = pending_profit
@@ -271,6 +260,20 @@ class AdminProjectListView(ProjectManagerRequiredMixin, ListView):
 
         return context
 
+class AdminProjectBucketView(ProjectManagerRequiredMixin, View):
+    """Fragment endpoint: table rows for the next page of one status bucket."""
+
+    def get(self, request, status):
+        if status not in dict(Project.STATUS_CHOICES):
+            raise Http404('Unknown project status')
+        page = admin_bucket_page(status, request.GET.get('cursor'))
+        return render(request, 'admin_project_rows.html', {
+            'projects': page.items,
+            'status': status,
+            'next_cursor': page.next_cursor,
+        })
+
+
 class AdminProjectDetailView(ProjectManagerRequiredMixin, DetailView):
     """View for admin/project manager to see full project details."""
     model = Project
@@ -287,26 +290,17 @@ class AdminProjectDetailView(ProjectManagerRequiredMixin, DetailView):
         if cached_developers:
             context['developers'] = cached_developers
         else:
-            developers = User.objects.filter(profile__roles__name='developer')
+            developers = User.objects.filter(role_filter(['developer']))
             context['developers'] = developers
             cache.set(cache_key, developers, 1800)  # 30 minutes
         
         # Prepare assigned_payments textarea initial
-        payments_initial = ''
-        try:
-            for uid, amt in (self.object.assigned_payments or {}).items():
-                try:
-                    u = User.objects.get(pk=int(uid))
-                    payments_initial += f"{u.username}:{amt}\n"
-                except Exception:
-                    payments_initial += f"{uid}:{amt}\n"
-        except Exception:
-            payments_initial = ''
+        payments_initial = payments_text(self.object)
 
         context['assign_form'] = AdminAssignForm(
             initial={
                 'assigned_to': self.object.assigned_to,
-                'assigned_team': self.object.assigned_team.all(),
+                'assigned_team': self.object.team_members(),
                 'fetcher_commission_amount': self.object.fetcher_commission_amount,
                 'developer_payout_amount': self.object.developer_payout_amount,
                 'agency_profit': self.object.agency_profit,
@@ -314,7 +308,43 @@ class AdminProjectDetailView(ProjectManagerRequiredMixin, DetailView):
             })
         return context
 
-from django.views import View
+def payments_text(project):
+    """Render a project's manual payouts as "username:amount" lines."""
+    rows = project.assignments.filter(amount__isnull=False).values_list('user__username', 'amount')
+    return ''.join(f"{username}:{amount}\n" for username, amount in rows)
+
+
+def parse_payments(text):
+    """Parse "username:amount" / "user_id:amount" lines into {user_id: amount}.
+
+    Unknown users and malformed lines are skipped; usernames and ids are
+    resolved with one query.
+    """
+    pairs = []
+    for line in (text or '').splitlines():
+        left, sep, right = line.strip().partition(':')
+        if not sep:
+            continue
+        try:
+            amount = Decimal(right.strip())
+        except InvalidOperation:
+            continue
+        pairs.append((left.strip(), amount))
+    if not pairs:
+        return {}
+
+    ids = {int(left) for left, _ in pairs if left.isdigit()}
+    names = {left for left, _ in pairs if not left.isdigit()}
+    users = User.objects.filter(models.Q(pk__in=ids) | models.Q(username__in=names)).values_list('pk', 'username')
+    by_id = {pk: pk for pk, _ in users}
+    by_name = {username: pk for pk, username in users}
+    payments = {}
+    for left, amount in pairs:
+        user_id = by_id.get(int(left)) if left.isdigit() else by_name.get(left)
+        if user_id:
+            payments[user_id] = amount
+    return payments
+
 
 class AdminAssignDeveloperView(ProjectManagerRequiredMixin, View):
     template_name = 'admin_assign.html'
@@ -322,17 +352,8 @@ class AdminAssignDeveloperView(ProjectManagerRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         project = get_object_or_404(Project, pk=kwargs['pk'])
 
-        # Convert assigned_payments dict into "username:amount" lines for initial textarea
-        payments_initial = ''
-        try:
-            for uid, amt in (project.assigned_payments or {}).items():
-                try:
-                    u = User.objects.get(pk=int(uid))
-                    payments_initial += f"{u.username}:{amt}\n"
-                except Exception:
-                    payments_initial += f"{uid}:{amt}\n"
-        except Exception:
-            payments_initial = ''
+        # Per-user payouts as "username:amount" lines for the initial textarea
+        payments_initial = payments_text(project)
 
         assign_form = AdminAssignForm(initial={
             'assigned_to': project.assigned_to,
@@ -383,45 +404,10 @@ class AdminAssignDeveloperView(ProjectManagerRequiredMixin, View):
 
             project.save()
 
-            # Assigned team handling
-            if 'assigned_team' in form.cleaned_data:
-                team = form.cleaned_data['assigned_team']
-                project.assigned_team.set(team)
-
-            # Parse per-user assigned payments if provided
-            assigned_payments_text = form.cleaned_data.get('assigned_payments', '')
-            payments_map = {}
-            if assigned_payments_text:
-                for line in assigned_payments_text.splitlines():
-                    line = line.strip()
-                    if not line:
-                        continue
-                    if ':' in line:
-                        left, right = line.split(':', 1)
-                        left = left.strip()
-                        right = right.strip()
-                        try:
-                            amount = float(right)
-                        except ValueError:
-                            continue
-                        # try to resolve left as username or id
-                        user_obj = None
-                        if left.isdigit():
-                            try:
-                                user_obj = User.objects.get(pk=int(left))
-                            except User.DoesNotExist:
-                                user_obj = None
-                        else:
-                            try:
-                                user_obj = User.objects.get(username=left)
-                            except User.DoesNotExist:
-                                user_obj = None
-                        if user_obj:
-                            payments_map[str(user_obj.id)] = amount
-                if payments_map:
-                    project.assigned_payments = payments_map
-
-            project.save()
+            # Team and per-user payouts live in the ProjectAssignment through table
+            team = form.cleaned_data.get('assigned_team') or []
+            payments_map = parse_payments(form.cleaned_data.get('assigned_payments', ''))
+            project.set_team(team, payments_map)
 
             log_activity('assign_developer', 'project', project.id, request.user)
             
@@ -606,45 +592,26 @@ class DeveloperProjectListView(DeveloperRequiredMixin, ListView):
     context_object_name = 'projects'
 
     def get_queryset(self):
-        return Project.objects.filter(assigned_to=self.request.user)
+        return Project.objects.visible_to(self.request.user, 'assigned')
 
     def get_context_data(self, **kwargs):
-        from django.db.models import Sum
-        
         context = super().get_context_data(**kwargs)
-        projects = self.get_queryset()
+        user = self.request.user
+        projects = self.get_queryset().annotate(
+            user_assignment_amount=ProjectAssignment.amount_for(user)
+        )
 
         context['assigned_projects'] = projects.filter(status='assigned')
         context['in_progress_projects'] = projects.filter(status='in_progress')
         context['completed_projects'] = projects.filter(
             status__in=['completed', 'payment_done'])
         
-        # NEW: Calculate developer earnings
-        total_earnings = projects.filter(
-            admin_payment_released=True
-        ).aggregate(
-            total=Sum('developer_payout_amount')
-        )['total'] or 0
-        
-        pending_earnings = projects.filter(
-            status='completed',
-            admin_payment_released=False
-        ).aggregate(
-            total=Sum('developer_payout_amount')
-        )['total'] or 0
-        
-        # Augment earnings by checking per-user assigned_payments mapping
-        user = self.request.user
-        extra_total = 0
-        extra_pending = 0
-        for p in projects:
-            if p.admin_payment_released:
-                extra_total += p.get_user_payout(user)
-            elif p.status == 'completed' and not p.admin_payment_released:
-                extra_pending += p.get_user_payout(user)
-
-        context['total_earnings'] = (total_earnings or 0) + extra_total
-        context['pending_earnings'] = (pending_earnings or 0) + extra_pending
+        # Developer earnings on assigned projects, from the payout ledger
+        earnings = PayoutEntry.objects.filter(
+            user=user, role__in=['developer', 'assigned'], project__assigned_to=user
+        ).earnings()
+        context['total_earnings'] = earnings['total']
+        context['pending_earnings'] = earnings['pending']
 
         # Attach per-user payout value on each project so templates can show it without calling methods with args
         for p in context['assigned_projects']:
@@ -664,7 +631,8 @@ class DeveloperProjectDetailView(ProjectExecutionMixin, DetailView):
 
     def get_queryset(self):
         # Allow access to the assigned developer or any member of the assigned team
-        return Project.objects.filter(models.Q(assigned_to=self.request.user) | models.Q(assigned_team=self.request.user)).distinct()
+        # (and staff roles), the same permission path as the project activity log
+        return Project.objects.viewable_by(self.request.user, 'execution')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -694,7 +662,7 @@ class DeveloperUpdateStatusView(ProjectExecutionMixin, UpdateView):
     }
 
     def get_queryset(self):
-        return Project.objects.filter(models.Q(assigned_to=self.request.user) | models.Q(assigned_team=self.request.user)).distinct()
+        return Project.objects.visible_to(self.request.user, 'execution')
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -738,58 +706,20 @@ class DeveloperUpdateStatusView(ProjectExecutionMixin, UpdateView):
         # Include developer notes (if any) in activity log
         dev_note = form.cleaned_data.get('developer_notes')
         log_activity('developer_update', 'project', project.id, self.request.user, note=dev_note)
+        # Status may have changed: drop cached admin counts
+        invalidate_admin_cache()
         messages.success(self.request, 'Project updated successfully!')
         return redirect('projects:developer_project_detail', pk=project.pk)
 
 
 @login_required
 def my_earnings(request):
-    """Simple earnings overview for the logged-in user."""
-    user = request.user
-    total = 0
-    pending = 0
-
-    # Developer earnings
-    from django.db.models import Sum
-    dev_projects = Project.objects.filter(assigned_to=user)
-    total += sum([p.get_user_payout(user) for p in dev_projects if p.admin_payment_released])
-    pending += sum([p.get_user_payout(user) for p in dev_projects if p.status == 'completed' and not p.admin_payment_released])
-
-    # Team assigned payouts (per-user mappings)
-    team_projects = Project.objects.filter(assigned_team=user)
-    total += sum([p.get_user_payout(user) for p in team_projects if p.admin_payment_released])
-    pending += sum([p.get_user_payout(user) for p in team_projects if p.status == 'completed' and not p.admin_payment_released])
-
-    # Fetcher earnings
-    fetcher_projects = Project.objects.filter(created_by=user)
-    total += sum([float(p.fetcher_commission_amount or 0) for p in fetcher_projects if p.admin_payment_released])
-    pending += sum([float(p.fetcher_commission_amount or 0) for p in fetcher_projects if p.status == 'completed' and not p.admin_payment_released])
-
-    # Additional role-based payouts for execution roles (designer, seo, gbp, social_media)
-    profile = getattr(user, 'profile', None)
-    if profile:
-        # Designer
-        if profile.has_role('designer'):
-            designer_projects = Project.objects.filter(assigned_team=user)
-            total += sum([float(p.designer_payout_amount or 0) for p in designer_projects if p.admin_payment_released])
-            pending += sum([float(p.designer_payout_amount or 0) for p in designer_projects if p.status == 'completed' and not p.admin_payment_released])
-        # SEO
-        if profile.has_role('seo'):
-            seo_projects = Project.objects.filter(assigned_team=user)
-            total += sum([float(p.seo_payout_amount or 0) for p in seo_projects if p.admin_payment_released])
-            pending += sum([float(p.seo_payout_amount or 0) for p in seo_projects if p.status == 'completed' and not p.admin_payment_released])
-        # GBP
-        if profile.has_role('gbp'):
-            gbp_projects = Project.objects.filter(assigned_team=user)
-            total += sum([float(p.gbp_payout_amount or 0) for p in gbp_projects if p.admin_payment_released])
-            pending += sum([float(p.gbp_payout_amount or 0) for p in gbp_projects if p.status == 'completed' and not p.admin_payment_released])
-        # Social Media
-        if profile.has_role('social_media'):
-            social_projects = Project.objects.filter(assigned_team=user)
-            total += sum([float(p.social_media_payout_amount or 0) for p in social_projects if p.admin_payment_released])
-            pending += sum([float(p.social_media_payout_amount or 0) for p in social_projects if p.status == 'completed' and not p.admin_payment_released])
-
-    return render(request, 'my_earnings.html', {'total': total, 'pending': pending})
+    """Simple earnings overview for the logged-in user (one SUM over the payout ledger)."""
+    earnings = PayoutEntry.objects.filter(user=request.user).earnings()
+    return render(request, 'my_earnings.html', {
+        'total': float(earnings['total']),
+        'pending': float(earnings['pending']),
+    })
 
 
 @login_required
@@ -803,7 +733,7 @@ def execution_submit_update(request, pk):
         messages.error(request, 'You do not have permission to add updates.')
         return redirect('dashboard:execution_dashboard')
 
-    if request.user not in project.assigned_team.all() and request.user != project.assigned_to:
+    if not Project.objects.visible_to(request.user, 'execution').filter(pk=project.pk).exists():
         messages.error(request, 'You are not assigned to this project.')
         return redirect('dashboard:execution_dashboard')
 